@@ -2,6 +2,9 @@
 from app.core.config import settings
 from app.core.database import get_db, check_connection
 from app.core.models import MNTData, MNTDocument, MNTCreateRequest, MNTListResponse, MNTUpdateRequest
+from app.core.templates import create_templates
+from app.core.static_files import CachedStaticFiles
+from app.core.responses import DocumentJSONResponse, encode_json
 
 __all__ = [
     'settings',
@@ -12,4 +15,8 @@ __all__ = [
     'MNTCreateRequest',
     'MNTListResponse',
     'MNTUpdateRequest',
+    'create_templates',
+    'CachedStaticFiles',
+    'DocumentJSONResponse',
+    'encode_json',
 ]
@@ -43,6 +43,9 @@ class Settings(BaseSettings):
     confluence_email: Optional[str] = None  # Email для Cloud
     confluence_api_token: Optional[str] = None  # API Token для Cloud
     
+    # Ограничение частоты запросов к Confluence (запросов в секунду, 0 - без ограничения)
+    confluence_max_rps: float = 10.0
+    
     # ============================================
     # Logging Configuration (Настройки логирования)
     # ============================================
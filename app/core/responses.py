@@ -0,0 +1,45 @@
+"""JSON-ответы API"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+
+def json_default(value: Any) -> Any:
+    """Сериализация типов, которые не поддерживает стандартный json (даты из БД и т.п.)"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# Кодировщик создается один раз (json.dumps с параметрами создает новый JSONEncoder на каждый вызов)
+_document_json_encoder = json.JSONEncoder(
+    ensure_ascii=False,
+    allow_nan=False,
+    indent=None,
+    separators=(",", ":"),
+    default=json_default,
+)
+
+
+def encode_json(content: Any) -> bytes:
+    """Компактная сериализация в JSON (UTF-8) с поддержкой дат из БД"""
+    return _document_json_encoder.encode(content).encode("utf-8")
+
+
+class DocumentJSONResponse(JSONResponse):
+    """JSONResponse, сериализующий данные документов напрямую через json.dumps
+
+    Если вернуть из эндпоинта такой ответ, FastAPI не прогоняет данные через
+    jsonable_encoder (рекурсивный обход всех полей data_json на Python),
+    а даты из БД сериализуются в ISO-формат при кодировании.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return encode_json(content)
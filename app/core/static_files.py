@@ -0,0 +1,23 @@
+"""Раздача статических файлов с заголовками кэширования"""
+from starlette.staticfiles import StaticFiles
+from starlette.responses import Response
+from starlette.types import Scope
+
+# Сторонние библиотеки (bootstrap и т.п.) меняются только вместе с версией приложения
+VENDOR_PATHS = ("css/bootstrap.min.css", "js/vendor/")
+VENDOR_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Собственные файлы без хэша в имени - браузер кэширует, но перепроверяет по ETag (ответ 304)
+DEFAULT_CACHE_CONTROL = "public, no-cache"
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles с заголовком Cache-Control"""
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            if path.replace("\\", "/").startswith(VENDOR_PATHS):
+                response.headers["Cache-Control"] = VENDOR_CACHE_CONTROL
+            else:
+                response.headers["Cache-Control"] = DEFAULT_CACHE_CONTROL
+        return response
@@ -0,0 +1,28 @@
+"""Настройка шаблонизатора Jinja2"""
+import functools
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from starlette.templating import Jinja2Templates
+
+from app.core.config import settings
+
+TEMPLATES_DIR = "app/templates"
+
+
+@functools.lru_cache(maxsize=None)
+def create_templates() -> Jinja2Templates:
+    """Общий для всех роутеров Jinja2Templates с кэшем байткода шаблонов
+
+    Экземпляр создается один раз на процесс, поэтому все роутеры используют одно
+    Environment и один кэш скомпилированных шаблонов. Скомпилированные шаблоны
+    также сохраняются во временной директории и переиспользуются между перезапусками
+    воркеров. Проверка изменений файлов шаблонов (auto_reload) включена только
+    в окружении development.
+    """
+    env = Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        autoescape=True,
+        auto_reload=settings.log_environment == "development",
+        bytecode_cache=FileSystemBytecodeCache()
+    )
+    return Jinja2Templates(env=env)
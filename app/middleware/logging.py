@@ -1,86 +1,86 @@
 """Middleware для логирования HTTP запросов"""
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request as StarletteRequest
+from starlette.datastructures import QueryParams
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Optional
+import logging
 import time
 from app.utils import log_request, log_error, logger, generate_request_id
 
+# Уровень логирования задается один раз при старте - проверяем DEBUG один раз, а не на каждый запрос
+_DEBUG_ENABLED = logger.isEnabledFor(logging.DEBUG)
+
+# Пути, запросы к которым не логируются (str.startswith с кортежем проверяет все префиксы за один вызов)
+SKIP_LOG_PREFIXES = ("/static", "/favicon.ico")
+
+
+def _get_content_length(headers) -> Optional[int]:
+    """Размер тела из заголовка content-length (None, если заголовка нет или он некорректен)"""
+    for name, value in headers:
+        if name == b"content-length":
+            try:
+                return int(value)
+            except (ValueError, TypeError):
+                return None
+    return None
+
+
+class LoggingMiddleware:
+    """Middleware для логирования всех HTTP запросов
+
+    Реализован как чистое ASGI middleware (без BaseHTTPMiddleware), чтобы не создавать
+    на каждый запрос дополнительную задачу и потоки для проксирования тела запроса/ответа.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        # Пропускаем не-HTTP запросы, статические файлы и favicon
+        if scope["type"] != "http" or scope["path"].startswith(SKIP_LOG_PREFIXES):
+            await self.app(scope, receive, send)
+            return
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware для логирования всех HTTP запросов"""
-    async def dispatch(self, request: StarletteRequest, call_next):
-        # Пропускаем статические файлы
-        if request.url.path.startswith("/static"):
-            return await call_next(request)
-        
         # Генерируем request ID
         request_id = generate_request_id()
-        request.state.request_id = request_id
-        
+
         # Получаем IP пользователя
-        user_ip = request.client.host if request.client else "unknown"
-        request.state.user_ip = user_ip
-        
+        client = scope.get("client")
+        user_ip = client[0] if client else "unknown"
+
+        # Доступны в обработчиках как request.state.request_id / request.state.user_ip
+        state = scope.setdefault("state", {})
+        state["request_id"] = request_id
+        state["user_ip"] = user_ip
+
         # Начало запроса
-        start_time = time.time()
-        method = request.method
-        path = request.url.path
-        query_params = str(request.query_params) if request.query_params else ""
-        
-        logger.debug(
-            f"ВХОДЯЩИЙ ЗАПРОС | {method} {path}",
-            extra={
+        start_time = time.perf_counter()
+        method = scope["method"]
+        path = scope["path"]
+
+        if _DEBUG_ENABLED:
+            extra = {
                 'request_id': request_id,
                 'user_ip': user_ip,
                 'user_name': '-'
             }
-        )
-        if query_params:
-            logger.debug(
-                f"Query params: {query_params}",
-                extra={
-                    'request_id': request_id,
-                    'user_ip': user_ip,
-                    'user_name': '-'
-                }
-            )
-        
+            logger.debug("ВХОДЯЩИЙ ЗАПРОС | %s %s", method, path, extra=extra)
+            if scope.get("query_string"):
+                logger.debug("Query params: %s", QueryParams(scope["query_string"]), extra=extra)
+
         # Пытаемся получить размер запроса из заголовков
-        request_size_bytes = None
-        content_length = request.headers.get('content-length')
-        if content_length:
-            try:
-                request_size_bytes = int(content_length)
-            except (ValueError, TypeError):
-                pass
-        
+        request_size_bytes = _get_content_length(scope["headers"])
+
+        response_start = {}
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                response_start["status"] = message["status"]
+                response_start["size"] = _get_content_length(message.get("headers", []))
+            await send(message)
+
         try:
-            response = await call_next(request)
-            duration_ms = (time.time() - start_time) * 1000
-            
-            # Пытаемся определить размер ответа из заголовков
-            response_size_bytes = None
-            content_length = response.headers.get('content-length')
-            if content_length:
-                try:
-                    response_size_bytes = int(content_length)
-                except (ValueError, TypeError):
-                    pass
-            
-            # Логируем ответ с метриками
-            log_request(
-                method=method,
-                path=path,
-                status_code=response.status_code,
-                request_id=request_id,
-                user_ip=user_ip,
-                duration_ms=duration_ms,
-                request_size_bytes=request_size_bytes,
-                response_size_bytes=response_size_bytes
-            )
-            
-            return response
+            await self.app(scope, receive, send_wrapper)
         except Exception as e:
-            duration_ms = (time.time() - start_time) * 1000
             log_error(
                 error=e,
                 context=f"Обработка запроса {method} {path}",
@@ -88,3 +88,17 @@ class LoggingMiddleware(BaseHTTPMiddleware):
                 user_ip=user_ip
             )
             raise
+
+        duration_ms = (time.perf_counter() - start_time) * 1000
+
+        # Логируем ответ с метриками
+        log_request(
+            method=method,
+            path=path,
+            status_code=response_start.get("status", 500),
+            request_id=request_id,
+            user_ip=user_ip,
+            duration_ms=duration_ms,
+            request_size_bytes=request_size_bytes,
+            response_size_bytes=response_start.get("size")
+        )
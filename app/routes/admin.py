@@ -1,17 +1,16 @@
 """Административные роуты (теги, аудит, логи)"""
 from fastapi import APIRouter, Depends, HTTPException, Request, Form, Query
-from fastapi.responses import JSONResponse, Response
-from starlette.templating import Jinja2Templates
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from typing import Optional
 import json
 import io
 import csv
-from datetime import datetime
+import time
 
 # Core
-from app.core import get_db
+from app.core import get_db, encode_json
 
 # Services
 from app.services import (
@@ -24,15 +23,104 @@ from app.utils import (
     log_error, logger
 )
 
-# Импортируем templates
-templates = Jinja2Templates(directory="app/templates")
 
 # Создаем роутер для административных функций
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
+# Заголовки CSV экспорта логов аудита
+AUDIT_CSV_HEADERS = [
+    "ID", "МНТ ID", "Название МНТ", "Дата/Время",
+    "Пользователь", "Тип действия", "Описание", "Детали"
+]
+
+# Количество строк CSV, отдаваемых клиенту одним фрагментом (меньше отправок через ASGI)
+AUDIT_CSV_BATCH_ROWS = 64
+
+# Общая часть запросов экспорта логов аудита по всем МНТ
+AUDIT_EXPORT_FROM = """
+    FROM mnt.action_history ah
+    LEFT JOIN mnt.documents d ON ah.mnt_id = d.id
+    ORDER BY ah.created_at DESC
+    LIMIT 10000
+"""
+
+# CSV: PostgreSQL сразу отдает колонки в порядке AUDIT_CSV_HEADERS, дату в ISO-формате и детали текстом JSON
+AUDIT_CSV_QUERY = text("""
+    SELECT ah.id, ah.mnt_id, d.title,
+           to_char(ah.created_at, 'YYYY-MM-DD"T"HH24:MI:SS.US'),
+           ah.user_name, ah.action_type, ah.action_description,
+           COALESCE(ah.details, '{}'::jsonb)::text
+""" + AUDIT_EXPORT_FROM)
+
+# JSON: каждая запись сериализуется в PostgreSQL и передается в ответ без разбора в Python
+AUDIT_JSON_QUERY = text("""
+    SELECT jsonb_build_object(
+               'id', ah.id,
+               'mnt_id', ah.mnt_id,
+               'user_name', ah.user_name,
+               'action_type', ah.action_type,
+               'action_description', ah.action_description,
+               'details', COALESCE(ah.details, '{}'::jsonb),
+               'created_at', ah.created_at,
+               'mnt_title', d.title
+           )::text
+""" + AUDIT_EXPORT_FROM)
+
+
+def iter_history_csv_rows(history):
+    """Строки CSV (в порядке AUDIT_CSV_HEADERS) из истории действий одного МНТ"""
+    # Один кодировщик на весь экспорт вместо json.dumps (новый JSONEncoder) на каждую строку
+    details_encoder = json.JSONEncoder(ensure_ascii=False)
+    for item in history:
+        yield (
+            item.get("id", ""),
+            item.get("mnt_id", ""),
+            item.get("mnt_title", ""),
+            item.get("created_at", "").isoformat() if item.get("created_at") else "",
+            item.get("user_name", ""),
+            item.get("action_type", ""),
+            item.get("action_description", ""),
+            details_encoder.encode(item.get("details", {}))
+        )
+
+
+def iter_audit_csv(rows):
+    """Генерация CSV экспорта логов аудита порциями по AUDIT_CSV_BATCH_ROWS строк"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    
+    def flush() -> bytes:
+        chunk = output.getvalue().encode("utf-8")
+        output.seek(0)
+        output.truncate()
+        return chunk
+    
+    writer.writerow(AUDIT_CSV_HEADERS)
+    yield flush()
+    
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending == AUDIT_CSV_BATCH_ROWS:
+            yield flush()
+            pending = 0
+    
+    if pending:
+        yield flush()
+
+
+def iter_audit_json(items):
+    """Построчная генерация JSON-массива экспорта логов аудита из уже сериализованных записей (bytes)"""
+    separator = b"["
+    for item in items:
+        yield separator + item
+        separator = b","
+    yield b"]" if separator == b"," else b"[]"
+
 
 @router.get("/audit/export")
-async def export_audit_logs(
+def export_audit_logs(
     request: Request,
     mnt_id: Optional[int] = Query(None),
     format: str = Query("csv", pattern="^(csv|json)$"),
@@ -40,88 +128,37 @@ async def export_audit_logs(
 ):
     """Экспорт логов аудита (истории действий)"""
     try:
-        # Получаем историю действий
+        # Метка времени в имени файла (time.strftime без создания объекта datetime)
+        timestamp = time.strftime('%Y%m%d_%H%M%S')
         if mnt_id:
+            # История одного МНТ - не более 10000 записей одного документа
             history = get_action_history(db, mnt_id, limit=10000)
-            filename = f"audit_logs_mnt_{mnt_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            filename = f"audit_logs_mnt_{mnt_id}_{timestamp}"
+            if format == "csv":
+                content = iter_audit_csv(iter_history_csv_rows(history))
+            else:
+                content = iter_audit_json(map(encode_json, history))
         else:
-            # Для всех МНТ нужен отдельный запрос
-            query = text("""
-                SELECT ah.id, ah.mnt_id, ah.user_name, ah.action_type, 
-                       ah.action_description, ah.details, ah.created_at,
-                       d.title as mnt_title
-                FROM mnt.action_history ah
-                LEFT JOIN mnt.documents d ON ah.mnt_id = d.id
-                ORDER BY ah.created_at DESC
-                LIMIT 10000
-            """)
-            result = db.execute(query)
-            rows = result.fetchall()
-            
-            history = []
-            for row in rows:
-                details_value = row[5]
-                if details_value:
-                    if isinstance(details_value, dict):
-                        details_dict = details_value
-                    else:
-                        details_dict = json.loads(details_value) if details_value else {}
-                else:
-                    details_dict = {}
-                
-                history.append({
-                    "id": row[0],
-                    "mnt_id": row[1],
-                    "user_name": row[2],
-                    "action_type": row[3],
-                    "action_description": row[4],
-                    "details": details_dict,
-                    "created_at": row[6],
-                    "mnt_title": row[7]
-                })
-            filename = f"audit_logs_all_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            # Для всех МНТ строки формируются в PostgreSQL и читаются серверным курсором порциями
+            filename = f"audit_logs_all_{timestamp}"
+            query = AUDIT_CSV_QUERY if format == "csv" else AUDIT_JSON_QUERY
+            result = db.execute(query.execution_options(stream_results=True, yield_per=500))
+            if format == "csv":
+                content = iter_audit_csv(result)
+            else:
+                content = iter_audit_json(row[0].encode("utf-8") for row in result)
         
+        # Экспорт отдается построчно, без сборки всего файла в памяти
         if format == "csv":
-            # Экспорт в CSV
-            output = io.StringIO()
-            writer = csv.writer(output)
-            
-            # Заголовки
-            writer.writerow([
-                "ID", "МНТ ID", "Название МНТ", "Дата/Время", 
-                "Пользователь", "Тип действия", "Описание", "Детали"
-            ])
-            
-            # Данные
-            for item in history:
-                writer.writerow([
-                    item.get("id", ""),
-                    item.get("mnt_id", ""),
-                    item.get("mnt_title", ""),
-                    item.get("created_at", "").isoformat() if item.get("created_at") else "",
-                    item.get("user_name", ""),
-                    item.get("action_type", ""),
-                    item.get("action_description", ""),
-                    json.dumps(item.get("details", {}), ensure_ascii=False)
-                ])
-            
-            content = output.getvalue()
-            output.close()
-            
-            return Response(
-                content=content,
+            return StreamingResponse(
+                content,
                 media_type="text/csv; charset=utf-8",
                 headers={"Content-Disposition": f"attachment; filename={filename}.csv"}
             )
         else:
-            # Экспорт в JSON
-            # Конвертируем datetime в строки
-            for item in history:
-                if isinstance(item.get("created_at"), datetime):
-                    item["created_at"] = item["created_at"].isoformat()
-            
-            return JSONResponse(
-                content=history,
+            return StreamingResponse(
+                content,
+                media_type="application/json",
                 headers={"Content-Disposition": f"attachment; filename={filename}.json"}
             )
     except Exception as e:
@@ -134,14 +171,14 @@ api_admin_router = APIRouter(prefix="/api", tags=["Admin"])
 
 
 @api_admin_router.get("/tags")
-async def list_tags(db: Session = Depends(get_db)):
+def list_tags(db: Session = Depends(get_db)):
     """Получение списка всех тегов"""
     tags = get_tags(db)
     return {"tags": tags}
 
 
 @api_admin_router.post("/tags")
-async def create_new_tag(name: str = Form(...), color: str = Form("#6c757d"), db: Session = Depends(get_db)):
+def create_new_tag(name: str = Form(...), color: str = Form("#6c757d"), db: Session = Depends(get_db)):
     """Создание нового тега"""
     try:
         tag = create_tag(db, name, color)
@@ -1,27 +1,27 @@
 """REST API роуты для работы с МНТ"""
 from fastapi import APIRouter, Depends, HTTPException, Request, Form, File, UploadFile, Query
 from fastapi.responses import JSONResponse, FileResponse
-from starlette.templating import Jinja2Templates
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from typing import Optional, List
+from typing import Optional, List, BinaryIO
 import json
+import logging
 from pathlib import Path
-import uuid
-from datetime import datetime
+import secrets
 
 # Core
-from app.core import get_db, MNTCreateRequest, MNTUpdateRequest
+from app.core import get_db, MNTCreateRequest, MNTUpdateRequest, DocumentJSONResponse
 
 # Services
 from app.services import (
     create_mnt, get_mnt, update_mnt, list_mnt,
     update_confluence_info, set_error_status,
-    get_confluence_client,
+    get_confluence_client, ConfluenceVersionConflict,
     render_mnt_to_confluence_storage,
     get_template_data_for_tags, get_available_templates, apply_template_to_data,
     create_database_backup, restore_database_backup, export_all_data,
-    list_backups, delete_backup
+    list_backups, delete_backup, get_autocomplete_values,
+    start_background_task, get_background_task
 )
 
 # Utils
@@ -31,16 +31,13 @@ from app.utils import (
     NotFoundError, SecurityError
 )
 
-# Импортируем templates из main
-from starlette.templating import Jinja2Templates
-templates = Jinja2Templates(directory="app/templates")
 
 # Создаем роутер для API
 router = APIRouter(prefix="/api", tags=["API"])
 
 
 @router.post("/mnt")
-async def api_create_mnt(request: MNTCreateRequest, db: Session = Depends(get_db)):
+def api_create_mnt(request: MNTCreateRequest, db: Session = Depends(get_db)):
     """API: Создание нового МНТ"""
     try:
         data_dict = request.data.dict(exclude_none=True)
@@ -54,23 +51,23 @@ async def api_create_mnt(request: MNTCreateRequest, db: Session = Depends(get_db
 
 
 @router.get("/mnt")
-async def api_list_mnt(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def api_list_mnt(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     """API: Список МНТ"""
     documents, total = list_mnt(db, skip=skip, limit=limit)
-    return {"documents": documents, "total": total}
+    return DocumentJSONResponse(content={"documents": documents, "total": total})
 
 
 @router.get("/mnt/{mnt_id}")
-async def api_get_mnt(mnt_id: int, db: Session = Depends(get_db)):
+def api_get_mnt(mnt_id: int, db: Session = Depends(get_db)):
     """API: Получение МНТ по ID"""
     document = get_mnt(db, mnt_id)
     if not document:
         raise HTTPException(status_code=404, detail="МНТ не найден")
-    return document
+    return DocumentJSONResponse(content=document)
 
 
 @router.put("/mnt/{mnt_id}")
-async def api_update_mnt(mnt_id: int, request: MNTUpdateRequest, db: Session = Depends(get_db)):
+def api_update_mnt(mnt_id: int, request: MNTUpdateRequest, db: Session = Depends(get_db)):
     """API: Обновление МНТ"""
     document = get_mnt(db, mnt_id)
     if not document:
@@ -91,48 +88,30 @@ async def api_update_mnt(mnt_id: int, request: MNTUpdateRequest, db: Session = D
 
 
 @router.get("/autocomplete/projects")
-async def api_autocomplete_projects(db: Session = Depends(get_db)):
+def api_autocomplete_projects(db: Session = Depends(get_db)):
     """API: Автодополнение для списка проектов"""
     try:
-        result = db.execute(
-            text("SELECT DISTINCT project FROM mnt.documents WHERE project IS NOT NULL AND project != '' ORDER BY project")
-        ).fetchall()
-        projects = [row[0] for row in result if row[0]]
-        return projects
+        return get_autocomplete_values(db, "projects")
     except Exception as e:
         logger.error(f"Ошибка получения списка проектов: {e}", exc_info=True)
         return []
 
 
 @router.get("/autocomplete/authors")
-async def api_autocomplete_authors(db: Session = Depends(get_db)):
+def api_autocomplete_authors(db: Session = Depends(get_db)):
     """API: Автодополнение для списка авторов"""
     try:
-        result = db.execute(
-            text("SELECT DISTINCT author FROM mnt.documents WHERE author IS NOT NULL AND author != '' ORDER BY author")
-        ).fetchall()
-        authors = [row[0] for row in result if row[0]]
-        return authors
+        return get_autocomplete_values(db, "authors")
     except Exception as e:
         logger.error(f"Ошибка получения списка авторов: {e}", exc_info=True)
         return []
 
 
 @router.get("/autocomplete/tags")
-async def api_autocomplete_tags(db: Session = Depends(get_db)):
+def api_autocomplete_tags(db: Session = Depends(get_db)):
     """API: Автодополнение для списка тегов"""
     try:
-        result = db.execute(
-            text("""
-                SELECT DISTINCT jsonb_array_elements_text(data_json->'tags') as tag
-                FROM mnt.documents
-                WHERE data_json->'tags' IS NOT NULL 
-                  AND jsonb_array_length(data_json->'tags') > 0
-                ORDER BY tag
-            """)
-        ).fetchall()
-        tags = [row[0] for row in result if row[0] and isinstance(row[0], str) and row[0].strip()]
-        return tags
+        return get_autocomplete_values(db, "tags")
     except Exception as e:
         logger.error(f"Ошибка получения списка тегов: {e}", exc_info=True)
         return []
@@ -141,7 +120,8 @@ async def api_autocomplete_tags(db: Session = Depends(get_db)):
 @router.post("/mnt/{mnt_id}/publish")
 async def api_publish_mnt(mnt_id: int, db: Session = Depends(get_db)):
     """API: Публикация/обновление МНТ в Confluence"""
-    document = get_mnt(db, mnt_id)
+    # Синхронные запросы к БД выполняем в пуле потоков, чтобы не блокировать event loop
+    document = await run_in_threadpool(get_mnt, db, mnt_id)
     if not document:
         raise HTTPException(status_code=404, detail="МНТ не найден")
     
@@ -161,16 +141,31 @@ async def api_publish_mnt(mnt_id: int, db: Session = Depends(get_db)):
         
         # Если страница уже существует - обновляем, иначе создаем
         if document.get("confluence_page_id"):
-            # Обновляем существующую страницу
-            page_info = await confluence_client.get_page(document["confluence_page_id"])
-            current_version = page_info["version"]["number"]
+            # Обновляем существующую страницу. Если версия страницы сохранена при прошлой публикации -
+            # обновляем сразу, без запроса get_page; при конфликте версий запрашиваем актуальную
+            page_id = document["confluence_page_id"]
+            result = None
+            if document.get("confluence_version"):
+                try:
+                    result = await confluence_client.update_page(
+                        page_id=page_id,
+                        title=title,
+                        content=content,
+                        version=document["confluence_version"]
+                    )
+                except ConfluenceVersionConflict:
+                    logger.info(f"Версия страницы {page_id} в Confluence изменилась, запрашиваем актуальную")
             
-            result = await confluence_client.update_page(
-                page_id=document["confluence_page_id"],
-                title=title,
-                content=content,
-                version=current_version
-            )
+            if result is None:
+                page_info = await confluence_client.get_page(page_id)
+                current_version = page_info["version"]["number"]
+                
+                result = await confluence_client.update_page(
+                    page_id=page_id,
+                    title=title,
+                    content=content,
+                    version=current_version
+                )
         else:
             # Создаем новую страницу
             result = await confluence_client.create_page(
@@ -180,12 +175,14 @@ async def api_publish_mnt(mnt_id: int, db: Session = Depends(get_db)):
                 parent_id=parent_id
             )
         
-        # Обновляем информацию в БД
-        update_confluence_info(
+        # Обновляем информацию в БД (новая страница создается с версией 1)
+        await run_in_threadpool(
+            update_confluence_info,
             db, mnt_id,
             page_id=result["id"],
             page_url=result["url"],
-            status="published"
+            status="published",
+            version=result.get("version", 1)
         )
         
         return {
@@ -196,12 +193,12 @@ async def api_publish_mnt(mnt_id: int, db: Session = Depends(get_db)):
     
     except Exception as e:
         # Сохраняем ошибку в БД
-        set_error_status(db, mnt_id, str(e))
+        await run_in_threadpool(set_error_status, db, mnt_id, str(e))
         raise HTTPException(status_code=500, detail=f"Ошибка публикации в Confluence: {str(e)}")
 
 
 @router.get("/mnt/{mnt_id}/completeness")
-async def get_mnt_completeness(mnt_id: int, db: Session = Depends(get_db)):
+def get_mnt_completeness(mnt_id: int, db: Session = Depends(get_db)):
     """Получить информацию о полноте заполнения МНТ"""
     document = get_mnt(db, mnt_id)
     if not document:
@@ -210,30 +207,32 @@ async def get_mnt_completeness(mnt_id: int, db: Session = Depends(get_db)):
     try:
         data = document.get("data_json", {})
         completeness = check_document_completeness(data)
-        return JSONResponse(content=completeness)
+        return DocumentJSONResponse(content=completeness)
     except Exception as e:
         log_error(e, f"Ошибка проверки полноты МНТ #{mnt_id}")
         raise HTTPException(status_code=500, detail=f"Ошибка проверки полноты: {str(e)}")
 
 
 @router.post("/mnt/completeness")
-async def check_completeness_from_data(request: Request, db: Session = Depends(get_db)):
+async def check_completeness_from_data(request: Request):
     """Проверить полноту заполнения на основе переданных данных формы"""
     try:
         form_data = await request.form()
-        data = {}
         
-        # Собираем все данные из формы (включая confluence_space и confluence_parent_id для проверки полноты)
-        for key, value in form_data.items():
-            if key not in ["publish"]:  # Исключаем только publish
-                # Сохраняем как строку, убираем лишние пробелы
-                data[key] = value.strip() if isinstance(value, str) else value
+        # Все данные из формы (включая confluence_space и confluence_parent_id для проверки полноты),
+        # кроме publish; строки - без лишних пробелов
+        data = {
+            key: value.strip() if isinstance(value, str) else value
+            for key, value in form_data.items()
+            if key != "publish"
+        }
         
-        # Логируем для отладки
-        logger.debug(f"Completeness check: received {len(data)} fields, keys: {list(data.keys())[:10]}")
+        # Вызывается на каждое изменение поля формы - список ключей собираем только при включенном DEBUG
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Completeness check: received %d fields, keys: %s", len(data), list(data)[:10])
         
         completeness = check_document_completeness(data)
-        return JSONResponse(content=completeness)
+        return DocumentJSONResponse(content=completeness)
     except Exception as e:
         log_error(e, "Ошибка проверки полноты из данных формы")
         raise HTTPException(status_code=500, detail=f"Ошибка проверки полноты: {str(e)}")
@@ -244,7 +243,7 @@ async def list_tag_templates():
     """Получить список всех доступных шаблонов для тегов"""
     try:
         templates_list = get_available_templates()
-        return JSONResponse(content=templates_list)
+        return DocumentJSONResponse(content=templates_list)
     except Exception as e:
         log_error(e, "Ошибка получения списка шаблонов тегов")
         raise HTTPException(status_code=500, detail=f"Ошибка получения шаблонов: {str(e)}")
@@ -260,44 +259,44 @@ async def apply_tag_templates(request: Request):
         overwrite = body.get("overwrite", False)
         
         if not tags:
-            return JSONResponse(content=current_data)
+            return DocumentJSONResponse(content=current_data)
         
         # Применяем шаблоны
         updated_data = apply_template_to_data(current_data, tags, overwrite)
-        return JSONResponse(content=updated_data)
+        return DocumentJSONResponse(content=updated_data)
     except Exception as e:
         log_error(e, "Ошибка применения шаблонов тегов")
         raise HTTPException(status_code=500, detail=f"Ошибка применения шаблонов: {str(e)}")
 
 
+# Уровни логирования для сообщений от клиента (неизвестный уровень - INFO)
+CLIENT_LOG_LEVELS = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "WARN": logging.WARNING,
+    "ERROR": logging.ERROR,
+}
+
+
 @router.post("/log/client")
 async def log_from_client(request: Request):
     """API для логирования сообщений от клиента (браузера)"""
     try:
         data = await request.json()
-        level = data.get("level", "INFO").upper()
-        message = data.get("message", "")
-        context = data.get("context", {})
-        
-        # Формируем полное сообщение
-        context_str = ""
-        if context:
-            context_parts = [f"{k}={v}" for k, v in context.items()]
-            context_str = f" | {' | '.join(context_parts)}"
+        level = CLIENT_LOG_LEVELS.get(str(data.get("level", "INFO")).upper(), logging.INFO)
         
-        full_message = f"[CLIENT]{context_str} {message}"
-        
-        # Логируем в зависимости от уровня
-        if level == "DEBUG":
-            logger.debug(full_message)
-        elif level == "INFO":
-            logger.info(full_message)
-        elif level == "WARNING" or level == "WARN":
-            logger.warning(full_message)
-        elif level == "ERROR":
-            logger.error(full_message)
-        else:
-            logger.info(full_message)
+        # Сообщения отфильтрованного уровня не форматируем
+        if logger.isEnabledFor(level):
+            message = data.get("message", "")
+            context = data.get("context", {})
+            
+            # Формируем полное сообщение
+            context_str = ""
+            if context:
+                context_str = " | " + " | ".join(f"{k}={v}" for k, v in context.items())
+            
+            logger.log(level, "[CLIENT]%s %s", context_str, message)
         
         return {"status": "ok"}
     except Exception as e:
@@ -309,55 +308,53 @@ async def log_from_client(request: Request):
 async def log_js_error(request: Request):
     """Endpoint для логирования JavaScript ошибок с клиента"""
     try:
-        try:
-            body = await request.json()
-            error_message = body.get("error_message") or "Unknown error"
-            error_source = body.get("error_source") or "Unknown"
-            error_line = body.get("error_line") or "Unknown"
-            error_col = body.get("error_col") or "Unknown"
-            error_stack = body.get("error_stack") or "No stack trace"
-            user_agent = body.get("user_agent") or "Unknown"
-            url = body.get("url") or "Unknown"
-        except Exception:
-            form_data = await request.form()
-            error_message = form_data.get("error_message", "Unknown error")
-            error_source = form_data.get("error_source", "Unknown")
-            error_line = form_data.get("error_line", "Unknown")
-            error_col = form_data.get("error_col", "Unknown")
-            error_stack = form_data.get("error_stack", "No stack trace")
-            user_agent = form_data.get("user_agent", "Unknown")
-            url = form_data.get("url", "Unknown")
-        
-        user_ip = request.client.host if request.client else "unknown"
-        request_id = getattr(request.state, 'request_id', None) if hasattr(request, 'state') else 'no-request-id'
+        # Клиент (base.html) отправляет JSON - форму разбираем только для других Content-Type,
+        # без заведомо неудачной попытки разобрать тело как JSON
+        if request.headers.get("content-type", "").startswith("application/json"):
+            try:
+                body = await request.json()
+            except ValueError:
+                body = {}
+            if not isinstance(body, dict):
+                body = {}
+        else:
+            body = await request.form()
+        
+        error_message = body.get("error_message") or "Unknown error"
+        error_source = body.get("error_source") or "Unknown"
+        error_line = body.get("error_line") or "Unknown"
+        error_col = body.get("error_col") or "Unknown"
+        error_stack = body.get("error_stack") or "No stack trace"
+        user_agent = body.get("user_agent") or "Unknown"
+        url = body.get("url") or "Unknown"
+        
+        # Значения по умолчанию уже подставлены выше - повторные проверки и поиск в заголовках не нужны
+        # request_id и user_ip уже определены LoggingMiddleware - берем из request.state
+        state = request.state
+        request_id = getattr(state, 'request_id', None)
+        user_ip = getattr(state, 'user_ip', 'unknown')
         
         error_details = {
-            "message": error_message or "Unknown error",
-            "source": error_source or "Unknown",
-            "line": error_line or "Unknown",
-            "column": error_col or "Unknown",
-            "stack": error_stack or "No stack trace",
-            "url": url or str(request.url),
-            "user_agent": user_agent or request.headers.get("user-agent", "Unknown")
+            "message": error_message,
+            "source": error_source,
+            "line": error_line,
+            "column": error_col,
+            "stack": error_stack,
+            "url": url,
+            "user_agent": user_agent
         }
         
-        log_error(
-            error_type="JavaScript Error",
-            error_message=f"JS Error: {error_details['message']}",
-            error_details=error_details,
-            request_id=request_id,
-            user_ip=user_ip
-        )
-        
+        extra = {
+            'request_id': request_id,
+            'user_ip': user_ip,
+            'error_source': error_source,
+            'error_line': error_line,
+            'error_url': url
+        }
         logger.error(
-            f"JavaScript ошибка на клиенте: {error_details['message']}",
-            extra={
-                'request_id': request_id,
-                'user_ip': user_ip,
-                'error_source': error_details['source'],
-                'error_line': error_details['line'],
-                'error_url': error_details['url']
-            }
+            "JavaScript ошибка на клиенте: %s | Детали: %s",
+            error_message, error_details,
+            extra=extra
         )
         
         return JSONResponse({"status": "logged"})
@@ -366,9 +363,39 @@ async def log_js_error(request: Request):
         return JSONResponse({"status": "error", "message": str(e)}, status_code=500)
 
 
+# Максимальный размер загружаемого изображения терминологии (байт)
+TERMINOLOGY_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+# Сообщение об ошибке при превышении максимального размера изображения
+TERMINOLOGY_IMAGE_TOO_LARGE_MESSAGE = f"Размер изображения превышает {TERMINOLOGY_IMAGE_MAX_SIZE // (1024 * 1024)} МБ"
+# Размер порции при копировании загруженного файла на диск (байт)
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Каталог изображений терминологии (создается один раз за время жизни процесса)
+TERMINOLOGY_UPLOAD_DIR = Path("app/static/uploads/terminology")
+_terminology_upload_dir_ready = False
+
+
+def save_upload_file(source: BinaryIO, file_path: Path, max_size: int) -> bool:
+    """Копирование загруженного файла на диск порциями по UPLOAD_CHUNK_SIZE
+
+    Возвращает False (и удаляет недописанный файл), если размер превысил max_size.
+    """
+    total = 0
+    with open(file_path, "wb") as buffer:
+        while chunk := source.read(UPLOAD_CHUNK_SIZE):
+            total += len(chunk)
+            if total > max_size:
+                break
+            buffer.write(chunk)
+    if total > max_size:
+        file_path.unlink(missing_ok=True)
+        return False
+    return True
+
+
 @router.post("/upload-terminology-image")
 async def upload_terminology_image(request: Request, file: UploadFile = File(...)):
     """Endpoint для загрузки изображений терминологии"""
+    global _terminology_upload_dir_ready
     try:
         if not file.content_type or not file.content_type.startswith('image/'):
             return JSONResponse(
@@ -376,16 +403,27 @@ async def upload_terminology_image(request: Request, file: UploadFile = File(...
                 status_code=400
             )
         
-        upload_dir = Path("app/static/uploads/terminology")
-        upload_dir.mkdir(parents=True, exist_ok=True)
+        # Размер уже известен после разбора формы - слишком большой файл отклоняем, не копируя на диск
+        if file.size is not None and file.size > TERMINOLOGY_IMAGE_MAX_SIZE:
+            return JSONResponse(
+                {"status": "error", "message": TERMINOLOGY_IMAGE_TOO_LARGE_MESSAGE},
+                status_code=413
+            )
+        
+        if not _terminology_upload_dir_ready:
+            TERMINOLOGY_UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+            _terminology_upload_dir_ready = True
         
         file_ext = Path(file.filename).suffix if file.filename else '.jpg'
-        unique_filename = f"{uuid.uuid4()}{file_ext}"
-        file_path = upload_dir / unique_filename
+        unique_filename = secrets.token_hex(16) + file_ext
+        file_path = TERMINOLOGY_UPLOAD_DIR / unique_filename
         
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        # Файл копируется порциями в пуле потоков - без чтения целиком в память и без блокировки event loop
+        if not await run_in_threadpool(save_upload_file, file.file, file_path, TERMINOLOGY_IMAGE_MAX_SIZE):
+            return JSONResponse(
+                {"status": "error", "message": TERMINOLOGY_IMAGE_TOO_LARGE_MESSAGE},
+                status_code=413
+            )
         
         static_path = f"/static/uploads/terminology/{unique_filename}"
         logger.info(f"Загружено изображение терминологии: {static_path}")
@@ -403,62 +441,110 @@ async def upload_terminology_image(request: Request, file: UploadFile = File(...
         )
 
 
+# Директория бэкапов (абсолютный путь вычисляется один раз при импорте, а не на каждый запрос)
+BACKUPS_ROOT = Path("backups").resolve()
+
+
+def is_inside_backups_dir(backup_path: Path) -> bool:
+    """Проверка, что путь (после разрешения '..' и ссылок) находится внутри директории бэкапов"""
+    try:
+        backup_path.resolve().relative_to(BACKUPS_ROOT)
+    except ValueError:
+        return False
+    return True
+
+
+def run_database_backup(request_id: str, user_ip: str) -> dict:
+    """Создание бэкапа БД (выполняется фоновой задачей)"""
+    backup_file = create_database_backup()
+    log_user_action(
+        "Создан бэкап базы данных",
+        "anonymous",
+        {"backup_file": backup_file},
+        request_id=request_id,
+        user_ip=user_ip,
+        url="/api/backup/create"
+    )
+    return {"backup_file": backup_file}
+
+
+def run_data_export(request_id: str, user_ip: str) -> dict:
+    """Экспорт всех данных МНТ (выполняется фоновой задачей)"""
+    export_file = export_all_data()
+    log_user_action(
+        "Экспортированы все данные МНТ",
+        "anonymous",
+        {"export_file": export_file},
+        request_id=request_id,
+        user_ip=user_ip,
+        url="/api/backup/export-data"
+    )
+    return {"export_file": export_file}
+
+
+def run_database_restore(backup_file: str, drop_existing: bool, request_id: str, user_ip: str) -> dict:
+    """Восстановление БД из бэкапа (выполняется фоновой задачей)"""
+    restore_database_backup(str(Path("backups") / backup_file), drop_existing=drop_existing)
+    log_user_action(
+        "Восстановлена база данных из бэкапа",
+        "anonymous",
+        {"backup_file": backup_file, "drop_existing": drop_existing},
+        request_id=request_id,
+        user_ip=user_ip,
+        url="/api/backup/restore"
+    )
+    return {"backup_file": backup_file}
+
+
+def task_accepted_response(task_id: str, message: str) -> JSONResponse:
+    """Ответ 202 с ID фоновой задачи и адресом для опроса ее статуса"""
+    return JSONResponse(
+        {
+            "status": "accepted",
+            "message": message,
+            "task_id": task_id,
+            "status_url": f"/api/tasks/{task_id}"
+        },
+        status_code=202
+    )
+
+
 @router.post("/backup/create")
 async def create_backup_endpoint(request: Request):
-    """Создание бэкапа базы данных"""
+    """Создание бэкапа базы данных (в фоне, статус - GET /api/tasks/{task_id})"""
     request_id = getattr(request.state, 'request_id', '-')
     user_ip = getattr(request.state, 'user_ip', '-')
     
-    try:
-        backup_file = create_database_backup()
-        log_user_action(
-            "Создан бэкап базы данных",
-            "anonymous",
-            {"backup_file": backup_file},
-            request_id=request_id,
-            user_ip=user_ip,
-            url="/api/backup/create"
-        )
-        return JSONResponse({
-            "status": "success",
-            "message": "Бэкап успешно создан",
-            "backup_file": backup_file
-        })
-    except Exception as e:
-        log_error(error=e, context="create_backup", request_id=request_id, user_ip=user_ip)
-        return JSONResponse(
-            {"status": "error", "message": f"Ошибка при создании бэкапа: {str(e)}"},
-            status_code=500
-        )
+    task_id = start_background_task(
+        "backup", run_database_backup, request_id, user_ip,
+        request_id=request_id, user_ip=user_ip
+    )
+    return task_accepted_response(task_id, "Создание бэкапа запущено")
 
 
 @router.post("/backup/export-data")
 async def export_data_endpoint(request: Request):
-    """Экспорт всех данных МНТ в архив"""
+    """Экспорт всех данных МНТ в архив (в фоне, статус - GET /api/tasks/{task_id})"""
     request_id = getattr(request.state, 'request_id', '-')
     user_ip = getattr(request.state, 'user_ip', '-')
     
-    try:
-        export_file = export_all_data()
-        log_user_action(
-            "Экспортированы все данные МНТ",
-            "anonymous",
-            {"export_file": export_file},
-            request_id=request_id,
-            user_ip=user_ip,
-            url="/api/backup/export-data"
-        )
-        return JSONResponse({
-            "status": "success",
-            "message": "Данные успешно экспортированы",
-            "export_file": export_file
-        })
-    except Exception as e:
-        log_error(error=e, context="export_data", request_id=request_id, user_ip=user_ip)
+    task_id = start_background_task(
+        "export", run_data_export, request_id, user_ip,
+        request_id=request_id, user_ip=user_ip
+    )
+    return task_accepted_response(task_id, "Экспорт данных запущен")
+
+
+@router.get("/tasks/{task_id}")
+async def get_task_status(task_id: str):
+    """Статус фоновой задачи (бэкап, экспорт, восстановление)"""
+    task = get_background_task(task_id)
+    if task is None:
         return JSONResponse(
-            {"status": "error", "message": f"Ошибка при экспорте данных: {str(e)}"},
-            status_code=500
+            {"status": "error", "message": f"Задача не найдена: {task_id}"},
+            status_code=404
         )
+    return DocumentJSONResponse(task)
 
 
 @router.get("/backup/list")
@@ -468,12 +554,10 @@ async def list_backups_endpoint(request: Request):
     user_ip = getattr(request.state, 'user_ip', '-')
     
     try:
-        backups = list_backups()
-        for backup in backups:
-            if isinstance(backup.get("created_at"), datetime):
-                backup["created_at"] = backup["created_at"].isoformat()
-        
-        return JSONResponse({"status": "success", "backups": backups})
+        # Чтение директории бэкапов - блокирующие системные вызовы, выполняем в пуле потоков
+        backups = await run_in_threadpool(list_backups)
+        # Даты created_at сериализуются в ISO-формат при кодировании ответа
+        return DocumentJSONResponse({"status": "success", "backups": backups})
     except Exception as e:
         log_error(error=e, context="list_backups", request_id=request_id, user_ip=user_ip)
         return JSONResponse(
@@ -488,42 +572,39 @@ async def restore_backup_endpoint(
     backup_file: str = Form(...),
     drop_existing: bool = Form(False)
 ):
-    """Восстановление базы данных из бэкапа"""
+    """Восстановление базы данных из бэкапа (в фоне, статус - GET /api/tasks/{task_id})"""
     request_id = getattr(request.state, 'request_id', '-')
     user_ip = getattr(request.state, 'user_ip', '-')
     
-    try:
-        backup_path = Path("backups") / backup_file
-        
-        log_security_event(
-            event_type="database_restore",
-            description=f"Восстановление базы данных из бэкапа: {backup_file}",
-            severity="critical",
-            details={"backup_file": backup_file, "drop_existing": drop_existing},
-            request_id=request_id,
-            user_ip=user_ip,
-            url="/api/backup/restore"
-        )
-        
-        restore_database_backup(str(backup_path), drop_existing=drop_existing)
-        log_user_action(
-            "Восстановлена база данных из бэкапа",
-            "anonymous",
-            {"backup_file": backup_file, "drop_existing": drop_existing},
-            request_id=request_id,
-            user_ip=user_ip,
-            url="/api/backup/restore"
+    log_security_event(
+        event_type="database_restore",
+        description=f"Восстановление базы данных из бэкапа: {backup_file}",
+        severity="critical",
+        details={"backup_file": backup_file, "drop_existing": drop_existing},
+        request_id=request_id,
+        user_ip=user_ip,
+        url="/api/backup/restore"
+    )
+    
+    backup_path = Path("backups") / backup_file
+    if not is_inside_backups_dir(backup_path):
+        return JSONResponse(
+            {"status": "error", "message": "Недопустимый путь к файлу бэкапа"},
+            status_code=403
         )
-        return JSONResponse({
-            "status": "success",
-            "message": "База данных успешно восстановлена"
-        })
-    except Exception as e:
-        log_error(error=e, context="restore_backup", request_id=request_id, user_ip=user_ip)
+    
+    # Отсутствующий файл сообщаем сразу, не запуская задачу
+    if not backup_path.exists():
         return JSONResponse(
-            {"status": "error", "message": f"Ошибка при восстановлении: {str(e)}"},
-            status_code=500
+            {"status": "error", "message": f"Файл бэкапа не найден: {backup_file}"},
+            status_code=404
         )
+    
+    task_id = start_background_task(
+        "restore", run_database_restore, backup_file, drop_existing, request_id, user_ip,
+        request_id=request_id, user_ip=user_ip
+    )
+    return task_accepted_response(task_id, "Восстановление базы данных запущено")
 
 
 @router.delete("/backup/{backup_filename:path}")
@@ -538,7 +619,7 @@ async def delete_backup_endpoint(request: Request, backup_filename: str):
         if not backup_path.exists():
             raise NotFoundError(f"Файл бэкапа не найден: {backup_filename}")
         
-        if not str(backup_path.resolve()).startswith(str(Path("backups").resolve())):
+        if not is_inside_backups_dir(backup_path):
             raise SecurityError("Недопустимый путь к файлу бэкапа")
         
         delete_backup(str(backup_path))
@@ -1,30 +1,30 @@
 """Главный файл приложения FastAPI - создание app и базовые роуты"""
 from fastapi import FastAPI
 from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse, Response
-from fastapi.staticfiles import StaticFiles
-from starlette.templating import Jinja2Templates
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.exceptions import RequestValidationError
 from sqlalchemy.exc import SQLAlchemyError
+import asyncio
 import os
 
 # Core
-from app.core import check_connection
+from app.core import check_connection, create_templates, CachedStaticFiles, DocumentJSONResponse
 
 # Utils
 from app.utils import (
     AppException, NotFoundError, AppValidationError, DatabaseError, ConfluenceError, SecurityError,
     app_exception_handler, validation_exception_handler, database_exception_handler, general_exception_handler,
-    logger
+    logger, stop_log_listener
 )
 
 # Services
-from app.services import start_scheduler_async
+from app.services import start_scheduler_async, close_confluence_http_client
 
 # Middleware
 from app.middleware import LoggingMiddleware
 
 # Создание FastAPI приложения
-app = FastAPI(title="МНТ Confluence Generator", version="1.0.0")
+app = FastAPI(title="МНТ Confluence Generator", version="1.0.0", default_response_class=DocumentJSONResponse)
 
 # Подключение обработчиков исключений
 app.add_exception_handler(AppException, app_exception_handler)
@@ -33,27 +33,52 @@ app.add_exception_handler(SQLAlchemyError, database_exception_handler)
 app.add_exception_handler(Exception, general_exception_handler)
 
 # Подключение шаблонов (для использования в других роутерах)
-templates = Jinja2Templates(directory="app/templates")
+templates = create_templates()
 
 __all__ = ['app', 'templates']
 
 # Подключение статических файлов
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+app.mount("/static", CachedStaticFiles(directory="app/static"), name="static")
 
 # Подключаем middleware
 app.add_middleware(LoggingMiddleware)
+# Сжатие ответов (HTML, JSON, CSS/JS, потоковые экспорты) - подключается последним, т.е. внешним слоем.
+# Уровень 5 вместо 9 по умолчанию: сжатие почти такое же, а CPU на больших экспортах заметно меньше
+app.add_middleware(GZipMiddleware, minimum_size=512, compresslevel=5)
+
+# Максимальное время ожидания проверки подключения к БД при старте (секунды)
+DB_STARTUP_CHECK_TIMEOUT = 3.0
 
 
 @app.on_event("startup")
 async def startup_event():
     """Проверка подключения к БД при старте и запуск планировщика"""
-    if not check_connection():
-        logger.warning("Database connection failed!")
+    # check_connection синхронный - выполняем в пуле потоков, чтобы не блокировать event loop,
+    # и ограничиваем ожидание, чтобы недоступная БД не подвешивала старт воркера
+    try:
+        loop = asyncio.get_running_loop()
+        connected = await asyncio.wait_for(
+            loop.run_in_executor(None, check_connection),
+            timeout=DB_STARTUP_CHECK_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        logger.warning("Database connection check timed out after %ss", DB_STARTUP_CHECK_TIMEOUT)
+    else:
+        if not connected:
+            logger.warning("Database connection failed!")
     
     # Запускаем планировщик автоматических бэкапов
     await start_scheduler_async()
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Закрытие общего HTTP-клиента Confluence и фонового потока логов при остановке"""
+    await close_confluence_http_client()
+    # Дописываем оставшиеся в очереди записи логов
+    stop_log_listener()
+
+
 @app.get("/favicon.ico")
 async def favicon():
     """Обработчик для favicon.ico - возвращает SVG favicon"""
@@ -1,31 +1,37 @@
 """Роуты для работы с МНТ (HTML страницы и формы)"""
-from fastapi import APIRouter, Depends, HTTPException, Request, Form, File, UploadFile, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Form, Query
 from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, Response, FileResponse
-from starlette.templating import Jinja2Templates
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile as StarletteUploadFile
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from typing import Optional
+from typing import Any, Dict, List, Optional
+import asyncio
+import functools
 import json
 import mimetypes
-import urllib.parse
-from pathlib import Path
+import re
+import threading
+from urllib.parse import quote
+from pathlib import Path, PurePath
 import uuid
 from datetime import datetime
 
 # Core
-from app.core import get_db, MNTDocument
+from app.core import get_db, MNTDocument, create_templates, DocumentJSONResponse
 
 # Services
 from app.services import (
-    create_mnt, get_mnt, update_mnt, list_mnt, get_mnt_with_deleted,
-    update_confluence_info, set_error_status,
+    create_mnt, get_mnt, update_mnt, list_mnt, estimate_mnt_count, count_mnt, resolve_estimated_total,
+    get_mnt_with_deleted,
+    update_confluence_info, update_mnt_published, set_error_status,
     get_confluence_client, ConfluenceClient, is_confluence_configured,
     render_mnt_to_confluence_storage,
     export_to_html, export_to_text,
     soft_delete_mnt, restore_mnt,
     create_document_version, get_latest_version_from_history,
-    get_document_versions, get_document_version,
-    get_document_tags, set_document_tags,
+    get_document_versions, get_document_version, document_version_exists,
+    get_document_tags, set_document_tags, get_all_tag_names, invalidate_autocomplete_cache,
     log_action, get_action_history
 )
 
@@ -38,7 +44,7 @@ from app.utils import (
 )
 
 # Импортируем templates
-templates = Jinja2Templates(directory="app/templates")
+templates = create_templates()
 
 # Создаем роутер для МНТ
 router = APIRouter(prefix="/mnt", tags=["MNT"])
@@ -83,12 +89,8 @@ def create_version_after_save(
         # Версия в mnt.document_versions должна совпадать с версией в "Истории изменений"
         version_number = latest_version
         
-        # Проверяем, не существует ли уже версия с таким номером
-        # get_document_versions возвращает кортеж (versions, total)
-        existing_versions, _ = get_document_versions(db, mnt_id, skip=0, limit=100)
-        existing_version_numbers = [v.get("version_number") for v in existing_versions]
-        
-        if version_number in existing_version_numbers:
+        # Проверяем, не существует ли уже версия с таким номером (точечный запрос вместо списка версий)
+        if document_version_exists(db, mnt_id, version_number):
             # Версия уже существует, пропускаем создание
             logger.debug(f"Версия {version_number} уже существует для МНТ {mnt_id}, пропускаем создание")
             return None
@@ -120,6 +122,134 @@ def create_version_after_save(
         return None
 
 
+# Поля формы МНТ, которые сохраняются в data_json как есть (пустые значения -> None)
+MNT_FORM_FIELDS = (
+    "project_name",
+    "organization_name",
+    "system_version",
+    "history_changes_table",
+    "approval_list_table",
+    "abbreviations_table",
+    "terminology_table",
+    "introduction_text",
+    "goals_business",
+    "goals_technical",
+    "tasks_nt",
+    "limitations_list",
+    "risks_table",
+    "object_general",
+    "performance_requirements",
+    "component_architecture_text",
+    "test_stand_architecture_text",
+    "stand_comparison_table",
+    "planned_tests_intro",
+    "planned_tests_table",
+    "planned_tests_note",
+    "completion_conditions",
+    "database_preparation_text",
+    "database_preparation_table",
+    "load_modeling_principles",
+    "load_profiles_intro",
+    "load_profiles_table",
+    "use_scenarios_intro",
+    "use_scenarios_table",
+    "emulators_description",
+    "monitoring_intro",
+    "monitoring_tools_intro",
+    "monitoring_tools_table",
+    "monitoring_tools_note",
+    "system_resources_intro",
+    "system_resources_table",
+    "business_metrics_intro",
+    "business_metrics_table",
+    "customer_requirements_list",
+    "deliverables_intro",
+    "deliverables_table",
+    "deliverables_working_docs_table",
+    "contacts_table",
+)
+
+# Значения поля publish, при которых публикация не выполняется (после strip().lower())
+PUBLISH_DISABLED_VALUES = ("", "none", "false", "0")
+
+# Сообщение об ошибке для параметра ?error= (URL-кодируется один раз при импорте)
+INVALID_PARENT_ID_ERROR = quote("Некорректный ID родительской страницы Confluence")
+
+# Обязательные поля формы создания/редактирования МНТ
+MNT_REQUIRED_FORM_FIELDS = ("project_name", "organization_name", "system_version", "author", "confluence_space")
+
+
+def get_form_value(form_data, name: str) -> Optional[str]:
+    """Строковое значение поля формы (пустая строка считается отсутствующим значением)"""
+    value = form_data.get(name)
+    if isinstance(value, str) and value != "":
+        return value
+    return None
+
+
+def get_form_int(form_data, name: str) -> Optional[int]:
+    """Целочисленное значение поля формы (ValueError при некорректном значении)"""
+    value = get_form_value(form_data, name)
+    return int(value) if value is not None else None
+
+
+def get_form_file(form_data, name: str) -> Optional[StarletteUploadFile]:
+    """Загруженный файл из формы (если поле содержит файл)"""
+    value = form_data.get(name)
+    return value if isinstance(value, StarletteUploadFile) else None
+
+
+def get_missing_form_fields(form_data) -> List[str]:
+    """Незаполненные обязательные поля формы МНТ (в порядке MNT_REQUIRED_FORM_FIELDS)"""
+    return [name for name in MNT_REQUIRED_FORM_FIELDS if get_form_value(form_data, name) is None]
+
+
+# Ключ пользовательского блока: custom_sections[<id>][<поле>]
+CUSTOM_SECTION_KEY_PATTERN = re.compile(r'^custom_sections\[([^\]]+)\]\[(id|title|position|text|table|list)\]$')
+
+
+def parse_custom_sections(form_data) -> List[Dict[str, Any]]:
+    """Сбор пользовательских блоков из формы за один проход по ключам"""
+    sections: Dict[str, Dict[str, Any]] = {}
+    for key, value in form_data.multi_items():
+        match = CUSTOM_SECTION_KEY_PATTERN.match(key)
+        if match:
+            sections.setdefault(match.group(1), {})[match.group(2)] = value
+    
+    custom_sections = []
+    for section_id, fields in sections.items():
+        # Блок учитывается, только если есть его id и название
+        if 'id' not in fields or not fields.get('title'):
+            continue
+        custom_sections.append({
+            'id': fields['id'],
+            'title': fields['title'],
+            'position': int(fields.get('position') or 15),
+            'text': fields.get('text', ''),
+            'table': fields.get('table', ''),
+            'list': fields.get('list', '')
+        })
+    
+    # Сортируем по position
+    custom_sections.sort(key=lambda x: x['position'])
+    return custom_sections
+
+
+def parse_tags(tags: Optional[str]) -> List[str]:
+    """Список тегов из строки через запятую (пустые значения отбрасываются)"""
+    return list(filter(None, map(str.strip, tags.split(',')))) if tags else []
+
+
+def count_table_rows(table: Optional[str]) -> int:
+    """Количество строк таблицы (строк с разделителем '|'), без построения списка строк"""
+    if not table or '|' not in table:
+        return 0
+    return sum(1 for line in table.splitlines() if '|' in line)
+
+
+# Версия в таблице истории изменений: "X.Y"
+HISTORY_VERSION_PATTERN = re.compile(r'^\s*(\d+)\.(\d+)\s*$')
+
 
 def update_history_changes_table(
     current_history: Optional[str],
@@ -151,36 +281,28 @@ def update_history_changes_table(
         return f"{header}\n{first_entry}"
     
     # Парсим текущую историю
-    lines = current_history.strip().split('\n')
-    if len(lines) < 2:
+    history = current_history.strip()
+    header_end = history.find('\n')
+    if header_end < 0:
         # Если только заголовок, создаем первую запись
         version = "0.1"
-        header = lines[0] if lines else "Дата|Версия|Описание|Автор"
         first_entry = f"{today}|{version}|{description}|{author}"
-        return f"{header}\n{first_entry}"
-    
-    # Находим последнюю версию
-    last_version = "0.1"
-    version_found = False
-    for line in reversed(lines[1:]):  # Пропускаем заголовок
-        if '|' in line and line.strip():
-            parts = line.split('|')
-            if len(parts) >= 2:
-                try:
-                    version_str = parts[1].strip()
-                    version_parts = version_str.split('.')
-                    if len(version_parts) == 2:
-                        major = int(version_parts[0])
-                        minor = int(version_parts[1]) + 1
-                        last_version = f"{major}.{minor}"
-                        version_found = True
-                        break
-                except (ValueError, IndexError):
-                    continue
+        return f"{history}\n{first_entry}"
     
+    # Находим последнюю версию, просматривая строки с конца (без разбиения всей истории на список)
     # Если версия не найдена, начинаем с 0.2
-    if not version_found:
-        last_version = "0.2"
+    last_version = "0.2"
+    end = len(history)
+    while end > header_end:  # Заголовок не просматриваем
+        start = history.rfind('\n', header_end, end)
+        line = history[start + 1:end]
+        end = start
+        parts = line.split('|', 2)
+        if len(parts) >= 2:
+            match = HISTORY_VERSION_PATTERN.match(parts[1])
+            if match:
+                last_version = f"{int(match.group(1))}.{int(match.group(2)) + 1}"
+                break
     
     # Добавляем новую запись
     new_entry = f"{today}|{last_version}|{description}|{author}"
@@ -188,6 +310,71 @@ def update_history_changes_table(
 
 
 
+# Термин, для которого в Confluence загружается изображение max_performance.png (без учета регистра)
+MAX_PERFORMANCE_TERM_PATTERN = re.compile(r'максимальная производительность', re.IGNORECASE)
+
+# Ключевые слова в имени вложения, по которым определяются изображения архитектуры
+COMPONENT_ARCHITECTURE_IMAGE_KEYS = ("component_architecture", "компонентная")
+INFORMATION_ARCHITECTURE_IMAGE_KEYS = ("information_architecture", "информационная")
+
+# Изображение для термина "Максимальная производительность" - статический файл,
+# читаем его один раз при импорте, а не с диска при каждой публикации
+MAX_PERFORMANCE_IMAGE_PATH = Path("app/static/images/max_performance.png")
+MAX_PERFORMANCE_IMAGE_BYTES = MAX_PERFORMANCE_IMAGE_PATH.read_bytes() if MAX_PERFORMANCE_IMAGE_PATH.exists() else None
+
+
+@functools.lru_cache(maxsize=64)
+def guess_image_content_type(extension: str) -> str:
+    """MIME тип изображения по расширению файла (результат кэшируется по расширению)"""
+    return mimetypes.types_map.get(extension, "image/png")
+
+
+async def upload_form_image(confluence_client: ConfluenceClient, page_id: int, image_file: StarletteUploadFile) -> None:
+    """Загрузка изображения из формы во вложения страницы Confluence"""
+    # Передаем файл (SpooledTemporaryFile) без чтения в память - httpx читает его по частям
+    await image_file.seek(0)
+    content_type = image_file.content_type or guess_image_content_type(PurePath(image_file.filename or "").suffix.lower())
+    await confluence_client.upload_attachment(
+        page_id=page_id,
+        filename=image_file.filename,
+        file_content=image_file.file,
+        content_type=content_type
+    )
+
+
+async def upload_max_performance_image(confluence_client: ConfluenceClient, page_id: int) -> None:
+    """Загрузка изображения max_performance.png для терминологии (если его еще нет на странице)"""
+    try:
+        if MAX_PERFORMANCE_IMAGE_BYTES is not None:
+            # Проверяем, существует ли уже это изображение в Confluence
+            try:
+                existing_attachments = await confluence_client.get_attachments(page_id)
+                has_max_performance = any(att.get("title") == "max_performance.png" for att in existing_attachments)
+            except:
+                # Если не удалось получить список вложений, предполагаем, что файла нет
+                has_max_performance = False
+            
+            if not has_max_performance:
+                await confluence_client.upload_attachment(
+                    page_id=page_id,
+                    filename="max_performance.png",
+                    file_content=MAX_PERFORMANCE_IMAGE_BYTES,
+                    content_type="image/png"
+                )
+                logger.info("Загружено изображение max_performance.png для терминологии")
+            else:
+                logger.debug("Изображение max_performance.png уже существует в Confluence, пропускаем загрузку")
+        else:
+            logger.warning(f"Файл {MAX_PERFORMANCE_IMAGE_PATH} не найден")
+    except Exception as e:
+        # Ошибка загрузки изображения не должна блокировать публикацию
+        error_msg = str(e)
+        if "same file name as an existing attachment" in error_msg.lower() or "already exists" in error_msg.lower() or "Cannot add a new attachment with same file name" in error_msg:
+            logger.debug("Изображение max_performance.png уже существует в Confluence, пропускаем загрузку")
+        else:
+            logger.warning(f"Ошибка загрузки изображения max_performance.png (не критично, публикация продолжается): {e}")
+
+
 @router.get("/create", response_class=HTMLResponse)
 async def create_page(request: Request, db: Session = Depends(get_db), error: Optional[str] = None):
     """Страница создания МНТ с предзаполненными дефолтными значениями"""
@@ -210,8 +397,19 @@ async def create_page(request: Request, db: Session = Depends(get_db), error: Op
     })
 
 
+# Сообщения для кодов ошибок в параметре ?error= страницы списка
+LIST_ERROR_MESSAGES = {
+    "confluence_not_configured": "Не удалось удалить МНТ: Confluence недоступен или не настроен. Проверьте настройки в app/core/config.py. Удаление заблокировано, чтобы не допустить потери данных в Confluence.",
+    "already_deleted": "МНТ уже удален.",
+    "delete_failed": "Не удалось удалить МНТ. Попробуйте позже.",
+    "not_deleted": "МНТ не был удален.",
+    "duplicate_failed": "Не удалось продублировать МНТ. Попробуйте позже.",
+    "mnt_not_found": "МНТ не найден."
+}
+
+
 @router.get("/list", response_class=HTMLResponse)
-async def list_page(
+def list_page(
     request: Request, 
     search: Optional[str] = None,
     status: Optional[str] = None,
@@ -228,6 +426,9 @@ async def list_page(
 ):
     """Страница со списком МНТ с пагинацией, фильтрами и сортировкой"""
     skip = (page - 1) * per_page
+    # Точный COUNT(*) нужен только при фильтрах или переходе по страницам,
+    # для первой страницы без фильтров достаточно оценки по статистике таблицы
+    exact_count = bool(search or status or author or tag_id) or page > 1
     documents, total = list_mnt(
         db, 
         search=search,
@@ -237,60 +438,45 @@ async def list_page(
         sort_by=sort_by,
         sort_order=sort_order,
         skip=skip, 
-        limit=per_page
+        limit=per_page,
+        exact_count=exact_count
     )
-    
-    # Получаем все уникальные теги из всех документов для фильтра
-    all_tags_from_db = []
-    tags_set = set()
-    
-    # Извлекаем теги из data_json каждого документа
+    total_is_estimate = total is None
+    if total_is_estimate:
+        total = resolve_estimated_total(estimate_mnt_count(db), skip, len(documents), per_page)
+        if total is None:
+            # Статистика отстает от таблицы - без точного количества следующие страницы были бы недоступны
+            total = count_mnt(db)
+            total_is_estimate = False
+        elif len(documents) < per_page:
+            # Неполная первая страница - количество известно точно
+            total_is_estimate = False
+    
+    # Все уникальные теги для фильтра - одним запросом по всем документам (а не только по текущей странице)
+    all_tags_from_db = [{"name": tag, "id": tag} for tag in get_all_tag_names(db)]
+
+    # Извлекаем теги из data_json каждого документа для отображения
+    # (data_json всегда объект - гарантируется ограничением в схеме БД)
     for doc in documents:
-        # Извлекаем теги из JSONB данных документа
-        doc_json = doc.get("data_json", {})
-        
-        logger.debug(f"Document {doc.get('id')}: data_json type = {type(doc_json)}, keys = {list(doc_json.keys()) if isinstance(doc_json, dict) else 'not a dict'}")
-        
-        if isinstance(doc_json, dict):
-            doc_tags = doc_json.get("tags", [])
-            logger.debug(f"Document {doc.get('id')}: tags from data_json = {doc_tags}, type = {type(doc_tags)}")
-        else:
-            doc_tags = []
-            logger.debug(f"Document {doc.get('id')}: data_json is not a dict, setting tags to empty list")
-        
-        # Добавляем теги в документ для отображения
+        doc_tags = doc["data_json"].get("tags", [])
+
         if isinstance(doc_tags, list) and doc_tags:
             doc["tags"] = [{"name": tag} for tag in doc_tags if tag]
-            logger.debug(f"Document {doc.get('id')}: setting doc['tags'] = {doc['tags']}")
-            # Собираем уникальные теги для фильтра
-            for tag in doc_tags:
-                if tag and isinstance(tag, str) and tag.strip() and tag not in tags_set:
-                    tags_set.add(tag)
-                    all_tags_from_db.append({"name": tag, "id": tag})
         else:
             doc["tags"] = []
-            logger.debug(f"Document {doc.get('id')}: no tags found, setting doc['tags'] = []")
-    
+
     total_pages = (total + per_page - 1) // per_page if total > 0 else 1
     
     # Преобразуем коды ошибок в понятные сообщения
-    error_messages = {
-        "confluence_not_configured": "Не удалось удалить МНТ: Confluence недоступен или не настроен. Проверьте настройки в app/core/config.py. Удаление заблокировано, чтобы не допустить потери данных в Confluence.",
-        "already_deleted": "МНТ уже удален.",
-        "delete_failed": "Не удалось удалить МНТ. Попробуйте позже.",
-        "not_deleted": "МНТ не был удален.",
-        "duplicate_failed": "Не удалось продублировать МНТ. Попробуйте позже.",
-        "mnt_not_found": "МНТ не найден."
-    }
-    
     error_message = None
     if error:
-        error_message = error_messages.get(error, error)
+        error_message = LIST_ERROR_MESSAGES.get(error, error)
     
     return templates.TemplateResponse("list.html", {
         "request": request,
         "documents": documents,
         "total": total,
+        "total_is_estimate": total_is_estimate,
         "search_query": search or "",
         "status_filter": status or "",
         "author_filter": author or "",
@@ -320,48 +506,38 @@ async def edit_page(
 ):
     """Страница редактирования МНТ"""
     try:
-        logger.debug(f"Загрузка страницы редактирования для МНТ {mnt_id}")
-        document = get_mnt(db, mnt_id)
+        logger.debug("Загрузка страницы редактирования для МНТ %s", mnt_id)
+        # Синхронный запрос к БД выполняем в пуле потоков, чтобы не блокировать event loop
+        document = await run_in_threadpool(get_mnt, db, mnt_id)
         if not document:
-            logger.warning(f"МНТ {mnt_id} не найден")
+            logger.warning("МНТ %s не найден", mnt_id)
             raise HTTPException(status_code=404, detail="МНТ не найден")
         
-        logger.debug(f"МНТ {mnt_id} найден, заголовок: {document.get('title')}")
+        logger.debug("МНТ %s найден, заголовок: %s", mnt_id, document.get('title'))
         
         # Получаем список существующих вложений из Confluence (если страница опубликована)
         existing_attachments = []
         if document.get("confluence_page_id"):
             try:
                 confluence_client = get_confluence_client()
-                existing_attachments = await confluence_client.get_attachments(document["confluence_page_id"])
-                logger.debug(f"Получено {len(existing_attachments)} вложений из Confluence")
+                existing_attachments = await confluence_client.get_attachments_cached(document["confluence_page_id"])
+                logger.debug("Получено %s вложений из Confluence", len(existing_attachments))
+            except asyncio.TimeoutError:
+                logger.warning("Confluence не вернул список вложений страницы %s вовремя, страница открыта без них", document['confluence_page_id'])
             except Exception as e:
                 # Если не удалось получить вложения, просто игнорируем ошибку
-                logger.warning(f"Не удалось получить список вложений: {e}", exc_info=True)
+                logger.warning("Не удалось получить список вложений: %s", e, exc_info=True)
         
-        # Убеждаемся, что data_json существует и является словарем
-        data_json = document.get("data_json") or {}
-        if not isinstance(data_json, dict):
-            logger.warning(f"data_json для МНТ {mnt_id} не является словарем, тип: {type(data_json)}")
-            data_json = {}
+        # data_json всегда объект - гарантируется ограничением в схеме БД
+        data_json = document["data_json"]
         
         # Логируем теги при загрузке страницы редактирования
         tags_in_data = data_json.get("tags", [])
-        logger.info(f"EDIT_PAGE: Загрузка страницы редактирования МНТ {mnt_id}, теги в data_json: {tags_in_data} (тип: {type(tags_in_data)})")
+        logger.info("EDIT_PAGE: Загрузка страницы редактирования МНТ %s, теги в data_json: %s (тип: %s)", mnt_id, tags_in_data, type(tags_in_data))
         
-        # Проверяем, есть ли неопубликованные изменения (упрощенная проверка по датам)
-        has_unpublished_changes = False
-        if document.get("status") == "published" and document.get("confluence_page_id"):
-            if document.get("last_publish_at") and document.get("updated_at"):
-                if document["updated_at"] > document["last_publish_at"]:
-                    has_unpublished_changes = True
-                    logger.debug(f"МНТ {mnt_id}: Обнаружены неопубликованные изменения (updated_at > last_publish_at)")
-                else:
-                    logger.debug(f"МНТ {mnt_id}: Нет неопубликованных изменений (updated_at <= last_publish_at)")
-            else:
-                logger.debug(f"МНТ {mnt_id}: Отсутствует last_publish_at или updated_at")
-        else:
-            logger.debug(f"МНТ {mnt_id}: Статус не 'published' или нет confluence_page_id")
+        # Есть ли неопубликованные изменения (updated_at > last_publish_at) - вычисляется в запросе get_mnt
+        has_unpublished_changes = document["has_unpublished_changes"]
+        logger.debug("МНТ %s: неопубликованные изменения: %s", mnt_id, has_unpublished_changes)
         
         # Получаем параметры из query string, если не переданы напрямую
         success_message = success or request.query_params.get("success")
@@ -381,14 +557,14 @@ async def edit_page(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Ошибка при загрузке страницы редактирования МНТ {mnt_id}: {e}", exc_info=True)
+        logger.error("Ошибка при загрузке страницы редактирования МНТ %s: %s", mnt_id, e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Внутренняя ошибка сервера: {str(e)}")
 
 
 # ==================== Helper Functions for Versions ====================
 
-@router.get("/{mnt_id}/view", response_class=JSONResponse)
-async def view_json(mnt_id: int, db: Session = Depends(get_db)):
+@router.get("/{mnt_id}/view", response_class=DocumentJSONResponse)
+def view_json(mnt_id: int, db: Session = Depends(get_db)):
     """Просмотр данных МНТ в JSON формате"""
     try:
         document = get_mnt(db, mnt_id)
@@ -399,15 +575,8 @@ async def view_json(mnt_id: int, db: Session = Depends(get_db)):
         tags = get_document_tags(db, mnt_id)
         document['tags'] = [{'name': tag.name} for tag in tags] if tags else []
         
-        # Преобразуем datetime объекты в строки для JSON сериализации
-        if document.get('created_at'):
-            document['created_at'] = document['created_at'].isoformat() if hasattr(document['created_at'], 'isoformat') else str(document['created_at'])
-        if document.get('updated_at'):
-            document['updated_at'] = document['updated_at'].isoformat() if hasattr(document['updated_at'], 'isoformat') else str(document['updated_at'])
-        if document.get('last_publish_at'):
-            document['last_publish_at'] = document['last_publish_at'].isoformat() if hasattr(document['last_publish_at'], 'isoformat') else str(document['last_publish_at'])
-        
-        return JSONResponse(content=document)
+        # datetime поля сериализуются в ISO-формат при кодировании ответа
+        return DocumentJSONResponse(content=document)
     except HTTPException:
         raise
     except Exception as e:
@@ -417,81 +586,37 @@ async def view_json(mnt_id: int, db: Session = Depends(get_db)):
 @router.post("/create")
 async def handle_create_form(
     request: Request,
-    # Заголовок документа
-    project_name: str = Form(...),
-    organization_name: str = Form(...),
-    system_version: str = Form(...),
-    author: str = Form(...),  # Для истории изменений
-    # Раздел 1: История изменений
-    history_changes_table: Optional[str] = Form(None),
-    change_description: Optional[str] = Form(None),  # Описание изменений для истории
-    # Раздел 2: Лист согласования
-    approval_list_table: Optional[str] = Form(None),
-    # Раздел 3: Сокращения и терминология
-    abbreviations_table: Optional[str] = Form(None),
-    terminology_table: Optional[str] = Form(None),
-    # Раздел 4: Введение
-    introduction_text: Optional[str] = Form(None),
-    # Раздел 5: Цели и задачи НТ
-    goals_business: Optional[str] = Form(None),
-    goals_technical: Optional[str] = Form(None),
-    tasks_nt: Optional[str] = Form(None),
-    # Раздел 6: Ограничения и риски НТ
-    limitations_list: Optional[str] = Form(None),
-    risks_table: Optional[str] = Form(None),
-    # Раздел 7: Объект НТ
-    object_general: Optional[str] = Form(None),
-    performance_requirements: Optional[str] = Form(None),
-    component_architecture_text: Optional[str] = Form(None),
-    component_architecture_image_file: Optional[UploadFile] = File(None),
-    information_architecture_image_file: Optional[UploadFile] = File(None),
-    # Раздел 8: Тестовый и промышленный стенды
-    test_stand_architecture_text: Optional[str] = Form(None),
-    stand_comparison_table: Optional[str] = Form(None),
-    # Раздел 9: Стратегия тестирования
-    planned_tests_intro: Optional[str] = Form(None),
-    planned_tests_table: Optional[str] = Form(None),
-    planned_tests_note: Optional[str] = Form(None),
-    completion_conditions: Optional[str] = Form(None),
-    # Раздел 10: Наполнение БД
-    database_preparation_text: Optional[str] = Form(None),
-    database_preparation_table: Optional[str] = Form(None),
-    # Раздел 11: Моделирование нагрузки
-    load_modeling_principles: Optional[str] = Form(None),
-    load_profiles_intro: Optional[str] = Form(None),
-    load_profiles_table: Optional[str] = Form(None),
-    use_scenarios_intro: Optional[str] = Form(None),
-    use_scenarios_table: Optional[str] = Form(None),
-    emulators_description: Optional[str] = Form(None),
-    # Раздел 12: Мониторинг
-    monitoring_intro: Optional[str] = Form(None),
-    monitoring_tools_intro: Optional[str] = Form(None),
-    monitoring_tools_table: Optional[str] = Form(None),
-    monitoring_tools_note: Optional[str] = Form(None),
-    system_resources_intro: Optional[str] = Form(None),
-    system_resources_table: Optional[str] = Form(None),
-    business_metrics_intro: Optional[str] = Form(None),
-    business_metrics_table: Optional[str] = Form(None),
-    # Раздел 13: Требования к Заказчику
-    customer_requirements_list: Optional[str] = Form(None),
-    # Раздел 14: Материалы
-    deliverables_intro: Optional[str] = Form(None),
-    deliverables_table: Optional[str] = Form(None),
-    deliverables_working_docs_table: Optional[str] = Form(None),
-    # Раздел 15: Контакты
-    contacts_table: Optional[str] = Form(None),
-    # Confluence
-    confluence_space: str = Form(...),
-    confluence_parent_id: Optional[int] = Form(None),
-    publish: Optional[str] = Form(None),  # Если есть - публикуем в Confluence
-    tags: Optional[str] = Form(None),  # Теги через запятую
     db: Session = Depends(get_db)
 ):
     """Обработка формы создания МНТ"""
     request_id = getattr(request.state, 'request_id', generate_request_id())
     user_ip = getattr(request.state, 'user_ip', '-')
     
-    should_publish = publish == "1"
+    # Разбираем форму один раз - все поля берем из form_data
+    form_data = await request.form()
+    
+    missing_fields = get_missing_form_fields(form_data)
+    if missing_fields:
+        error_msg = quote(f"Не заполнены обязательные поля: {', '.join(missing_fields)}")
+        return RedirectResponse(url=f"/mnt/create?error={error_msg}", status_code=303)
+    
+    project_name = get_form_value(form_data, "project_name")
+    author = get_form_value(form_data, "author")  # Для истории изменений
+    history_changes_table = get_form_value(form_data, "history_changes_table")
+    change_description = get_form_value(form_data, "change_description")  # Описание изменений для истории
+    component_architecture_image_file = get_form_file(form_data, "component_architecture_image_file")
+    information_architecture_image_file = get_form_file(form_data, "information_architecture_image_file")
+    confluence_space = get_form_value(form_data, "confluence_space")
+    publish = get_form_value(form_data, "publish")  # Если есть - публикуем в Confluence
+    tags = get_form_value(form_data, "tags")  # Теги через запятую
+    try:
+        confluence_parent_id = get_form_int(form_data, "confluence_parent_id")
+    except ValueError:
+        return RedirectResponse(url=f"/mnt/create?error={INVALID_PARENT_ID_ERROR}", status_code=303)
+    
+    # Нормализуем значение publish один раз (может быть "1", "true", или любое непустое значение)
+    publish_norm = publish.strip().lower() if publish is not None else ""
+    should_publish = publish_norm not in PUBLISH_DISABLED_VALUES
     action_type = "публикация" if should_publish else "создание черновика"
     
     logger.info(
@@ -503,106 +628,11 @@ async def handle_create_form(
         }
     )
     
-    # Обрабатываем пользовательские блоки из формы
-    custom_sections = []
-    form_data = await request.form()
-    
-    # Собираем пользовательские блоки
-    custom_section_ids = set()
-    for key in form_data.keys():
-        if key.startswith('custom_sections[') and '][id]' in key:
-            # Извлекаем ID из ключа: custom_sections[12345][id] -> 12345
-            section_id = key.split('[')[1].split(']')[0]
-            custom_section_ids.add(section_id)
-    
-    for section_id in custom_section_ids:
-        section_data = {
-            'id': form_data.get(f'custom_sections[{section_id}][id]', section_id),
-            'title': form_data.get(f'custom_sections[{section_id}][title]', ''),
-            'position': int(form_data.get(f'custom_sections[{section_id}][position]', 15)),
-            'text': form_data.get(f'custom_sections[{section_id}][text]', ''),
-            'table': form_data.get(f'custom_sections[{section_id}][table]', ''),
-            'list': form_data.get(f'custom_sections[{section_id}][list]', '')
-        }
-        if section_data['title']:  # Добавляем только если есть название
-            custom_sections.append(section_data)
-    
-    # Сортируем по position
-    custom_sections.sort(key=lambda x: x['position'])
-    
     # Формируем данные согласно новой структуре
-    data = {
-        "project_name": project_name,
-        "organization_name": organization_name,
-        "system_version": system_version,
-        "history_changes_table": history_changes_table,
-        "approval_list_table": approval_list_table,
-        "abbreviations_table": abbreviations_table,
-        "terminology_table": terminology_table,
-        "introduction_text": introduction_text,
-        "goals_business": goals_business,
-        "goals_technical": goals_technical,
-        "tasks_nt": tasks_nt,
-        "limitations_list": limitations_list,
-        "risks_table": risks_table,
-        "object_general": object_general,
-        "performance_requirements": performance_requirements,
-        "component_architecture_text": component_architecture_text,
-        "test_stand_architecture_text": test_stand_architecture_text,
-        "stand_comparison_table": stand_comparison_table,
-        "planned_tests_intro": planned_tests_intro,
-        "planned_tests_table": planned_tests_table,
-        "planned_tests_note": planned_tests_note,
-        "completion_conditions": completion_conditions,
-        "database_preparation_text": database_preparation_text,
-        "database_preparation_table": database_preparation_table,
-        "load_modeling_principles": load_modeling_principles,
-        "load_profiles_intro": load_profiles_intro,
-        "load_profiles_table": load_profiles_table,
-        "use_scenarios_intro": use_scenarios_intro,
-        "use_scenarios_table": use_scenarios_table,
-        "emulators_description": emulators_description,
-        "monitoring_intro": monitoring_intro,
-        "monitoring_tools_intro": monitoring_tools_intro,
-        "monitoring_tools_table": monitoring_tools_table,
-        "monitoring_tools_note": monitoring_tools_note,
-        "system_resources_intro": system_resources_intro,
-        "system_resources_table": system_resources_table,
-        "business_metrics_intro": business_metrics_intro,
-        "business_metrics_table": business_metrics_table,
-        "customer_requirements_list": customer_requirements_list,
-        "deliverables_intro": deliverables_intro,
-        "deliverables_table": deliverables_table,
-        "deliverables_working_docs_table": deliverables_working_docs_table,
-        "contacts_table": contacts_table,
-    }
+    data = {name: get_form_value(form_data, name) for name in MNT_FORM_FIELDS}
     
     # Обрабатываем пользовательские блоки из формы
-    custom_sections = []
-    form_data = await request.form()
-    
-    # Собираем пользовательские блоки
-    custom_section_ids = set()
-    for key in form_data.keys():
-        if key.startswith('custom_sections[') and '][id]' in key:
-            # Извлекаем ID из ключа: custom_sections[12345][id] -> 12345
-            section_id = key.split('[')[1].split(']')[0]
-            custom_section_ids.add(section_id)
-    
-    for section_id in custom_section_ids:
-        section_data = {
-            'id': form_data.get(f'custom_sections[{section_id}][id]', section_id),
-            'title': form_data.get(f'custom_sections[{section_id}][title]', ''),
-            'position': int(form_data.get(f'custom_sections[{section_id}][position]', 15)),
-            'text': form_data.get(f'custom_sections[{section_id}][text]', ''),
-            'table': form_data.get(f'custom_sections[{section_id}][table]', ''),
-            'list': form_data.get(f'custom_sections[{section_id}][list]', '')
-        }
-        if section_data['title']:  # Добавляем только если есть название
-            custom_sections.append(section_data)
-    
-    # Сортируем по position
-    custom_sections.sort(key=lambda x: x['position'])
+    custom_sections = parse_custom_sections(form_data)
     
     # Добавляем custom_sections в data
     data["custom_sections"] = custom_sections if custom_sections else None
@@ -618,25 +648,16 @@ async def handle_create_form(
     
     # При создании МНТ: если история уже есть в форме (от JavaScript) - используем её как есть
     # НЕ вызываем update_history_changes_table, чтобы не добавить дубликат
-    if history_changes_table and history_changes_table.strip():
-        # Проверяем, что есть хотя бы заголовок и одна строка данных
-        lines = [l.strip() for l in history_changes_table.strip().split('\n') if l.strip()]
-        if len(lines) >= 2:
-            # Есть заголовок и хотя бы одна строка - используем как есть
-            logger.debug(f"CREATE: Используем историю из формы (строк: {len(lines)-1})")
-            data["history_changes_table"] = history_changes_table
-        else:
-            # Только заголовок - создаем первую запись
-            logger.debug("CREATE: Только заголовок в форме, создаем первую запись")
-            data["history_changes_table"] = update_history_changes_table(
-                current_history=None,
-                author=author,
-                description=change_desc,
-                is_first_entry=True
-            )
+    # Проверяем, что есть хотя бы заголовок и одна строка данных
+    # (нужно только количество непустых строк - списки строк не строим)
+    line_count = sum(1 for line in history_changes_table.splitlines() if line.strip()) if history_changes_table else 0
+    if line_count >= 2:
+        # Есть заголовок и хотя бы одна строка - используем как есть
+        logger.debug("CREATE: Используем историю из формы (строк: %s)", line_count-1)
+        data["history_changes_table"] = history_changes_table
     else:
-        # История пуста - создаем первую запись
-        logger.debug("CREATE: История пуста, создаем первую запись")
+        # История пуста или в ней только заголовок - создаем первую запись
+        logger.debug("CREATE: В форме нет записей истории, создаем первую запись")
         data["history_changes_table"] = update_history_changes_table(
             current_history=None,
             author=author,
@@ -645,23 +666,23 @@ async def handle_create_form(
         )
     
     # Обрабатываем теги - разбиваем строку через запятую и сохраняем как список в JSON
-    logger.info(f"CREATE: Получены теги из формы: '{tags}' (тип: {type(tags)}, repr: {repr(tags)})")
+    logger.debug("CREATE: Получены теги из формы: '%s' (тип: %s, repr: %r)", tags, type(tags), tags)
     
     # Проверяем, что теги не None и не пустая строка
     tags_str = str(tags).strip() if tags is not None else ""
     if tags_str:
-        tag_list = [tag.strip() for tag in tags_str.split(',') if tag.strip()]
+        tag_list = parse_tags(tags_str)
         if tag_list:
             data["tags"] = tag_list
-            logger.info(f"CREATE: Теги из формы успешно обработаны: '{tags}' -> список: {tag_list}")
+            logger.debug("CREATE: Теги из формы успешно обработаны: '%s' -> список: %s", tags, tag_list)
         else:
             data["tags"] = []
             logger.warning(f"CREATE: Теги из формы '{tags}' не содержат валидных значений, устанавливаем пустой список")
     else:
         data["tags"] = []
-        logger.info(f"CREATE: Теги не указаны в форме (tags={repr(tags)}), устанавливаем пустой список")
+        logger.debug("CREATE: Теги не указаны в форме (tags=%r), устанавливаем пустой список", tags)
     
-    logger.info(f"CREATE: Словарь data после обработки тегов содержит tags: {data.get('tags', 'NOT FOUND')} (тип: {type(data.get('tags'))})")
+    logger.debug("CREATE: Словарь data после обработки тегов содержит tags: %s (тип: %s)", data.get('tags', 'NOT FOUND'), type(data.get('tags')))
     
     # Создаем МНТ в БД (используем старую структуру БД для совместимости)
     try:
@@ -679,8 +700,8 @@ async def handle_create_form(
             "author": author,
             **data  # Все новые данные попадают в data_json, включая теги
         }
-        logger.info(f"CREATE: Данные для сохранения включают tags: {mnt_data_for_db.get('tags', 'NOT FOUND')} (тип: {type(mnt_data_for_db.get('tags'))})")
-        logger.info(f"CREATE: Полный словарь mnt_data_for_db содержит ключи: {list(mnt_data_for_db.keys())}")
+        logger.debug("CREATE: Данные для сохранения включают tags: %s (тип: %s)", mnt_data_for_db.get('tags', 'NOT FOUND'), type(mnt_data_for_db.get('tags')))
+        logger.debug("CREATE: Полный словарь mnt_data_for_db содержит ключи: %s", mnt_data_for_db.keys())
         if "tags" not in mnt_data_for_db:
             logger.error("CREATE: КРИТИЧЕСКАЯ ОШИБКА - теги отсутствуют в mnt_data_for_db!")
         result = create_mnt(db, mnt_data_for_db, confluence_space, confluence_parent_id)
@@ -704,38 +725,26 @@ async def handle_create_form(
     except Exception as e:
         log_error(e, "Ошибка создания МНТ")
         # Редиректим на страницу создания с сообщением об ошибке
-        error_msg = urllib.parse.quote(f"Ошибка создания МНТ: {str(e)[:200]}")
+        error_msg = quote(f"Ошибка создания МНТ: {str(e)[:200]}")
         return RedirectResponse(url=f"/mnt/create?error={error_msg}", status_code=303)
     
     # Если не публикуем - статус уже "draft" (установлен при создании)
     # Если нужно опубликовать в Confluence
-    # Проверяем наличие параметра publish (может быть "1", "true", или любое непустое значение)
-    logger.debug(f"ПОЛУЧЕННЫЕ ПАРАМЕТРЫ: publish = {publish!r}, type = {type(publish)}")
-    
-    # Проверяем разные варианты значения publish
-    should_publish = False
-    if publish is not None:
-        publish_str = str(publish).strip()
-        should_publish = publish_str and publish_str.lower() not in ("none", "false", "0", "")
-        logger.debug(f"Обработка publish: '{publish_str}' -> should_publish = {should_publish}")
-    else:
-        logger.debug("publish is None - публикация не требуется")
-    
-    logger.debug(f"ИТОГ: should_publish = {should_publish}")
-    logger.debug(f"confluence_space = {confluence_space}, confluence_parent_id = {confluence_parent_id}")
+    logger.debug("ПОЛУЧЕННЫЕ ПАРАМЕТРЫ: publish = %r -> should_publish = %s", publish, should_publish)
+    logger.debug("confluence_space = %s, confluence_parent_id = %s", confluence_space, confluence_parent_id)
     
     if should_publish:
         # Проверяем что Confluence настроен перед публикацией
         if not is_confluence_configured():
             # МНТ уже создан в БД, но публикация не удалась - сохраняем как черновик
             logger.warning(f"Confluence не настроен - МНТ {mnt_id} сохранен как черновик")
-            warning_msg = urllib.parse.quote(
+            warning_msg = quote(
                 "МНТ успешно создан и сохранен как черновик. Для публикации в Confluence настройте Confluence в app/core/config.py."
             )
             return RedirectResponse(url=f"/mnt/list?warning={warning_msg}&id={mnt_id}", status_code=303)
         
         try:
-            logger.debug(f"Начинаем публикацию МНТ {mnt_id} в Confluence...")
+            logger.debug("Начинаем публикацию МНТ %s в Confluence...", mnt_id)
             confluence_client = get_confluence_client()
             logger.debug("Confluence клиент создан успешно")
             
@@ -758,126 +767,88 @@ async def handle_create_form(
                 information_architecture_image=information_architecture_image_filename,
                 other_images=other_images
             )
-            logger.debug(f"Контент сгенерирован, длина: {len(content)} символов")
+            logger.debug("Контент сгенерирован, длина: %s символов", len(content))
             
             # История изменений уже обновлена выше при сохранении (при создании МНТ)
             # Используем текущую историю из data
             
             # Сначала публикуем в Confluence
-            logger.debug(f"Вызываем confluence_client.create_page с параметрами:")
-            logger.debug(f"  space_key={confluence_space}, title={title_for_db}, parent_id={confluence_parent_id}")
+            logger.debug("Вызываем confluence_client.create_page с параметрами:")
+            logger.debug("  space_key=%s, title=%s, parent_id=%s", confluence_space, title_for_db, confluence_parent_id)
             result_confluence = await confluence_client.create_page(
                 space_key=confluence_space,
                 title=title_for_db,
                 content=content,
                 parent_id=confluence_parent_id
             )
-            logger.debug(f"Страница создана в Confluence: {result_confluence}")
+            logger.debug("Страница создана в Confluence: %s", result_confluence)
             
             page_id = result_confluence["id"]
-            logger.debug(f"Page ID получен: {page_id}")
+            logger.debug("Page ID получен: %s", page_id)
             
             # Загружаем изображения архитектуры в Confluence
+            # и изображение max_performance.png для терминологии, если используется термин "Максимальная производительность".
+            # Загрузки не зависят друг от друга - выполняем их параллельно
+            uploads = []
             if component_architecture_image_file and component_architecture_image_file.filename:
-                try:
-                    file_content = await component_architecture_image_file.read()
-                    content_type = component_architecture_image_file.content_type or mimetypes.guess_type(component_architecture_image_file.filename)[0] or "image/png"
-                    await confluence_client.upload_attachment(
-                        page_id=page_id,
-                        filename=component_architecture_image_file.filename,
-                        file_content=file_content,
-                        content_type=content_type
-                    )
-                except Exception as e:
-                    logger.error(f"Ошибка загрузки изображения компонентной архитектуры: {e}", exc_info=True)
+                uploads.append(("компонентной архитектуры", upload_form_image(confluence_client, page_id, component_architecture_image_file)))
             
             if information_architecture_image_file and information_architecture_image_file.filename:
-                try:
-                    file_content = await information_architecture_image_file.read()
-                    content_type = information_architecture_image_file.content_type or mimetypes.guess_type(information_architecture_image_file.filename)[0] or "image/png"
-                    await confluence_client.upload_attachment(
-                        page_id=page_id,
-                        filename=information_architecture_image_file.filename,
-                        file_content=file_content,
-                        content_type=content_type
-                    )
-                except Exception as e:
-                    logger.error(f"Ошибка загрузки изображения информационной архитектуры: {e}", exc_info=True)
+                uploads.append(("информационной архитектуры", upload_form_image(confluence_client, page_id, information_architecture_image_file)))
             
-            # Загружаем изображение max_performance.png для терминологии, если используется термин "Максимальная производительность"
-            terminology_table = data.get("terminology_table", "")
-            has_max_performance_term = "Максимальная производительность" in terminology_table or "максимальная производительность" in terminology_table.lower()
-            if terminology_table and has_max_performance_term:
-                try:
-                    image_path = Path("app/static/images/max_performance.png")
-                    if image_path.exists():
-                        with open(image_path, "rb") as f:
-                            file_content = f.read()
-                        # Проверяем, существует ли уже это изображение в Confluence
-                        try:
-                            existing_attachments = await confluence_client.get_attachments(page_id)
-                            has_max_performance = any(att.get("title") == "max_performance.png" for att in existing_attachments)
-                        except:
-                            # Если не удалось получить список вложений, предполагаем, что файла нет
-                            has_max_performance = False
-                        
-                        if not has_max_performance:
-                            await confluence_client.upload_attachment(
-                                page_id=page_id,
-                                filename="max_performance.png",
-                                file_content=file_content,
-                                content_type="image/png"
-                            )
-                            logger.info("Загружено изображение max_performance.png для терминологии")
-                        else:
-                            logger.debug("Изображение max_performance.png уже существует в Confluence, пропускаем загрузку")
-                    else:
-                        logger.warning(f"Файл {image_path} не найден")
-                except Exception as e:
-                    # Ошибка загрузки изображения не должна блокировать публикацию
-                    error_msg = str(e)
-                    if "same file name as an existing attachment" in error_msg.lower() or "already exists" in error_msg.lower() or "Cannot add a new attachment with same file name" in error_msg:
-                        logger.debug("Изображение max_performance.png уже существует в Confluence, пропускаем загрузку")
-                    else:
-                        logger.warning(f"Ошибка загрузки изображения max_performance.png (не критично, публикация продолжается): {e}")
+            terminology_table = data.get("terminology_table") or ""
+            if MAX_PERFORMANCE_TERM_PATTERN.search(terminology_table):
+                uploads.append(("max_performance.png", upload_max_performance_image(confluence_client, page_id)))
             
-            # Обновляем данные в БД с новой историей изменений и устанавливаем статус "published"
-            update_mnt(db, mnt_id, {
-                "title": title_for_db,
-                "project": project_for_db,
-                "author": author,
-                **data
-            }, confluence_space, confluence_parent_id, status="published")
+            upload_results = await asyncio.gather(*(upload for _, upload in uploads), return_exceptions=True)
+            for (image_label, _), upload_result in zip(uploads, upload_results):
+                if isinstance(upload_result, Exception):
+                    logger.error(f"Ошибка загрузки изображения {image_label}: {upload_result}", exc_info=upload_result)
             
-            # Обновляем информацию о Confluence странице (это дополнительно устанавливает статус и дату публикации)
-            update_confluence_info(
+            # Сохраняем данные с новой историей изменений и информацию о Confluence странице
+            # (статус "published", дата публикации) одним UPDATE
+            update_mnt_published(
                 db, mnt_id,
+                {
+                    "title": title_for_db,
+                    "project": project_for_db,
+                    "author": author,
+                    **data
+                },
+                confluence_space, confluence_parent_id,
                 page_id=page_id,
                 page_url=result_confluence["url"],
-                status="published"
+                version=result_confluence.get("version", 1),
+                commit=False
             )
             logger.info(f"Успешно опубликовано в Confluence. МНТ ID: {mnt_id}, Page ID: {page_id}")
             # Логируем успешную публикацию
             log_action(db, mnt_id, author or "unknown", "published", 
                       f"МНТ опубликован в Confluence. Page ID: {page_id}",
-                      {"page_id": page_id, "page_url": result_confluence["url"], "space": confluence_space})
+                      {"page_id": page_id, "page_url": result_confluence["url"], "space": confluence_space},
+                      commit=False)
+            # Данные публикации и запись аудита фиксируются одним commit
+            db.commit()
+            invalidate_autocomplete_cache()
             
             # ВЕРСИЯ СОЗДАЕТСЯ ТОЛЬКО ПОСЛЕ УСПЕШНОГО ЗАВЕРШЕНИЯ ВСЕХ ОПЕРАЦИЙ ПУБЛИКАЦИИ
-            # Получаем обновленный документ после публикации для создания версии
-            document_after_publish = get_mnt(db, mnt_id)
-            if document_after_publish:
-                # Создаем версию после успешной публикации
-                create_version_after_save(
-                    db=db,
-                    mnt_id=mnt_id,
-                    document=document_after_publish,
-                    data_json=document_after_publish.get("data_json", {}),
-                    author=author,
-                    status="published",
-                    confluence_page_id=page_id,
-                    confluence_page_url=result_confluence["url"],
-                    last_publish_at=datetime.now()
-                )
+            # Данные документа уже есть локально (только что записаны в БД) - повторно не читаем
+            create_version_after_save(
+                db=db,
+                mnt_id=mnt_id,
+                document={
+                    "title": title_for_db,
+                    "project": project_for_db,
+                    "confluence_space": confluence_space,
+                    "confluence_parent_id": confluence_parent_id
+                },
+                data_json=data,
+                author=author,
+                status="published",
+                confluence_page_id=page_id,
+                confluence_page_url=result_confluence["url"],
+                last_publish_at=datetime.now()
+            )
         except Exception as e:
             # Сохраняем ошибку в БД
             error_msg = str(e)
@@ -889,7 +860,7 @@ async def handle_create_form(
                       f"Ошибка публикации в Confluence: {error_msg[:200]}",
                       {"error": error_msg[:500]})
             # Редиректим на страницу редактирования, чтобы пользователь увидел ошибку
-            error_encoded = urllib.parse.quote(error_msg[:200])
+            error_encoded = quote(error_msg[:200])
             return RedirectResponse(url=f"/mnt/{mnt_id}/edit?error={error_encoded}", status_code=303)
     
     # Редирект на список после успешного создания
@@ -912,81 +883,36 @@ async def handle_create_form(
 async def handle_edit_form(
     request: Request,
     mnt_id: int,
-    # Заголовок документа
-    project_name: str = Form(...),
-    organization_name: str = Form(...),
-    system_version: str = Form(...),
-    author: str = Form(...),  # Для истории изменений
-    # Раздел 1: История изменений
-    history_changes_table: Optional[str] = Form(None),
-    change_description: Optional[str] = Form(None),  # Описание изменений для истории
-    # Раздел 2: Лист согласования
-    approval_list_table: Optional[str] = Form(None),
-    # Раздел 3: Сокращения и терминология
-    abbreviations_table: Optional[str] = Form(None),
-    terminology_table: Optional[str] = Form(None),
-    # Раздел 4: Введение
-    introduction_text: Optional[str] = Form(None),
-    # Раздел 5: Цели и задачи НТ
-    goals_business: Optional[str] = Form(None),
-    goals_technical: Optional[str] = Form(None),
-    tasks_nt: Optional[str] = Form(None),
-    # Раздел 6: Ограничения и риски НТ
-    limitations_list: Optional[str] = Form(None),
-    risks_table: Optional[str] = Form(None),
-    # Раздел 7: Объект НТ
-    object_general: Optional[str] = Form(None),
-    performance_requirements: Optional[str] = Form(None),
-    component_architecture_text: Optional[str] = Form(None),
-    component_architecture_image_file: Optional[UploadFile] = File(None),
-    information_architecture_image_file: Optional[UploadFile] = File(None),
-    # Раздел 8: Тестовый и промышленный стенды
-    test_stand_architecture_text: Optional[str] = Form(None),
-    stand_comparison_table: Optional[str] = Form(None),
-    # Раздел 9: Стратегия тестирования
-    planned_tests_intro: Optional[str] = Form(None),
-    planned_tests_table: Optional[str] = Form(None),
-    planned_tests_note: Optional[str] = Form(None),
-    completion_conditions: Optional[str] = Form(None),
-    # Раздел 10: Наполнение БД
-    database_preparation_text: Optional[str] = Form(None),
-    database_preparation_table: Optional[str] = Form(None),
-    # Раздел 11: Моделирование нагрузки
-    load_modeling_principles: Optional[str] = Form(None),
-    load_profiles_intro: Optional[str] = Form(None),
-    load_profiles_table: Optional[str] = Form(None),
-    use_scenarios_intro: Optional[str] = Form(None),
-    use_scenarios_table: Optional[str] = Form(None),
-    emulators_description: Optional[str] = Form(None),
-    # Раздел 12: Мониторинг
-    monitoring_intro: Optional[str] = Form(None),
-    monitoring_tools_intro: Optional[str] = Form(None),
-    monitoring_tools_table: Optional[str] = Form(None),
-    monitoring_tools_note: Optional[str] = Form(None),
-    system_resources_intro: Optional[str] = Form(None),
-    system_resources_table: Optional[str] = Form(None),
-    business_metrics_intro: Optional[str] = Form(None),
-    business_metrics_table: Optional[str] = Form(None),
-    # Раздел 13: Требования к Заказчику
-    customer_requirements_list: Optional[str] = Form(None),
-    # Раздел 14: Материалы
-    deliverables_intro: Optional[str] = Form(None),
-    deliverables_table: Optional[str] = Form(None),
-    deliverables_working_docs_table: Optional[str] = Form(None),
-    # Раздел 15: Контакты
-    contacts_table: Optional[str] = Form(None),
-    # Confluence
-    confluence_space: str = Form(...),
-    confluence_parent_id: Optional[int] = Form(None),
-    publish: Optional[str] = Form(None),  # Если есть - публикуем в Confluence
-    tags: Optional[str] = Form(None),  # Теги через запятую
     db: Session = Depends(get_db)
 ):
     """Обработка формы редактирования МНТ"""
     request_id = getattr(request.state, 'request_id', generate_request_id())
     user_ip = getattr(request.state, 'user_ip', '-')
     
-    should_publish = publish == "1"
+    # Разбираем форму один раз - все поля берем из form_data
+    form_data = await request.form()
+    
+    missing_fields = get_missing_form_fields(form_data)
+    if missing_fields:
+        error_msg = quote(f"Не заполнены обязательные поля: {', '.join(missing_fields)}")
+        return RedirectResponse(url=f"/mnt/{mnt_id}/edit?error={error_msg}", status_code=303)
+    
+    project_name = get_form_value(form_data, "project_name")
+    author = get_form_value(form_data, "author")  # Для истории изменений
+    history_changes_table = get_form_value(form_data, "history_changes_table")
+    component_architecture_image_file = get_form_file(form_data, "component_architecture_image_file")
+    information_architecture_image_file = get_form_file(form_data, "information_architecture_image_file")
+    confluence_space = get_form_value(form_data, "confluence_space")
+    publish = get_form_value(form_data, "publish")  # Если есть - публикуем в Confluence
+    tags = get_form_value(form_data, "tags")  # Теги через запятую
+    try:
+        confluence_parent_id = get_form_int(form_data, "confluence_parent_id")
+    except ValueError:
+        return RedirectResponse(url=f"/mnt/{mnt_id}/edit?error={INVALID_PARENT_ID_ERROR}", status_code=303)
+    
+    # Нормализуем значение publish один раз
+    publish_norm = publish.strip().lower() if publish is not None else ""
+    should_publish = publish_norm not in PUBLISH_DISABLED_VALUES
     action_type = "публикация" if should_publish else "сохранение изменений"
     
     logger.info(
@@ -1003,115 +929,22 @@ async def handle_edit_form(
         raise HTTPException(status_code=404, detail="МНТ не найден")
     
     # Обрабатываем пользовательские блоки из формы
-    custom_sections = []
-    form_data = await request.form()
-    
-    # Собираем пользовательские блоки
-    custom_section_ids = set()
-    for key in form_data.keys():
-        if key.startswith('custom_sections[') and '][id]' in key:
-            section_id = key.split('[')[1].split(']')[0]
-            custom_section_ids.add(section_id)
-    
-    for section_id in custom_section_ids:
-        section_data = {
-            'id': form_data.get(f'custom_sections[{section_id}][id]', section_id),
-            'title': form_data.get(f'custom_sections[{section_id}][title]', ''),
-            'position': int(form_data.get(f'custom_sections[{section_id}][position]', 15)),
-            'text': form_data.get(f'custom_sections[{section_id}][text]', ''),
-            'table': form_data.get(f'custom_sections[{section_id}][table]', ''),
-            'list': form_data.get(f'custom_sections[{section_id}][list]', '')
-        }
-        if section_data['title']:
-            custom_sections.append(section_data)
-    
-    # Сортируем по position
-    custom_sections.sort(key=lambda x: x['position'])
+    custom_sections = parse_custom_sections(form_data)
     
     # Формируем данные согласно новой структуре
-    data = {
-        "project_name": project_name,
-        "organization_name": organization_name,
-        "system_version": system_version,
-        "history_changes_table": history_changes_table,
-        "approval_list_table": approval_list_table,
-        "abbreviations_table": abbreviations_table,
-        "terminology_table": terminology_table,
-        "introduction_text": introduction_text,
-        "goals_business": goals_business,
-        "goals_technical": goals_technical,
-        "tasks_nt": tasks_nt,
-        "limitations_list": limitations_list,
-        "risks_table": risks_table,
-        "object_general": object_general,
-        "performance_requirements": performance_requirements,
-        "component_architecture_text": component_architecture_text,
-        "test_stand_architecture_text": test_stand_architecture_text,
-        "stand_comparison_table": stand_comparison_table,
-        "planned_tests_intro": planned_tests_intro,
-        "planned_tests_table": planned_tests_table,
-        "planned_tests_note": planned_tests_note,
-        "completion_conditions": completion_conditions,
-        "database_preparation_text": database_preparation_text,
-        "database_preparation_table": database_preparation_table,
-        "load_modeling_principles": load_modeling_principles,
-        "load_profiles_intro": load_profiles_intro,
-        "load_profiles_table": load_profiles_table,
-        "use_scenarios_intro": use_scenarios_intro,
-        "use_scenarios_table": use_scenarios_table,
-        "emulators_description": emulators_description,
-        "monitoring_intro": monitoring_intro,
-        "monitoring_tools_intro": monitoring_tools_intro,
-        "monitoring_tools_table": monitoring_tools_table,
-        "monitoring_tools_note": monitoring_tools_note,
-        "system_resources_intro": system_resources_intro,
-        "system_resources_table": system_resources_table,
-        "business_metrics_intro": business_metrics_intro,
-        "business_metrics_table": business_metrics_table,
-        "customer_requirements_list": customer_requirements_list,
-        "deliverables_intro": deliverables_intro,
-        "deliverables_table": deliverables_table,
-        "deliverables_working_docs_table": deliverables_working_docs_table,
-        "contacts_table": contacts_table,
-    }
-    
-    # Обрабатываем пользовательские блоки из формы
-    custom_sections = []
-    form_data = await request.form()
-    
-    # Собираем пользовательские блоки
-    custom_section_ids = set()
-    for key in form_data.keys():
-        if key.startswith('custom_sections[') and '][id]' in key:
-            section_id = key.split('[')[1].split(']')[0]
-            custom_section_ids.add(section_id)
-    
-    for section_id in custom_section_ids:
-        section_data = {
-            'id': form_data.get(f'custom_sections[{section_id}][id]', section_id),
-            'title': form_data.get(f'custom_sections[{section_id}][title]', ''),
-            'position': int(form_data.get(f'custom_sections[{section_id}][position]', 15)),
-            'text': form_data.get(f'custom_sections[{section_id}][text]', ''),
-            'table': form_data.get(f'custom_sections[{section_id}][table]', ''),
-            'list': form_data.get(f'custom_sections[{section_id}][list]', '')
-        }
-        if section_data['title']:
-            custom_sections.append(section_data)
-    
-    # Сортируем по position
-    custom_sections.sort(key=lambda x: x['position'])
+    data = {name: get_form_value(form_data, name) for name in MNT_FORM_FIELDS}
     
     # Добавляем custom_sections в data
     data["custom_sections"] = custom_sections if custom_sections else None
     
-    # Получаем документ до изменений (нужно сделать это раньше, так как используется ниже)
-    document_before = get_mnt(db, mnt_id)
+    # Документ до изменений - уже загружен выше, повторно из БД не читаем
+    document_before = document
     
     # Обрабатываем теги - разбиваем строку через запятую и сохраняем как список в JSON
     # При редактировании: если теги не указаны в форме, сохраняем существующие из БД
-    logger.debug(f"EDIT: Получены теги из формы: '{tags}' (тип: {type(tags)})")
+    logger.debug("EDIT: Получены теги из формы: '%s' (тип: %s)", tags, type(tags))
     if tags is not None and str(tags).strip():
-        tag_list = [tag.strip() for tag in str(tags).split(',') if tag.strip()]
+        tag_list = parse_tags(str(tags))
         data["tags"] = tag_list
         logger.info(f"EDIT: Теги из формы: '{tags}' -> список: {tag_list}")
     else:
@@ -1120,42 +953,26 @@ async def handle_edit_form(
         if document_before and isinstance(document_before.get("data_json"), dict):
             existing_tags = document_before.get("data_json", {}).get("tags", [])
             if isinstance(existing_tags, list):
-                logger.debug(f"EDIT: Теги не указаны в форме, сохраняем существующие из БД: {existing_tags}")
+                logger.debug("EDIT: Теги не указаны в форме, сохраняем существующие из БД: %s", existing_tags)
             else:
                 existing_tags = []
                 logger.warning(f"EDIT: Существующие теги в БД не являются списком: {type(existing_tags)}")
         data["tags"] = existing_tags
-        logger.debug(f"EDIT: Используем существующие теги из БД: {existing_tags}")
+        logger.debug("EDIT: Используем существующие теги из БД: %s", existing_tags)
     
     # Для совместимости с БД используем project_name как title и project
     title_for_db = project_name
     project_for_db = project_name
     
-    # Определяем, нужно ли публиковать
-    should_publish = publish and str(publish).strip() and str(publish).strip() != "None"
-    logger.debug(f"EDIT: publish parameter = {publish}, should_publish = {should_publish}")
-    
-    # Обновляем историю изменений при редактировании
-    # Проверяем изменения в данных (если еще не проверили выше)
-    if document_before:
-        # Проверка уже выполнена выше при сохранении версии, используем тот же результат
-        if 'has_data_changes' not in locals():
-            old_data = document_before.get("data_json", {})
-            changes = compare_mnt_data(old_data, data)
-            has_data_changes = len(changes) > 0
-    else:
-        has_data_changes = False
+    logger.debug("EDIT: publish parameter = %s, should_publish = %s", publish, should_publish)
     
     # Обновляем историю изменений
     form_history = history_changes_table or ""
     old_history = document_before.get("data_json", {}).get("history_changes_table", "") or "" if document_before else ""
     
     if form_history and form_history.strip():
-        form_lines = [l.strip() for l in form_history.strip().split('\n') if l.strip() and '|' in l]
-        old_lines = [l.strip() for l in old_history.strip().split('\n') if l.strip() and '|' in l] if old_history else []
-        
         # Если в форме больше строк - значит пользователь добавил новую строку
-        if len(form_lines) > len(old_lines):
+        if count_table_rows(form_history) > count_table_rows(old_history):
             data["history_changes_table"] = form_history
         else:
             # История не изменилась - используем старую историю или из формы
@@ -1173,11 +990,11 @@ async def handle_edit_form(
     if should_publish:
         # Публикация - статус установим после успешной публикации
         status_to_set = None
-        logger.debug(f"EDIT: Публикация - статус будет установлен после успешной публикации")
+        logger.debug("EDIT: Публикация - статус будет установлен после успешной публикации")
     else:
         # Явное сохранение без публикации - устанавливаем "draft"
         status_to_set = "draft"
-        logger.debug(f"EDIT: Явное сохранение без публикации - устанавливаем статус 'draft'")
+        logger.debug("EDIT: Явное сохранение без публикации - устанавливаем статус 'draft'")
     
     # Обновляем МНТ в БД
     mnt_data_for_update = {
@@ -1186,7 +1003,7 @@ async def handle_edit_form(
         "author": author,
         **data  # Все новые данные попадают в data_json, включая теги
     }
-    logger.debug(f"EDIT: Данные для обновления включают tags: {mnt_data_for_update.get('tags', 'NOT FOUND')}")
+    logger.debug("EDIT: Данные для обновления включают tags: %s", mnt_data_for_update.get('tags', 'NOT FOUND'))
     update_mnt(db, mnt_id, mnt_data_for_update, confluence_space, confluence_parent_id, status=status_to_set)
     
     log_mnt_operation("Обновление МНТ", mnt_id, author or "unknown")
@@ -1199,12 +1016,16 @@ async def handle_edit_form(
     # Формируем описание изменений
     if changes:
         changes_summary = f"Изменено полей: {len(changes)}"
-        changes_details = {change["field"]: {
-            "field_name": change["field_name"],
-            "type": change["type"],
-            "old": str(change.get("old", ""))[:200] if change.get("old") else None,
-            "new": str(change.get("new", ""))[:200] if change.get("new") else None
-        } for change in changes[:50]}  # Ограничиваем до 50 изменений
+        changes_details = {}
+        for change in changes[:50]:  # Ограничиваем до 50 изменений
+            old_value = change.get("old")
+            new_value = change.get("new")
+            changes_details[change["field"]] = {
+                "field_name": change["field_name"],
+                "type": change["type"],
+                "old": str(old_value)[:200] if old_value else None,
+                "new": str(new_value)[:200] if new_value else None
+            }
     else:
         changes_summary = "Изменений не обнаружено"
         changes_details = {}
@@ -1235,9 +1056,10 @@ async def handle_edit_form(
                         existing_attachments.append(att.get("filename"))
                         # Проверяем, есть ли уже загруженные изображения архитектуры
                         filename = att.get("filename", "")
-                        if "component_architecture" in filename.lower() or "компонентная" in filename.lower():
+                        filename_lower = filename.lower()
+                        if any(key in filename_lower for key in COMPONENT_ARCHITECTURE_IMAGE_KEYS):
                             component_architecture_image_filename = filename
-                        elif "information_architecture" in filename.lower() or "информационная" in filename.lower():
+                        elif any(key in filename_lower for key in INFORMATION_ARCHITECTURE_IMAGE_KEYS):
                             information_architecture_image_filename = filename
                 except Exception as e:
                     logger.warning(f"Не удалось получить существующие вложения: {e}", exc_info=True)
@@ -1283,107 +1105,69 @@ async def handle_edit_form(
                 page_id = result_confluence["id"]
             
             # Загружаем новые изображения архитектуры в Confluence
+            # и изображение max_performance.png для терминологии, если используется термин "Максимальная производительность".
+            # Загрузки не зависят друг от друга - выполняем их параллельно
+            uploads = []
             if component_architecture_image_file and component_architecture_image_file.filename:
-                try:
-                    file_content = await component_architecture_image_file.read()
-                    content_type = component_architecture_image_file.content_type or mimetypes.guess_type(component_architecture_image_file.filename)[0] or "image/png"
-                    await confluence_client.upload_attachment(
-                        page_id=page_id,
-                        filename=component_architecture_image_file.filename,
-                        file_content=file_content,
-                        content_type=content_type
-                    )
-                except Exception as e:
-                    logger.error(f"Ошибка загрузки изображения компонентной архитектуры: {e}", exc_info=True)
+                uploads.append(("компонентной архитектуры", upload_form_image(confluence_client, page_id, component_architecture_image_file)))
             
             if information_architecture_image_file and information_architecture_image_file.filename:
-                try:
-                    file_content = await information_architecture_image_file.read()
-                    content_type = information_architecture_image_file.content_type or mimetypes.guess_type(information_architecture_image_file.filename)[0] or "image/png"
-                    await confluence_client.upload_attachment(
-                        page_id=page_id,
-                        filename=information_architecture_image_file.filename,
-                        file_content=file_content,
-                        content_type=content_type
-                    )
-                except Exception as e:
-                    logger.error(f"Ошибка загрузки изображения информационной архитектуры: {e}", exc_info=True)
+                uploads.append(("информационной архитектуры", upload_form_image(confluence_client, page_id, information_architecture_image_file)))
             
-            # Загружаем изображение max_performance.png для терминологии, если используется термин "Максимальная производительность"
-            terminology_table = data.get("terminology_table", "")
-            has_max_performance_term = "Максимальная производительность" in terminology_table or "максимальная производительность" in terminology_table.lower()
-            if terminology_table and has_max_performance_term:
-                try:
-                    image_path = Path("app/static/images/max_performance.png")
-                    if image_path.exists():
-                        with open(image_path, "rb") as f:
-                            file_content = f.read()
-                        # Проверяем, существует ли уже это изображение в Confluence
-                        try:
-                            existing_attachments = await confluence_client.get_attachments(page_id)
-                            has_max_performance = any(att.get("title") == "max_performance.png" for att in existing_attachments)
-                        except:
-                            # Если не удалось получить список вложений, предполагаем, что файла нет
-                            has_max_performance = False
-                        
-                        if not has_max_performance:
-                            await confluence_client.upload_attachment(
-                                page_id=page_id,
-                                filename="max_performance.png",
-                                file_content=file_content,
-                                content_type="image/png"
-                            )
-                            logger.info("Загружено изображение max_performance.png для терминологии")
-                        else:
-                            logger.debug("Изображение max_performance.png уже существует в Confluence, пропускаем загрузку")
-                    else:
-                        logger.warning(f"Файл {image_path} не найден")
-                except Exception as e:
-                    # Ошибка загрузки изображения не должна блокировать публикацию
-                    error_msg = str(e)
-                    if "same file name as an existing attachment" in error_msg.lower() or "already exists" in error_msg.lower() or "Cannot add a new attachment with same file name" in error_msg:
-                        logger.debug("Изображение max_performance.png уже существует в Confluence, пропускаем загрузку")
-                    else:
-                        logger.warning(f"Ошибка загрузки изображения max_performance.png (не критично, публикация продолжается): {e}")
+            terminology_table = data.get("terminology_table") or ""
+            if MAX_PERFORMANCE_TERM_PATTERN.search(terminology_table):
+                uploads.append(("max_performance.png", upload_max_performance_image(confluence_client, page_id)))
             
-            # Обновляем данные в БД с новой историей изменений и устанавливаем статус "published"
-            update_mnt(db, mnt_id, {
-                "title": title_for_db,
-                "project": project_for_db,
-                "author": author,
-                **data
-            }, confluence_space, confluence_parent_id, status="published")
+            upload_results = await asyncio.gather(*(upload for _, upload in uploads), return_exceptions=True)
+            for (image_label, _), upload_result in zip(uploads, upload_results):
+                if isinstance(upload_result, Exception):
+                    logger.error(f"Ошибка загрузки изображения {image_label}: {upload_result}", exc_info=upload_result)
             
-            # Обновляем информацию о Confluence странице (это дополнительно устанавливает статус и дату публикации)
-            update_confluence_info(
+            # Сохраняем данные с новой историей изменений и информацию о Confluence странице
+            # (статус "published", дата публикации) одним UPDATE
+            update_mnt_published(
                 db, mnt_id,
+                {
+                    "title": title_for_db,
+                    "project": project_for_db,
+                    "author": author,
+                    **data
+                },
+                confluence_space, confluence_parent_id,
                 page_id=page_id,
                 page_url=result_confluence["url"],
-                status="published"
+                version=result_confluence.get("version", 1),
+                commit=False
             )
             
             logger.info(f"EDIT: Успешно опубликовано в Confluence. МНТ ID: {mnt_id}, Page ID: {page_id}")
             # Логируем успешную публикацию
             log_action(db, mnt_id, author or "unknown", "published", 
                       f"МНТ обновлен в Confluence. Page ID: {page_id}",
-                      {"page_id": page_id, "page_url": result_confluence["url"], "space": confluence_space})
+                      {"page_id": page_id, "page_url": result_confluence["url"], "space": confluence_space},
+                      commit=False)
+            # Данные публикации и запись аудита фиксируются одним commit
+            db.commit()
+            invalidate_autocomplete_cache()
             
             # ВЕРСИЯ СОЗДАЕТСЯ ТОЛЬКО ПОСЛЕ УСПЕШНОГО ЗАВЕРШЕНИЯ ВСЕХ ОПЕРАЦИЙ ПУБЛИКАЦИИ
-            # Получаем обновленный документ после публикации для создания версии
-            document_after_publish = get_mnt(db, mnt_id)
-            if document_after_publish:
-                # Создаем версию после успешной публикации
-                create_version_after_save(
-                    db=db,
-                    mnt_id=mnt_id,
-                    document=document_after_publish,
-                    data_json=document_after_publish.get("data_json", {}),
-                    author=author,
-                    status="published",
-                    confluence_page_id=page_id,
-                    confluence_page_url=result_confluence["url"],
-                    last_publish_at=datetime.now()
-                )
+            # Данные документа уже есть локально (только что записаны в БД) - повторно не читаем
+            create_version_after_save(
+                db=db,
+                mnt_id=mnt_id,
+                document={
+                    "title": title_for_db,
+                    "project": project_for_db,
+                    "confluence_space": confluence_space,
+                    "confluence_parent_id": confluence_parent_id
+                },
+                data_json=data,
+                author=author,
+                status="published",
+                confluence_page_id=page_id,
+                confluence_page_url=result_confluence["url"],
+                last_publish_at=datetime.now()
+            )
         except Exception as e:
             error_msg = str(e)
             set_error_status(db, mnt_id, error_msg)
@@ -1393,7 +1177,7 @@ async def handle_edit_form(
                       f"Ошибка публикации в Confluence: {error_msg[:200]}",
                       {"error": error_msg[:500]})
             # Редирект с ошибкой
-            error_encoded = urllib.parse.quote(error_msg[:200])
+            error_encoded = quote(error_msg[:200])
             return RedirectResponse(url=f"/mnt/{mnt_id}/edit?error={error_encoded}", status_code=303)
     
     # Редирект с сообщением об успехе
@@ -1424,41 +1208,43 @@ async def delete_attachment(mnt_id: int, attachment_id: int, db: Session = Depen
     return RedirectResponse(url=f"/mnt/{mnt_id}/edit", status_code=303)
 
 
+# Кэш контента превью: mnt_id -> (updated_at документа, первые PREVIEW_CONTENT_LENGTH символов контента)
+PREVIEW_CONTENT_LENGTH = 5000
+PREVIEW_CACHE_MAX_SIZE = 128
+_preview_content_cache: Dict[int, tuple] = {}
+# preview_mnt выполняется в пуле потоков - вытеснение и запись в кэш под блокировкой
+_preview_content_cache_lock = threading.Lock()
+
+
+def get_preview_content(document: dict) -> str:
+    """Контент превью МНТ (рендер повторяется только если документ изменился)"""
+    mnt_id = document["id"]
+    updated_at = document.get("updated_at")
+    cached = _preview_content_cache.get(mnt_id)
+    if cached is not None and cached[0] == updated_at:
+        return cached[1]
+    
+    content = render_mnt_to_confluence_storage(document.get("data_json", {}))[:PREVIEW_CONTENT_LENGTH]
+    with _preview_content_cache_lock:
+        if mnt_id not in _preview_content_cache and len(_preview_content_cache) >= PREVIEW_CACHE_MAX_SIZE:
+            _preview_content_cache.pop(next(iter(_preview_content_cache)))
+        _preview_content_cache[mnt_id] = (updated_at, content)
+    return content
+
+
 @router.get("/{mnt_id}/preview", response_class=HTMLResponse)
-async def preview_mnt(mnt_id: int, db: Session = Depends(get_db)):
+def preview_mnt(request: Request, mnt_id: int, db: Session = Depends(get_db)):
     """Превью МНТ перед публикацией"""
     document = get_mnt(db, mnt_id)
     if not document:
         raise HTTPException(status_code=404, detail="МНТ не найден")
     
     try:
-        data = document.get("data_json", {})
-        content = render_mnt_to_confluence_storage(data)
-        
-        # Простой HTML превью
-        html_preview = f"""<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>Превью МНТ - {document.get('title', '')}</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; max-width: 1200px; margin: 0 auto; padding: 20px; }}
-        .preview-header {{ background: #f8f9fa; padding: 20px; border-radius: 5px; margin-bottom: 20px; }}
-    </style>
-</head>
-<body>
-    <div class="preview-header">
-        <h1>Превью МНТ</h1>
-        <p><strong>Проект:</strong> {document.get('project', '')}</p>
-        <p><a href="/mnt/{mnt_id}/edit">← Вернуться к редактированию</a></p>
-    </div>
-    <div style="border: 1px solid #ddd; padding: 20px; background: white;">
-        <pre style="white-space: pre-wrap; font-family: inherit;">{content[:5000]}...</pre>
-        <p><em>Это упрощенный превью. Полный контент будет отображаться в Confluence.</em></p>
-    </div>
-</body>
-</html>"""
-        return HTMLResponse(content=html_preview)
+        return templates.TemplateResponse("preview.html", {
+            "request": request,
+            "document": document,
+            "content": get_preview_content(document)
+        })
     except Exception as e:
         log_error(e, f"Ошибка создания превью МНТ #{mnt_id}")
         raise HTTPException(status_code=500, detail=f"Ошибка создания превью: {str(e)}")
@@ -1489,6 +1275,10 @@ async def export_mnt(mnt_id: int, format: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Ошибка экспорта: {str(e)}")
 
 
+# ID тега в списке через запятую: элемент, состоящий только из цифр (пробелы по краям допускаются)
+TAG_ID_PATTERN = re.compile(r'(?:^|,)\s*(\d+)\s*(?=,|$)')
+
+
 @router.post("/{mnt_id}/tags")
 async def update_document_tags(mnt_id: int, tag_ids: str = Form(""), db: Session = Depends(get_db)):
     """Обновление тегов документа"""
@@ -1496,7 +1286,7 @@ async def update_document_tags(mnt_id: int, tag_ids: str = Form(""), db: Session
     if not document:
         raise HTTPException(status_code=404, detail="МНТ не найден")
     
-    tag_id_list = [int(tid) for tid in tag_ids.split(",") if tid.strip() and tid.strip().isdigit()] if tag_ids else []
+    tag_id_list = list(map(int, TAG_ID_PATTERN.findall(tag_ids))) if tag_ids else []
     set_document_tags(db, mnt_id, tag_id_list)
     
     log_mnt_operation("Обновление тегов", mnt_id)
@@ -1507,28 +1297,33 @@ async def update_document_tags(mnt_id: int, tag_ids: str = Form(""), db: Session
 @router.post("/{mnt_id}/delete", response_class=RedirectResponse)
 async def delete_mnt(mnt_id: int, db: Session = Depends(get_db)):
     """Удаление МНТ (soft delete)"""
-    document = get_mnt(db, mnt_id)
-    if not document:
-        raise HTTPException(status_code=404, detail="МНТ не найден")
-    
-    if document.get("deleted_at"):
-        # Уже удален
-        return RedirectResponse(url="/mnt/list?error=already_deleted", status_code=303)
+    # Проверка и мягкое удаление в БД одним запросом. Если Confluence не настроен,
+    # МНТ с опубликованной страницей не удаляется, чтобы не допустить потери данных в Confluence
+    try:
+        deleted = soft_delete_mnt(db, mnt_id, allow_published=is_confluence_configured())
+    except Exception as e:
+        logger.error(f"Ошибка удаления МНТ {mnt_id}: {e}", exc_info=True)
+        return RedirectResponse(url=f"/mnt/list?error=delete_failed&id={mnt_id}", status_code=303)
     
-    # Проверяем доступность Confluence, если есть опубликованная страница
-    confluence_page_id = document.get("confluence_page_id")
-    if confluence_page_id:
-        if not is_confluence_configured():
-            # Confluence недоступен, но есть опубликованная страница - блокируем удаление
-            logger.warning(
-                f"Попытка удаления МНТ {mnt_id} с confluence_page_id={confluence_page_id}, "
-                f"но Confluence credentials не настроены. Удаление заблокировано."
-            )
-            return RedirectResponse(
-                url="/mnt/list?error=confluence_not_configured", 
-                status_code=303
-            )
+    if not deleted:
+        # Ничего не удалено - выясняем причину (редкий путь, отдельный запрос)
+        document = get_mnt_with_deleted(db, mnt_id, include_deleted=True)
+        if not document:
+            raise HTTPException(status_code=404, detail="МНТ не найден")
+        if document.get("deleted_at"):
+            # Уже удален
+            return RedirectResponse(url="/mnt/list?error=already_deleted", status_code=303)
+        # Confluence недоступен, но есть опубликованная страница - удаление заблокировано
+        logger.warning(
+            f"Попытка удаления МНТ {mnt_id} с confluence_page_id={document.get('confluence_page_id')}, "
+            f"но Confluence credentials не настроены. Удаление заблокировано."
+        )
+        return RedirectResponse(
+            url="/mnt/list?error=confluence_not_configured", 
+            status_code=303
+        )
     
+    confluence_page_id = deleted["confluence_page_id"]
     try:
         # Удаляем страницу из Confluence, если она была опубликована
         if confluence_page_id:
@@ -1536,24 +1331,14 @@ async def delete_mnt(mnt_id: int, db: Session = Depends(get_db)):
                 confluence_client = get_confluence_client()
                 await confluence_client.delete_page(confluence_page_id)
                 logger.info(f"Страница {confluence_page_id} удалена из Confluence для МНТ {mnt_id}")
-            except ValueError as e:
-                # Confluence credentials not configured (не должно быть, т.к. проверили выше)
-                logger.error(f"Confluence credentials не настроены для удаления МНТ {mnt_id}: {e}")
-                return RedirectResponse(
-                    url="/mnt/list?error=confluence_not_configured", 
-                    status_code=303
-                )
             except Exception as e:
-                # Если страница уже удалена или другая ошибка - продолжаем soft delete в БД
+                # Если страница уже удалена или другая ошибка - МНТ остается удаленным в БД
                 logger.warning(f"Не удалось удалить страницу из Confluence для МНТ {mnt_id}: {e}")
         
-        # Мягкое удаление в БД
-        soft_delete_mnt(db, mnt_id)
-        
         # Логируем действие
         log_action(
             db, mnt_id, 
-            document.get("author", "unknown"), 
+            deleted.get("author") or "unknown", 
             "deleted",
             f"МНТ удален (soft delete). Страница Confluence {'удалена' if confluence_page_id else 'не была опубликована'}",
             {"confluence_page_id": confluence_page_id}
@@ -1568,18 +1353,20 @@ async def delete_mnt(mnt_id: int, db: Session = Depends(get_db)):
 @router.post("/{mnt_id}/restore", response_class=RedirectResponse)
 async def restore_mnt_endpoint(mnt_id: int, db: Session = Depends(get_db)):
     """Восстановление удаленного МНТ"""
-    document = get_mnt_with_deleted(db, mnt_id, include_deleted=True)
-    if not document:
-        raise HTTPException(status_code=404, detail="МНТ не найден")
+    # Восстанавливаем запись в БД и получаем ее данные одним запросом
+    try:
+        document = restore_mnt(db, mnt_id)
+    except Exception as e:
+        logger.error(f"Ошибка восстановления МНТ {mnt_id}: {e}", exc_info=True)
+        return RedirectResponse(url=f"/mnt/trash?error=restore_failed&id={mnt_id}", status_code=303)
     
-    if not document.get("deleted_at"):
-        # Не удален
+    if not document:
+        # Ничего не восстановлено - МНТ не найден или не был удален
+        if not get_mnt_with_deleted(db, mnt_id, include_deleted=True):
+            raise HTTPException(status_code=404, detail="МНТ не найден")
         return RedirectResponse(url="/mnt/list?error=not_deleted", status_code=303)
     
     try:
-        # Восстанавливаем запись в БД
-        restore_mnt(db, mnt_id)
-        
         # Пересоздаем страницу в Confluence, если она была опубликована до удаления
         # (используем сохраненные данные на момент удаления)
         if document.get("confluence_space") and document.get("data_json"):
@@ -1606,7 +1393,8 @@ async def restore_mnt_endpoint(mnt_id: int, db: Session = Depends(get_db)):
                     db, mnt_id,
                     page_id=result["id"],
                     page_url=result["url"],
-                    status="published"
+                    status="published",
+                    version=1
                 )
                 
                 logger.info(f"МНТ {mnt_id} восстановлен, страница {result['id']} пересоздана в Confluence")
@@ -1738,7 +1526,7 @@ async def duplicate_mnt_endpoint(mnt_id: int, request: Request, db: Session = De
 
 
 @router.get("/trash", response_class=HTMLResponse)
-async def trash_page(
+def trash_page(
     request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
@@ -1774,7 +1562,7 @@ async def trash_page(
 
 
 @router.get("/{mnt_id}/versions", response_class=HTMLResponse)
-async def versions_page(
+def versions_page(
     request: Request,
     mnt_id: int,
     page: int = Query(1, ge=1),
@@ -1810,7 +1598,7 @@ async def versions_page(
 
 
 @router.get("/{mnt_id}/compare", response_class=HTMLResponse)
-async def compare_versions_direct(
+def compare_versions_direct(
     request: Request,
     mnt_id: int,
     version1_id: str = Query(...),
@@ -1859,7 +1647,7 @@ async def compare_versions_direct(
 
 
 @router.get("/{mnt_id}/versions/{version_id}/compare", response_class=HTMLResponse)
-async def compare_version_page(
+def compare_version_page(
     request: Request,
     mnt_id: int,
     version_id: int,
@@ -1,15 +1,19 @@
 """Сервисы приложения: бизнес-логика"""
 from app.services.db_operations import (
-    create_mnt, get_mnt, update_mnt, list_mnt,
-    update_confluence_info, set_error_status,
-    get_tags, create_tag, get_document_tags, set_document_tags,
+    create_mnt, get_mnt, update_mnt, list_mnt, estimate_mnt_count, count_mnt, resolve_estimated_total,
+    update_confluence_info, update_mnt_published, set_error_status,
+    get_tags, create_tag, get_document_tags, set_document_tags, get_all_tag_names,
+    get_autocomplete_values, invalidate_autocomplete_cache,
     log_action, get_action_history,
     soft_delete_mnt, restore_mnt, get_mnt_with_deleted,
     create_document_version, get_latest_version_from_history, increment_version_number,
-    get_document_versions, get_document_version,
+    get_document_versions, get_document_version, document_version_exists,
     log_field_change, get_field_history, get_field_names_for_mnt
 )
-from app.services.confluence import get_confluence_client, ConfluenceClient, is_confluence_configured
+from app.services.confluence import (
+    get_confluence_client, ConfluenceClient, ConfluenceVersionConflict, is_confluence_configured,
+    close_confluence_http_client
+)
 from app.services.render import render_mnt_to_confluence_storage
 from app.services.export import export_to_html, export_to_text
 from app.services.backup import (
@@ -18,19 +22,22 @@ from app.services.backup import (
 )
 from app.services.tag_templates import get_template_data_for_tags, get_available_templates, apply_template_to_data
 from app.services.scheduler import start_scheduler_async
+from app.services.background_tasks import start_background_task, get_background_task
 
 __all__ = [
     # DB operations
-    'create_mnt', 'get_mnt', 'update_mnt', 'list_mnt',
-    'update_confluence_info', 'set_error_status',
-    'get_tags', 'create_tag', 'get_document_tags', 'set_document_tags',
+    'create_mnt', 'get_mnt', 'update_mnt', 'list_mnt', 'estimate_mnt_count', 'count_mnt', 'resolve_estimated_total',
+    'update_confluence_info', 'update_mnt_published', 'set_error_status',
+    'get_tags', 'create_tag', 'get_document_tags', 'set_document_tags', 'get_all_tag_names',
+    'get_autocomplete_values', 'invalidate_autocomplete_cache',
     'log_action', 'get_action_history',
     'soft_delete_mnt', 'restore_mnt', 'get_mnt_with_deleted',
     'create_document_version', 'get_latest_version_from_history', 'increment_version_number',
-    'get_document_versions', 'get_document_version',
+    'get_document_versions', 'get_document_version', 'document_version_exists',
     'log_field_change', 'get_field_history', 'get_field_names_for_mnt',
     # Confluence
-    'get_confluence_client', 'ConfluenceClient', 'is_confluence_configured',
+    'get_confluence_client', 'ConfluenceClient', 'ConfluenceVersionConflict', 'is_confluence_configured',
+    'close_confluence_http_client',
     # Render
     'render_mnt_to_confluence_storage',
     # Export
@@ -42,4 +49,6 @@ __all__ = [
     'get_template_data_for_tags', 'get_available_templates', 'apply_template_to_data',
     # Scheduler
     'start_scheduler_async',
+    # Background tasks
+    'start_background_task', 'get_background_task',
 ]
@@ -0,0 +1,87 @@
+"""Фоновые задачи (бэкап, экспорт, восстановление БД) с опросом статуса по ID"""
+import asyncio
+import functools
+import secrets
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Set
+
+from app.utils.logger import log_error
+
+# Максимальное количество хранимых в памяти задач (самые старые завершенные удаляются)
+BACKGROUND_TASKS_MAX_SIZE = 100
+
+# Состояние задач по ID (в памяти процесса - статус запрашивается у того же воркера, что запустил задачу)
+_tasks: Dict[str, dict] = {}
+# Ссылки на выполняющиеся asyncio-задачи, чтобы их не собрал сборщик мусора
+_running: Set[asyncio.Task] = set()
+
+
+def _trim_finished_tasks() -> None:
+    """Удаление самых старых завершенных задач при превышении BACKGROUND_TASKS_MAX_SIZE"""
+    for task_id in list(_tasks):
+        if len(_tasks) < BACKGROUND_TASKS_MAX_SIZE:
+            break
+        if _tasks[task_id]["status"] != "running":
+            del _tasks[task_id]
+
+
+async def _run_task(
+    task_id: str,
+    func: Callable[[], Any],
+    request_id: Optional[str],
+    user_ip: Optional[str]
+) -> None:
+    """Выполнение задачи в пуле потоков и сохранение результата"""
+    task = _tasks[task_id]
+    loop = asyncio.get_running_loop()
+    try:
+        task["result"] = await loop.run_in_executor(None, func)
+        task["status"] = "done"
+    except Exception as e:
+        log_error(error=e, context=f"Фоновая задача {task['kind']}", request_id=request_id, user_ip=user_ip)
+        task["status"] = "error"
+        task["error"] = str(e)
+    task["finished_at"] = datetime.now()
+
+
+def start_background_task(
+    kind: str,
+    func: Callable[..., Any],
+    *args,
+    request_id: Optional[str] = None,
+    user_ip: Optional[str] = None,
+    **kwargs
+) -> str:
+    """Запуск синхронной функции в фоне (вызывается из event loop)
+
+    Args:
+        kind: Тип задачи (backup, export, restore)
+        func: Синхронная функция; ее результат сохраняется в поле result задачи
+
+    Returns:
+        ID задачи для опроса статуса через get_background_task
+    """
+    _trim_finished_tasks()
+
+    task_id = secrets.token_hex(8)
+    _tasks[task_id] = {
+        "id": task_id,
+        "kind": kind,
+        "status": "running",
+        "result": None,
+        "error": None,
+        "created_at": datetime.now(),
+        "finished_at": None
+    }
+
+    task = asyncio.create_task(
+        _run_task(task_id, functools.partial(func, *args, **kwargs), request_id, user_ip)
+    )
+    _running.add(task)
+    task.add_done_callback(_running.discard)
+    return task_id
+
+
+def get_background_task(task_id: str) -> Optional[dict]:
+    """Состояние фоновой задачи (None, если задача не найдена)"""
+    return _tasks.get(task_id)
@@ -5,7 +5,7 @@ import json
 import zipfile
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator
 import logging
 
 from app.core.config import settings
@@ -197,40 +197,35 @@ def export_all_data(output_file: Optional[str] = None) -> str:
         db.close()
 
 
+# Типы файлов в директории бэкапов по расширению
+BACKUP_FILE_TYPES = {".sql": "database", ".zip": "data_export"}
+
+
+def iter_backups() -> Iterator[Dict[str, Any]]:
+    """Информация о файлах бэкапов (без сортировки) - за один проход по директории"""
+    with os.scandir(BACKUP_DIR) as entries:
+        for entry in entries:
+            backup_type = BACKUP_FILE_TYPES.get(os.path.splitext(entry.name)[1])
+            if backup_type is None or not entry.is_file():
+                continue
+            stat = entry.stat()
+            yield {
+                "filename": entry.name,
+                "path": str(BACKUP_DIR / entry.name),
+                "size_bytes": stat.st_size,
+                "size_mb": round(stat.st_size / (1024 * 1024), 2),
+                "created_at": datetime.fromtimestamp(stat.st_ctime),
+                "type": backup_type
+            }
+
+
 def list_backups() -> List[Dict[str, Any]]:
     """Получение списка всех бэкапов
     
     Returns:
-        Список словарей с информацией о бэкапах
+        Список словарей с информацией о бэкапах (новые первыми)
     """
-    backups = []
-    
-    for file_path in BACKUP_DIR.glob("*.sql"):
-        stat = file_path.stat()
-        backups.append({
-            "filename": file_path.name,
-            "path": str(file_path),
-            "size_bytes": stat.st_size,
-            "size_mb": round(stat.st_size / (1024 * 1024), 2),
-            "created_at": datetime.fromtimestamp(stat.st_ctime),
-            "type": "database"
-        })
-    
-    for file_path in BACKUP_DIR.glob("*.zip"):
-        stat = file_path.stat()
-        backups.append({
-            "filename": file_path.name,
-            "path": str(file_path),
-            "size_bytes": stat.st_size,
-            "size_mb": round(stat.st_size / (1024 * 1024), 2),
-            "created_at": datetime.fromtimestamp(stat.st_ctime),
-            "type": "data_export"
-        })
-    
-    # Сортируем по дате создания (новые первыми)
-    backups.sort(key=lambda x: x["created_at"], reverse=True)
-    
-    return backups
+    return sorted(iter_backups(), key=lambda x: x["created_at"], reverse=True)
 
 
 def delete_backup(backup_file: str) -> bool:
@@ -1,14 +1,116 @@
 """Интеграция с Confluence API"""
 import httpx
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple, BinaryIO, Union
 from app.core.config import settings
+import asyncio
 import base64
 import json
 import io
 import logging
+import time
 
 logger = logging.getLogger("mnt_generator.confluence")
 
+# Кэш списков вложений для страницы редактирования: page_id -> (время получения, вложения)
+ATTACHMENTS_CACHE_TTL = 60.0
+ATTACHMENTS_CACHE_MAX_SIZE = 1024
+# Максимальное время ожидания списка вложений при отображении страницы (секунды)
+ATTACHMENTS_FETCH_TIMEOUT = 2.0
+_attachments_cache: Dict[str, Tuple[float, List[Dict[str, Any]]]] = {}
+
+
+class ConfluenceVersionConflict(Exception):
+    """Конфликт версий при обновлении страницы (Confluence вернул 409)"""
+
+
+# Общий HTTP-клиент для всех запросов к Confluence: TCP/TLS соединения переиспользуются между запросами
+HTTP_MAX_CONNECTIONS = 50
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+_http_client: Optional[httpx.AsyncClient] = None
+
+# Идемпотентные методы: повтор после разрыва соединения не приведет к повторному действию на сервере
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+def is_retryable_request(method: str, error: Exception) -> bool:
+    """Можно ли повторить запрос после сетевой ошибки
+
+    Ошибка записи означает, что запрос не был отправлен целиком (например, соединение из пула
+    уже закрыто сервером) - такой запрос повторяется для любого метода. После ошибки чтения ответа
+    сервер мог уже выполнить запрос, поэтому повторяются только идемпотентные методы
+    (POST создания страниц и загрузки вложений не повторяется, чтобы не создать дубликат).
+    """
+    if isinstance(error, httpx.WriteError):
+        return True
+    return method.upper() in IDEMPOTENT_METHODS
+
+
+class ConfluenceTransport(httpx.AsyncHTTPTransport):
+    """Транспорт для запросов к Confluence: ограничение частоты запросов (max_rps)
+    и однократный повтор запроса, если сервер закрыл простаивающее keep-alive соединение
+    (только когда повтор безопасен - см. is_retryable_request)
+    """
+    
+    def __init__(self, max_rps: float = 0.0, **kwargs):
+        super().__init__(**kwargs)
+        self._min_interval = 1.0 / max_rps if max_rps > 0 else 0.0
+        self._next_slot = 0.0
+        self._slot_lock = asyncio.Lock()
+    
+    async def _wait_for_slot(self) -> None:
+        """Ожидание очереди на отправку запроса (равномерно, не чаще max_rps в секунду)"""
+        if not self._min_interval:
+            return
+        async with self._slot_lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self._min_interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await self._wait_for_slot()
+        try:
+            return await super().handle_async_request(request)
+        except (httpx.RemoteProtocolError, httpx.ReadError, httpx.WriteError) as e:
+            if not is_retryable_request(request.method, e):
+                raise
+            # Соединение из пула оказалось закрыто сервером - повторяем запрос на новом соединении
+            logger.warning("Соединение с Confluence разорвано (%s %s): %s, повторяем запрос", request.method, request.url, e)
+            await self._wait_for_slot()
+            return await super().handle_async_request(request)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Общий httpx.AsyncClient с пулом соединений (создается при первом обращении)"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            transport=ConfluenceTransport(
+                max_rps=settings.confluence_max_rps,
+                retries=2,  # Повтор установки соединения при сетевых сбоях
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS
+                )
+            ),
+            timeout=httpx.Timeout(20.0, connect=10.0)
+        )
+    return _http_client
+
+
+async def close_confluence_http_client() -> None:
+    """Закрытие общего HTTP-клиента Confluence (при остановке приложения)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def invalidate_attachments_cache(page_id) -> None:
+    """Сброс кэшированного списка вложений страницы"""
+    _attachments_cache.pop(str(page_id), None)
+
 
 class ConfluenceClient:
     """Клиент для работы с Confluence API"""
@@ -73,62 +175,62 @@ class ConfluenceClient:
             self.auth[0]: self.auth[1]
         }
         
-        async with httpx.AsyncClient() as client:
-            logger.debug(f"Отправляем POST запрос на {url}")
-            logger.debug(f"body keys = {list(body.keys())}, space_key = {space_key}, title = {title[:50]}...")
-            response = await client.post(url, json=body, headers=headers, timeout=30.0)
-            logger.debug(f"Получен ответ со статусом {response.status_code}")
-            
-            if response.status_code != 200 and response.status_code != 201:
-                error_text = response.text
-                error_message = f"Ошибка Confluence API (код {response.status_code})"
-                
-                try:
-                    error_json = response.json()
-                    # Извлекаем понятное сообщение об ошибке
-                    if isinstance(error_json, dict):
-                        if "message" in error_json:
-                            error_message = error_json["message"]
-                        elif "data" in error_json and isinstance(error_json["data"], dict):
-                            if "errors" in error_json["data"]:
-                                errors = error_json["data"]["errors"]
-                                if isinstance(errors, list) and len(errors) > 0:
-                                    error_message = errors[0].get("message", error_message)
-                        error_text = str(error_json)
-                except:
-                    pass
-                
-                # Формируем понятное сообщение для пользователя
-                if response.status_code == 400:
-                    user_message = f"Неверный запрос к Confluence: {error_message}. Проверьте корректность Space Key, Parent Page ID и других параметров."
-                elif response.status_code == 401:
-                    user_message = "Ошибка аутентификации в Confluence. Проверьте правильность email/token или username/password в настройках."
-                elif response.status_code == 403:
-                    user_message = "Нет прав доступа к Confluence. Убедитесь, что у вас есть права на создание страниц в указанном пространстве."
-                elif response.status_code == 404:
-                    user_message = "Ресурс не найден в Confluence. Проверьте корректность Space Key и Parent Page ID."
-                elif response.status_code == 409:
-                    user_message = "Конфликт в Confluence. Возможно, страница с таким названием уже существует."
-                elif response.status_code >= 500:
-                    user_message = f"Ошибка сервера Confluence (код {response.status_code}). Попробуйте позже или обратитесь к администратору Confluence."
-                else:
-                    user_message = f"Ошибка при обращении к Confluence (код {response.status_code}): {error_message}"
-                
-                logger.error(f"Confluence API ОШИБКА - {response.status_code}: {error_text}")
-                raise Exception(user_message)
-            
-            logger.debug("Страница успешно создана")
+        client = get_http_client()
+        logger.debug(f"Отправляем POST запрос на {url}")
+        logger.debug(f"body keys = {list(body.keys())}, space_key = {space_key}, title = {title[:50]}...")
+        response = await client.post(url, json=body, headers=headers, timeout=30.0)
+        logger.debug(f"Получен ответ со статусом {response.status_code}")
+        
+        if response.status_code != 200 and response.status_code != 201:
+            error_text = response.text
+            error_message = f"Ошибка Confluence API (код {response.status_code})"
             
-            result = response.json()
+            try:
+                error_json = response.json()
+                # Извлекаем понятное сообщение об ошибке
+                if isinstance(error_json, dict):
+                    if "message" in error_json:
+                        error_message = error_json["message"]
+                    elif "data" in error_json and isinstance(error_json["data"], dict):
+                        if "errors" in error_json["data"]:
+                            errors = error_json["data"]["errors"]
+                            if isinstance(errors, list) and len(errors) > 0:
+                                error_message = errors[0].get("message", error_message)
+                    error_text = str(error_json)
+            except:
+                pass
             
-            # Формируем URL страницы
-            page_url = f"{self.base_url}/pages/viewpage.action?pageId={result['id']}"
+            # Формируем понятное сообщение для пользователя
+            if response.status_code == 400:
+                user_message = f"Неверный запрос к Confluence: {error_message}. Проверьте корректность Space Key, Parent Page ID и других параметров."
+            elif response.status_code == 401:
+                user_message = "Ошибка аутентификации в Confluence. Проверьте правильность email/token или username/password в настройках."
+            elif response.status_code == 403:
+                user_message = "Нет прав доступа к Confluence. Убедитесь, что у вас есть права на создание страниц в указанном пространстве."
+            elif response.status_code == 404:
+                user_message = "Ресурс не найден в Confluence. Проверьте корректность Space Key и Parent Page ID."
+            elif response.status_code == 409:
+                user_message = "Конфликт в Confluence. Возможно, страница с таким названием уже существует."
+            elif response.status_code >= 500:
+                user_message = f"Ошибка сервера Confluence (код {response.status_code}). Попробуйте позже или обратитесь к администратору Confluence."
+            else:
+                user_message = f"Ошибка при обращении к Confluence (код {response.status_code}): {error_message}"
             
-            return {
-                "id": result["id"],
-                "url": page_url,
-                "title": result["title"]
-            }
+            logger.error(f"Confluence API ОШИБКА - {response.status_code}: {error_text}")
+            raise Exception(user_message)
+        
+        logger.debug("Страница успешно создана")
+        
+        result = response.json()
+        
+        # Формируем URL страницы
+        page_url = f"{self.base_url}/pages/viewpage.action?pageId={result['id']}"
+        
+        return {
+            "id": result["id"],
+            "url": page_url,
+            "title": result["title"]
+        }
     
     async def update_page(
         self,
@@ -168,49 +270,51 @@ class ConfluenceClient:
             self.auth[0]: self.auth[1]
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.put(url, json=body, headers=headers, timeout=30.0)
-            
-            if response.status_code != 200 and response.status_code != 201:
-                error_text = response.text
-                error_message = f"Ошибка Confluence API (код {response.status_code})"
-                
-                try:
-                    error_json = response.json()
-                    if isinstance(error_json, dict):
-                        if "message" in error_json:
-                            error_message = error_json["message"]
-                        elif "data" in error_json and isinstance(error_json["data"], dict):
-                            if "errors" in error_json["data"]:
-                                errors = error_json["data"]["errors"]
-                                if isinstance(errors, list) and len(errors) > 0:
-                                    error_message = errors[0].get("message", error_message)
-                except:
-                    pass
-                
-                if response.status_code == 409:
-                    user_message = "Конфликт версий в Confluence. Страница была изменена другим пользователем. Обновите страницу и попробуйте снова."
-                elif response.status_code == 404:
-                    user_message = "Страница не найдена в Confluence. Возможно, она была удалена."
-                elif response.status_code == 403:
-                    user_message = "Нет прав на обновление страницы в Confluence."
-                else:
-                    user_message = f"Ошибка обновления страницы в Confluence (код {response.status_code}): {error_message}"
-                
-                logger.error(f"Confluence API ОШИБКА при обновлении - {response.status_code}: {error_text}")
-                raise Exception(user_message)
+        client = get_http_client()
+        response = await client.put(url, json=body, headers=headers, timeout=30.0)
+        
+        if response.status_code != 200 and response.status_code != 201:
+            error_text = response.text
+            error_message = f"Ошибка Confluence API (код {response.status_code})"
             
-            result = response.json()
+            try:
+                error_json = response.json()
+                if isinstance(error_json, dict):
+                    if "message" in error_json:
+                        error_message = error_json["message"]
+                    elif "data" in error_json and isinstance(error_json["data"], dict):
+                        if "errors" in error_json["data"]:
+                            errors = error_json["data"]["errors"]
+                            if isinstance(errors, list) and len(errors) > 0:
+                                error_message = errors[0].get("message", error_message)
+            except:
+                pass
             
-            # Формируем URL страницы
-            page_url = f"{self.base_url}/pages/viewpage.action?pageId={result['id']}"
+            if response.status_code == 409:
+                user_message = "Конфликт версий в Confluence. Страница была изменена другим пользователем. Обновите страницу и попробуйте снова."
+            elif response.status_code == 404:
+                user_message = "Страница не найдена в Confluence. Возможно, она была удалена."
+            elif response.status_code == 403:
+                user_message = "Нет прав на обновление страницы в Confluence."
+            else:
+                user_message = f"Ошибка обновления страницы в Confluence (код {response.status_code}): {error_message}"
             
-            return {
-                "id": result["id"],
-                "url": page_url,
-                "title": result["title"],
-                "version": result["version"]["number"]
-            }
+            logger.error(f"Confluence API ОШИБКА при обновлении - {response.status_code}: {error_text}")
+            if response.status_code == 409:
+                raise ConfluenceVersionConflict(user_message)
+            raise Exception(user_message)
+        
+        result = response.json()
+        
+        # Формируем URL страницы
+        page_url = f"{self.base_url}/pages/viewpage.action?pageId={result['id']}"
+        
+        return {
+            "id": result["id"],
+            "url": page_url,
+            "title": result["title"],
+            "version": result["version"]["number"]
+        }
     
     async def get_page(self, page_id: int, expand: str = "version") -> Dict[str, Any]:
         """
@@ -229,11 +333,11 @@ class ConfluenceClient:
             self.auth[0]: self.auth[1]
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=headers, timeout=30.0)
-            response.raise_for_status()
-            
-            return response.json()
+        client = get_http_client()
+        response = await client.get(url, headers=headers, timeout=30.0)
+        response.raise_for_status()
+        
+        return response.json()
     
     async def get_page_content(self, page_id: int) -> Optional[str]:
         """
@@ -276,7 +380,7 @@ class ConfluenceClient:
         self,
         page_id: int,
         filename: str,
-        file_content: bytes,
+        file_content: Union[bytes, BinaryIO],
         content_type: str = "image/png"
     ) -> Dict[str, Any]:
         """
@@ -285,7 +389,8 @@ class ConfluenceClient:
         Args:
             page_id: ID страницы
             filename: Имя файла
-            file_content: Содержимое файла (bytes)
+            file_content: Содержимое файла (bytes) или файловый объект - он передается
+                в httpx как есть и читается по частям при отправке
             content_type: MIME тип файла
         
         Returns:
@@ -294,8 +399,9 @@ class ConfluenceClient:
         url = f"{self.base_url}/rest/api/content/{page_id}/child/attachment"
         
         # Подготавливаем multipart/form-data
+        file_obj = io.BytesIO(file_content) if isinstance(file_content, bytes) else file_content
         files = {
-            "file": (filename, io.BytesIO(file_content), content_type)
+            "file": (filename, file_obj, content_type)
         }
         
         data = {
@@ -307,50 +413,51 @@ class ConfluenceClient:
             "X-Atlassian-Token": "no-check"  # Требуется для загрузки файлов
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                url,
-                files=files,
-                data=data,
-                headers=headers,
-                timeout=60.0  # Увеличено для больших файлов
-            )
-            
-            if response.status_code != 200 and response.status_code != 201:
-                error_text = response.text
-                try:
-                    error_json = response.json()
-                    # Пытаемся извлечь понятное сообщение об ошибке
-                    if isinstance(error_json, dict):
-                        error_message = error_json.get("message", error_json.get("data", {}).get("message", str(error_json)))
-                        error_text = f"{error_message}"
-                except:
-                    pass
-                
-                # Более понятные сообщения для разных статус-кодов
-                if response.status_code == 400:
-                    raise Exception(f"Ошибка загрузки файла в Confluence (400): Возможно файл с таким именем уже существует или неверный формат данных. Детали: {error_text}")
-                elif response.status_code == 403:
-                    raise Exception(f"Доступ запрещен (403): Проверьте права доступа к странице Confluence. Детали: {error_text}")
-                elif response.status_code == 404:
-                    raise Exception(f"Страница не найдена (404): Проверьте ID страницы Confluence. Детали: {error_text}")
-                else:
-                    raise Exception(f"Confluence API error {response.status_code}: {error_text}")
-            
-            result = response.json()
-            
-            # Получаем информацию о загруженном файле
-            attachments = result.get("results", [])
-            if attachments:
-                attachment = attachments[0]
-                download_url = attachment.get("_links", {}).get("download", "")
-                return {
-                    "id": attachment.get("id"),
-                    "filename": attachment.get("title"),
-                    "download_url": download_url if download_url.startswith("http") else f"{self.base_url}{download_url}"
-                }
+        client = get_http_client()
+        response = await client.post(
+            url,
+            files=files,
+            data=data,
+            headers=headers,
+            timeout=60.0  # Увеличено для больших файлов
+        )
+        
+        if response.status_code != 200 and response.status_code != 201:
+            error_text = response.text
+            try:
+                error_json = response.json()
+                # Пытаемся извлечь понятное сообщение об ошибке
+                if isinstance(error_json, dict):
+                    error_message = error_json.get("message", error_json.get("data", {}).get("message", str(error_json)))
+                    error_text = f"{error_message}"
+            except:
+                pass
             
-            raise Exception("Failed to upload attachment")
+            # Более понятные сообщения для разных статус-кодов
+            if response.status_code == 400:
+                raise Exception(f"Ошибка загрузки файла в Confluence (400): Возможно файл с таким именем уже существует или неверный формат данных. Детали: {error_text}")
+            elif response.status_code == 403:
+                raise Exception(f"Доступ запрещен (403): Проверьте права доступа к странице Confluence. Детали: {error_text}")
+            elif response.status_code == 404:
+                raise Exception(f"Страница не найдена (404): Проверьте ID страницы Confluence. Детали: {error_text}")
+            else:
+                raise Exception(f"Confluence API error {response.status_code}: {error_text}")
+        
+        result = response.json()
+        invalidate_attachments_cache(page_id)
+        
+        # Получаем информацию о загруженном файле
+        attachments = result.get("results", [])
+        if attachments:
+            attachment = attachments[0]
+            download_url = attachment.get("_links", {}).get("download", "")
+            return {
+                "id": attachment.get("id"),
+                "filename": attachment.get("title"),
+                "download_url": download_url if download_url.startswith("http") else f"{self.base_url}{download_url}"
+            }
+        
+        raise Exception("Failed to upload attachment")
     
     async def get_attachments(self, page_id: int) -> List[Dict[str, Any]]:
         """
@@ -368,24 +475,50 @@ class ConfluenceClient:
             self.auth[0]: self.auth[1]
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=headers, timeout=30.0)
-            response.raise_for_status()
-            
-            result = response.json()
-            attachments = result.get("results", [])
-            
-            # Возвращаем упрощенный список с нужной информацией
-            return [
-                {
-                    "id": att.get("id"),
-                    "filename": att.get("title"),
-                    "mediaType": att.get("mediaType"),
-                    "fileSize": att.get("fileSize"),
-                    "downloadUrl": att.get("_links", {}).get("download", "")
-                }
-                for att in attachments
-            ]
+        client = get_http_client()
+        response = await client.get(url, headers=headers, timeout=30.0)
+        response.raise_for_status()
+        
+        result = response.json()
+        attachments = result.get("results", [])
+        
+        # Возвращаем упрощенный список с нужной информацией
+        return [
+            {
+                "id": att.get("id"),
+                "filename": att.get("title"),
+                "mediaType": att.get("mediaType"),
+                "fileSize": att.get("fileSize"),
+                "downloadUrl": att.get("_links", {}).get("download", "")
+            }
+            for att in attachments
+        ]
+    
+    async def get_attachments_cached(self, page_id: int, timeout: float = ATTACHMENTS_FETCH_TIMEOUT) -> List[Dict[str, Any]]:
+        """
+        Получение списка вложений с кэшированием и ограничением времени ожидания
+        
+        Используется только для отображения: при повторном открытии страницы
+        список берется из кэша, а медленный Confluence не задерживает ответ дольше timeout.
+        
+        Args:
+            page_id: ID страницы
+            timeout: Максимальное время ожидания ответа Confluence (секунды)
+        
+        Returns:
+            Список вложений
+        """
+        key = str(page_id)
+        now = time.monotonic()
+        cached = _attachments_cache.get(key)
+        if cached and now - cached[0] < ATTACHMENTS_CACHE_TTL:
+            return cached[1]
+        
+        attachments = await asyncio.wait_for(self.get_attachments(page_id), timeout=timeout)
+        if len(_attachments_cache) >= ATTACHMENTS_CACHE_MAX_SIZE:
+            _attachments_cache.clear()
+        _attachments_cache[key] = (now, attachments)
+        return attachments
     
     async def delete_page(self, page_id: int) -> None:
         """
@@ -400,24 +533,25 @@ class ConfluenceClient:
             self.auth[0]: self.auth[1]
         }
         
-        async with httpx.AsyncClient() as client:
-            logger.debug(f"Удаление страницы {page_id} из Confluence")
-            response = await client.delete(url, headers=headers, timeout=30.0)
-            
-            if response.status_code == 204:
-                logger.info(f"Страница {page_id} успешно удалена из Confluence")
-            elif response.status_code == 404:
-                logger.warning(f"Страница {page_id} не найдена в Confluence (возможно, уже удалена)")
-            else:
-                error_message = f"Ошибка удаления страницы {page_id} из Confluence (код {response.status_code})"
-                try:
-                    error_json = response.json()
-                    if isinstance(error_json, dict) and "message" in error_json:
-                        error_message = error_json["message"]
-                except:
-                    pass
-                logger.error(f"{error_message}: {response.text}")
-                response.raise_for_status()
+        client = get_http_client()
+        logger.debug(f"Удаление страницы {page_id} из Confluence")
+        response = await client.delete(url, headers=headers, timeout=30.0)
+        
+        invalidate_attachments_cache(page_id)
+        if response.status_code == 204:
+            logger.info(f"Страница {page_id} успешно удалена из Confluence")
+        elif response.status_code == 404:
+            logger.warning(f"Страница {page_id} не найдена в Confluence (возможно, уже удалена)")
+        else:
+            error_message = f"Ошибка удаления страницы {page_id} из Confluence (код {response.status_code})"
+            try:
+                error_json = response.json()
+                if isinstance(error_json, dict) and "message" in error_json:
+                    error_message = error_json["message"]
+            except:
+                pass
+            logger.error(f"{error_message}: {response.text}")
+            response.raise_for_status()
     
     async def delete_attachment(self, page_id: int, attachment_id: int) -> None:
         """
@@ -434,14 +568,21 @@ class ConfluenceClient:
             self.auth[0]: self.auth[1]
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(url, headers=headers, timeout=30.0)
-            response.raise_for_status()
+        client = get_http_client()
+        response = await client.delete(url, headers=headers, timeout=30.0)
+        response.raise_for_status()
+        invalidate_attachments_cache(page_id)
+
+
+_confluence_client: Optional[ConfluenceClient] = None
 
 
 def get_confluence_client() -> ConfluenceClient:
-    """Получение клиента Confluence"""
-    return ConfluenceClient()
+    """Получение клиента Confluence (один экземпляр на процесс, HTTP-соединения общие)"""
+    global _confluence_client
+    if _confluence_client is None:
+        _confluence_client = ConfluenceClient()
+    return _confluence_client
 
 
 def is_confluence_configured() -> bool:
@@ -5,9 +5,20 @@ from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
 import json
 import re
+import time
 from app.core.models import MNTDocument, MNTStatus
 from app.utils.logger import logger
 
+# Кодировщик для параметров JSONB-колонок: создается один раз (json.dumps с нестандартными
+# параметрами создает новый JSONEncoder на каждый вызов), без пробелов - PostgreSQL все равно
+# хранит JSONB в разобранном виде
+_jsonb_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def dump_jsonb(value: Any) -> str:
+    """Сериализация значения для записи в JSONB-колонку"""
+    return _jsonb_encoder.encode(value)
+
 
 def create_mnt(db: Session, data: dict, confluence_space: str, confluence_parent_id: Optional[int] = None) -> dict:
     """Создание нового МНТ в БД"""
@@ -30,12 +41,13 @@ def create_mnt(db: Session, data: dict, confluence_space: str, confluence_parent
         "title": data.get("title", ""),
         "project": data.get("project", ""),
         "author": data.get("author", ""),
-        "data_json": json.dumps(data_for_json, ensure_ascii=False),
+        "data_json": dump_jsonb(data_for_json),
         "confluence_space": confluence_space,
         "confluence_parent_id": confluence_parent_id,
         "status": "draft"
     })
     db.commit()
+    invalidate_autocomplete_cache()
     
     row = result.fetchone()
     return {
@@ -50,7 +62,10 @@ def get_mnt(db: Session, mnt_id: int) -> Optional[dict]:
     query = text("""
         SELECT id, title, project, author, created_at, updated_at, status, data_json,
                confluence_space, confluence_parent_id, confluence_page_id, confluence_page_url,
-               last_publish_at, last_error
+               last_publish_at, last_error, confluence_version,
+               -- Есть изменения после последней публикации (считаем в том же запросе)
+               COALESCE(status = 'published' AND confluence_page_id IS NOT NULL
+                        AND updated_at > last_publish_at, FALSE) AS has_unpublished_changes
         FROM mnt.documents
         WHERE id = :id
     """)
@@ -85,7 +100,9 @@ def get_mnt(db: Session, mnt_id: int) -> Optional[dict]:
         "confluence_page_id": row[10],
         "confluence_page_url": row[11],
         "last_publish_at": row[12],
-        "last_error": row[13]
+        "last_error": row[13],
+        "confluence_version": row[14],
+        "has_unpublished_changes": row[15]
     }
 
 
@@ -123,7 +140,7 @@ def update_mnt(db: Session, mnt_id: int, data: dict, confluence_space: str, conf
             "title": data.get("title", ""),
             "project": data.get("project", ""),
             "author": data.get("author", ""),
-            "data_json": json.dumps(data_for_json, ensure_ascii=False),
+            "data_json": dump_jsonb(data_for_json),
             "confluence_space": confluence_space,
             "confluence_parent_id": confluence_parent_id,
             "status": status
@@ -145,17 +162,30 @@ def update_mnt(db: Session, mnt_id: int, data: dict, confluence_space: str, conf
             "title": data.get("title", ""),
             "project": data.get("project", ""),
             "author": data.get("author", ""),
-            "data_json": json.dumps(data_for_json, ensure_ascii=False),
+            "data_json": dump_jsonb(data_for_json),
             "confluence_space": confluence_space,
             "confluence_parent_id": confluence_parent_id
         }
     
     result = db.execute(query, params)
     db.commit()
+    invalidate_autocomplete_cache()
     
     return result.rowcount > 0
 
 
+# Допустимые колонки сортировки списка МНТ
+VALID_SORT_COLUMNS = {
+    "id": "d.id",
+    "title": "d.title",
+    "project": "d.project",
+    "author": "d.author",
+    "created_at": "d.created_at",
+    "updated_at": "d.updated_at",
+    "status": "d.status"
+}
+
+
 def list_mnt(
     db: Session, 
     skip: int = 0, 
@@ -166,9 +196,14 @@ def list_mnt(
     tag_id: Optional[str] = None,  # Изменено на str для поиска по тексту
     sort_by: Optional[str] = None,
     sort_order: Optional[str] = "desc",
-    include_deleted: bool = False  # Если True - показывать только удаленные, если False - только не удаленные
-) -> tuple[List[dict], int]:
-    """Список МНТ с пагинацией, поиском, фильтрами и сортировкой"""
+    include_deleted: bool = False,  # Если True - показывать только удаленные, если False - только не удаленные
+    exact_count: bool = True  # Если False - COUNT(*) не выполняется, total может быть None
+) -> tuple[List[dict], Optional[int]]:
+    """Список МНТ с пагинацией, поиском, фильтрами и сортировкой
+
+    При exact_count=False общее количество известно только если вся выборка уместилась
+    на первую страницу, иначе возвращается None (оценку дает estimate_mnt_count).
+    """
     # Формируем условия поиска и фильтров
     conditions = []
     search_params = {}
@@ -233,27 +268,13 @@ def list_mnt(
     else:
         search_condition = ""
     
-    # Получаем общее количество
-    count_query = text(f"SELECT COUNT(DISTINCT d.id) {from_clause} {search_condition}")
-    total_result = db.execute(count_query, search_params)
-    total = total_result.scalar()
-    
     # Валидация и формирование сортировки
-    valid_sort_columns = {
-        "id": "d.id",
-        "title": "d.title",
-        "project": "d.project",
-        "author": "d.author",
-        "created_at": "d.created_at",
-        "updated_at": "d.updated_at",
-        "status": "d.status"
-    }
-    sort_column = valid_sort_columns.get(sort_by, "d.created_at")
+    sort_column = VALID_SORT_COLUMNS.get(sort_by, "d.created_at")
     sort_dir = "DESC" if sort_order.lower() == "desc" else "ASC"
     
-    # Получаем список
+    # Получаем список одним запросом (без DISTINCT: он заставлял БД сравнивать целые строки, включая data_json)
     query = text(f"""
-        SELECT DISTINCT d.id, d.title, d.project, d.author, d.created_at, d.updated_at, d.status, 
+        SELECT d.id, d.title, d.project, d.author, d.created_at, d.updated_at, d.status, 
                d.confluence_space, d.confluence_page_id, d.confluence_page_url, d.data_json,
                d.last_publish_at, d.last_error, d.deleted_at
         {from_clause}
@@ -266,20 +287,20 @@ def list_mnt(
     result = db.execute(query, query_params)
     rows = result.fetchall()
     
+    # Получаем общее количество
+    if skip == 0 and len(rows) < limit:
+        # Вся выборка уместилась на первую страницу - отдельный COUNT не нужен
+        total = len(rows)
+    elif exact_count:
+        # (JOIN-ов нет, строки не дублируются - DISTINCT не нужен)
+        count_query = text(f"SELECT COUNT(*) {from_clause} {search_condition}")
+        total = db.execute(count_query, search_params).scalar()
+    else:
+        total = None
+    
     documents = []
     for row in rows:
-        # Обрабатываем data_json
-        data_json_value = row[10] if len(row) > 10 else None
-        data_json_dict = {}
-        if data_json_value:
-            if isinstance(data_json_value, dict):
-                data_json_dict = data_json_value
-            elif isinstance(data_json_value, str):
-                try:
-                    data_json_dict = json.loads(data_json_value)
-                except:
-                    data_json_dict = {}
-        
+        # data_json - JSONB-объект (ограничение в схеме БД), драйвер возвращает его как dict
         documents.append({
             "id": row[0],
             "title": row[1],
@@ -291,7 +312,7 @@ def list_mnt(
             "confluence_space": row[7],
             "confluence_page_id": row[8],
             "confluence_page_url": row[9],
-            "data_json": data_json_dict,
+            "data_json": row[10],
             "last_publish_at": row[11] if len(row) > 11 else None,
             "last_error": row[12] if len(row) > 12 else None,
             "deleted_at": row[13] if len(row) > 13 else None
@@ -300,12 +321,57 @@ def list_mnt(
     return documents, total
 
 
-def update_confluence_info(db: Session, mnt_id: int, page_id: int, page_url: str, status: str = "published", error: Optional[str] = None) -> bool:
-    """Обновление информации о Confluence странице"""
+def count_mnt(db: Session) -> int:
+    """Точное количество неудаленных МНТ"""
+    return db.execute(
+        text("SELECT COUNT(*) FROM mnt.documents WHERE deleted_at IS NULL")
+    ).scalar()
+
+
+def estimate_mnt_count(db: Session) -> int:
+    """Приблизительное количество неудаленных МНТ по статистике таблицы (без полного COUNT)
+
+    reltuples учитывает и удаленные в корзину МНТ, поэтому они вычитаются отдельным
+    запросом (их немного, выборка идет по индексу idx_documents_deleted_at).
+    """
+    estimate = db.execute(
+        text("""
+            SELECT reltuples::bigint - (SELECT COUNT(*) FROM mnt.documents WHERE deleted_at IS NOT NULL)
+            FROM pg_class
+            WHERE oid = 'mnt.documents'::regclass AND reltuples >= 0
+        """)
+    ).scalar()
+    
+    # Пока по таблице не собрана статистика (reltuples = -1) - считаем точно
+    if estimate is None:
+        return count_mnt(db)
+    
+    return max(estimate, 0)
+
+
+def resolve_estimated_total(estimate: int, skip: int, page_size: int, per_page: int) -> Optional[int]:
+    """Количество МНТ для пагинации по оценке estimate_mnt_count и размеру текущей страницы
+
+    Returns:
+        Количество МНТ или None, если оценке доверять нельзя и нужен точный COUNT(*)
+        (страница заполнена целиком, а статистика не больше уже показанных записей -
+        например, сразу после массовой вставки, до ANALYZE)
+    """
+    if page_size < per_page and (page_size > 0 or skip == 0):
+        # Неполная страница - последняя, количество известно точно
+        return skip + page_size
+    if estimate <= skip + page_size:
+        return None
+    return estimate
+
+
+def update_confluence_info(db: Session, mnt_id: int, page_id: int, page_url: str, status: str = "published", error: Optional[str] = None, version: Optional[int] = None) -> bool:
+    """Обновление информации о Confluence странице (version - текущая версия страницы, если известна)"""
     query = text("""
         UPDATE mnt.documents
         SET confluence_page_id = :page_id,
             confluence_page_url = :page_url,
+            confluence_version = :version,
             status = :status,
             last_publish_at = CURRENT_TIMESTAMP,
             last_error = :error
@@ -316,6 +382,7 @@ def update_confluence_info(db: Session, mnt_id: int, page_id: int, page_url: str
         "id": mnt_id,
         "page_id": page_id,
         "page_url": page_url,
+        "version": version,
         "status": status,
         "error": error
     })
@@ -324,6 +391,64 @@ def update_confluence_info(db: Session, mnt_id: int, page_id: int, page_url: str
     return result.rowcount > 0
 
 
+def update_mnt_published(
+    db: Session,
+    mnt_id: int,
+    data: dict,
+    confluence_space: str,
+    confluence_parent_id: Optional[int],
+    page_id: int,
+    page_url: str,
+    version: Optional[int] = None,
+    commit: bool = True
+) -> bool:
+    """Сохранение МНТ после успешной публикации (update_mnt + update_confluence_info одним UPDATE)
+    
+    Args:
+        commit: False - не фиксировать транзакцию (commit выполняет вызывающий код вместе с другими записями
+            и после него сам вызывает invalidate_autocomplete_cache)
+    """
+    # Убираем служебные поля из data_json, они уже в отдельных колонках
+    data_for_json = {k: v for k, v in data.items() if k not in ["title", "project", "author"]}
+    
+    query = text("""
+        UPDATE mnt.documents
+        SET title = :title,
+            project = :project,
+            author = :author,
+            data_json = :data_json,
+            confluence_space = :confluence_space,
+            confluence_parent_id = :confluence_parent_id,
+            confluence_page_id = :page_id,
+            confluence_page_url = :page_url,
+            confluence_version = :version,
+            status = 'published',
+            updated_at = CURRENT_TIMESTAMP,
+            last_publish_at = CURRENT_TIMESTAMP,
+            last_error = NULL
+        WHERE id = :id
+    """)
+    
+    result = db.execute(query, {
+        "id": mnt_id,
+        "title": data.get("title", ""),
+        "project": data.get("project", ""),
+        "author": data.get("author", ""),
+        "data_json": dump_jsonb(data_for_json),
+        "confluence_space": confluence_space,
+        "confluence_parent_id": confluence_parent_id,
+        "page_id": page_id,
+        "page_url": page_url,
+        "version": version
+    })
+    if commit:
+        db.commit()
+        # Кэш сбрасывается только после commit, иначе параллельный запрос может снова закэшировать старые значения
+        invalidate_autocomplete_cache()
+    
+    return result.rowcount > 0
+
+
 def set_error_status(db: Session, mnt_id: int, error_message: str) -> bool:
     """Установка статуса ошибки"""
     query = text("""
@@ -347,26 +472,37 @@ def log_action(
     user_name: str,
     action_type: str,
     action_description: str = "",
-    details: Optional[dict] = None
+    details: Optional[dict] = None,
+    commit: bool = True
 ) -> bool:
-    """Логирование действия пользователя с МНТ"""
+    """Логирование действия пользователя с МНТ
+    
+    При commit=False запись добавляется в текущую транзакцию (через SAVEPOINT - ошибка
+    откатывает только эту запись), commit выполняет вызывающий код.
+    """
     try:
         query = text("""
             INSERT INTO mnt.action_history (mnt_id, user_name, action_type, action_description, details)
             VALUES (:mnt_id, :user_name, :action_type, :action_description, :details)
         """)
-        
-        db.execute(query, {
+        params = {
             "mnt_id": mnt_id,
             "user_name": user_name,
             "action_type": action_type,
             "action_description": action_description,
-            "details": json.dumps(details, ensure_ascii=False) if details else None
-        })
-        db.commit()
+            "details": dump_jsonb(details) if details else None
+        }
+        
+        if commit:
+            db.execute(query, params)
+            db.commit()
+        else:
+            with db.begin_nested():
+                db.execute(query, params)
         return True
     except Exception as e:
-        db.rollback()
+        if commit:
+            db.rollback()
         return False
 
 
@@ -404,8 +540,92 @@ def get_action_history(db: Session, mnt_id: int, limit: int = 100) -> List[dict]
         })
     
     return history
+
+
+# Кэш списка имен тегов для фильтра на странице списка (TTL в секундах)
+TAG_NAMES_CACHE_TTL = 10.0
+_tag_names_cache: Optional[Tuple[float, List[str]]] = None
+
+
+def get_all_tag_names(db: Session) -> List[str]:
+    """Получение всех уникальных тегов из data_json неудаленных МНТ
+
+    Результат кэшируется в памяти процесса на TAG_NAMES_CACHE_TTL секунд.
+    """
+    global _tag_names_cache
+
+    now = time.monotonic()
+    if _tag_names_cache and now - _tag_names_cache[0] < TAG_NAMES_CACHE_TTL:
+        return _tag_names_cache[1]
+
+    query = text("""
+        SELECT DISTINCT tag
+        FROM mnt.documents d,
+             jsonb_array_elements_text(d.data_json->'tags') AS tag
+        WHERE d.deleted_at IS NULL
+          AND jsonb_typeof(d.data_json->'tags') = 'array'
+          AND btrim(tag) <> ''
+        ORDER BY tag
+    """)
+
+    result = db.execute(query)
+    tag_names = [row[0] for row in result.fetchall()]
+
+    _tag_names_cache = (now, tag_names)
+    return tag_names
+
+
+# Запросы автодополнения полей формы (списки значений по всем МНТ)
+AUTOCOMPLETE_QUERIES = {
+    # Пустые и состоящие из пробелов значения отсекаются в SQL (btrim(NULL) <> '' также отбрасывает NULL)
+    "projects": text("SELECT DISTINCT project FROM mnt.documents WHERE btrim(project) <> '' ORDER BY project"),
+    "authors": text("SELECT DISTINCT author FROM mnt.documents WHERE btrim(author) <> '' ORDER BY author"),
+    # Теги читаются из справочника mnt.tag_index (ведется триггерами), а не разворачиванием data_json всех МНТ
+    "tags": text("SELECT tag FROM mnt.tag_index WHERE doc_count > 0 AND btrim(tag) <> '' ORDER BY tag")
+}
+
+# Кэш автодополнения: вид списка -> (время, значения). TTL в секундах, кэш сбрасывается при изменении МНТ
+AUTOCOMPLETE_CACHE_TTL = 60.0
+_autocomplete_cache: Dict[str, Tuple[float, List[str]]] = {}
+
+
+def get_autocomplete_values(db: Session, kind: str) -> List[str]:
+    """Список значений для автодополнения ("projects", "authors" или "tags")
+
+    Результат кэшируется в памяти процесса на AUTOCOMPLETE_CACHE_TTL секунд.
+    """
+    now = time.monotonic()
+    cached = _autocomplete_cache.get(kind)
+    if cached and now - cached[0] < AUTOCOMPLETE_CACHE_TTL:
+        return cached[1]
+    
+    values = [row[0] for row in db.execute(AUTOCOMPLETE_QUERIES[kind]).fetchall()]
+    
+    _autocomplete_cache[kind] = (now, values)
+    return values
+
+
+def invalidate_autocomplete_cache() -> None:
+    """Сброс кэша автодополнения (после создания, изменения или удаления МНТ)"""
+    _autocomplete_cache.clear()
+
+
+# Кэш справочника тегов (mnt.tags) для GET /api/tags (TTL в секундах, сбрасывается при создании тега)
+TAGS_CACHE_TTL = 5.0
+_tags_cache: Optional[Tuple[float, List[dict]]] = None
+
+
 def get_tags(db: Session) -> List[dict]:
-    """Получение всех тегов"""
+    """Получение всех тегов
+
+    Результат кэшируется в памяти процесса на TAGS_CACHE_TTL секунд.
+    """
+    global _tags_cache
+    
+    now = time.monotonic()
+    if _tags_cache and now - _tags_cache[0] < TAGS_CACHE_TTL:
+        return _tags_cache[1]
+    
     query = text("""
         SELECT id, name, color
         FROM mnt.tags
@@ -415,7 +635,9 @@ def get_tags(db: Session) -> List[dict]:
     result = db.execute(query)
     rows = result.fetchall()
     
-    return [{"id": row[0], "name": row[1], "color": row[2]} for row in rows]
+    tags = [{"id": row[0], "name": row[1], "color": row[2]} for row in rows]
+    _tags_cache = (now, tags)
+    return tags
 
 
 def create_tag(db: Session, name: str, color: str = "#6c757d") -> dict:
@@ -426,8 +648,12 @@ def create_tag(db: Session, name: str, color: str = "#6c757d") -> dict:
         RETURNING id, name, color
     """)
     
+    global _tags_cache
+    
     result = db.execute(query, {"name": name, "color": color})
     db.commit()
+    # Новый тег должен сразу появиться в списке
+    _tags_cache = None
     
     row = result.fetchone()
     return {"id": row[0], "name": row[1], "color": row[2]}
@@ -471,32 +697,65 @@ def set_document_tags(db: Session, document_id: int, tag_ids: List[int]) -> bool
         return False
 
 
-def soft_delete_mnt(db: Session, mnt_id: int) -> bool:
-    """Мягкое удаление МНТ (soft delete) - устанавливает deleted_at"""
+def soft_delete_mnt(db: Session, mnt_id: int, allow_published: bool = True) -> Optional[dict]:
+    """Мягкое удаление МНТ (soft delete) - устанавливает deleted_at
+    
+    Проверка и удаление выполняются одним UPDATE ... RETURNING.
+    
+    Args:
+        allow_published: False - не удалять МНТ, у которого есть опубликованная страница Confluence
+    
+    Returns:
+        confluence_page_id и author удаленного МНТ или None, если ничего не удалено
+        (МНТ не найден, уже удален или опубликован при allow_published=False)
+    """
     query = text("""
         UPDATE mnt.documents
         SET deleted_at = CURRENT_TIMESTAMP
         WHERE id = :id AND deleted_at IS NULL
+          AND (:allow_published OR confluence_page_id IS NULL)
+        RETURNING confluence_page_id, author
     """)
     
-    result = db.execute(query, {"id": mnt_id})
+    row = db.execute(query, {"id": mnt_id, "allow_published": allow_published}).fetchone()
     db.commit()
     
-    return result.rowcount > 0
+    if not row:
+        return None
+    return {"confluence_page_id": row[0], "author": row[1]}
 
 
-def restore_mnt(db: Session, mnt_id: int) -> bool:
-    """Восстановление удаленного МНТ - очищает deleted_at"""
+def restore_mnt(db: Session, mnt_id: int) -> Optional[dict]:
+    """Восстановление удаленного МНТ - очищает deleted_at
+    
+    Returns:
+        Данные восстановленного МНТ (одним UPDATE ... RETURNING) или None, если МНТ не был удален
+    """
     query = text("""
         UPDATE mnt.documents
         SET deleted_at = NULL
         WHERE id = :id AND deleted_at IS NOT NULL
+        RETURNING title, author, data_json, confluence_space, confluence_parent_id, confluence_page_id
     """)
     
-    result = db.execute(query, {"id": mnt_id})
+    row = db.execute(query, {"id": mnt_id}).fetchone()
     db.commit()
     
-    return result.rowcount > 0
+    if not row:
+        return None
+    
+    data_json_value = row[2]
+    if isinstance(data_json_value, str):
+        data_json_value = json.loads(data_json_value)
+    
+    return {
+        "title": row[0],
+        "author": row[1],
+        "data_json": data_json_value or {},
+        "confluence_space": row[3],
+        "confluence_parent_id": row[4],
+        "confluence_page_id": row[5]
+    }
 
 
 def permanently_delete_old_mnts(db: Session, days: int = 30) -> int:
@@ -516,6 +775,8 @@ def permanently_delete_old_mnts(db: Session, days: int = 30) -> int:
     
     result = db.execute(query, {"days": days})
     db.commit()
+    if result.rowcount:
+        invalidate_autocomplete_cache()
     
     return result.rowcount
 
@@ -628,7 +889,7 @@ def get_latest_version_from_history(data_json: dict) -> str:
         return None
     
     # Парсим таблицу: каждая строка - запись, разделитель | между колонками
-    lines = [line.strip() for line in history_table.split('\n') if line.strip()]
+    lines = [stripped for line in history_table.splitlines() if (stripped := line.strip())]
     if not lines:
         return None
     
@@ -693,7 +954,7 @@ def create_document_version(
         "title": title,
         "project": project,
         "author": author,
-        "data_json": json.dumps(data_json, ensure_ascii=False),
+        "data_json": dump_jsonb(data_json),
         "status": status,
         "confluence_space": confluence_space,
         "confluence_parent_id": confluence_parent_id,
@@ -782,6 +1043,19 @@ def get_document_versions(
     return versions, total
 
 
+def document_version_exists(db: Session, mnt_id: int, version_number: str) -> bool:
+    """Проверка, есть ли у МНТ версия с указанным номером (без загрузки списка версий)"""
+    query = text("""
+        SELECT EXISTS (
+            SELECT 1 FROM mnt.document_versions
+            WHERE mnt_id = :mnt_id AND version_number = :version_number
+        )
+    """)
+    
+    result = db.execute(query, {"mnt_id": mnt_id, "version_number": version_number})
+    return bool(result.scalar())
+
+
 def get_document_version(db: Session, version_id: int) -> Optional[dict]:
     """Получение конкретной версии МНТ по ID версии"""
     query = text("""
@@ -1,6 +1,6 @@
 """Планировщик для автоматических задач (бэкапы, очистка)"""
 import asyncio
-from datetime import datetime, time
+from datetime import datetime, time, timedelta
 from typing import Optional
 import logging
 
@@ -35,7 +35,6 @@ async def run_scheduled_backup():
 async def cleanup_old_backups():
     """Удаление старых бэкапов (старше BACKUP_RETENTION_DAYS дней)"""
     try:
-        from datetime import timedelta
         cutoff_date = datetime.now() - timedelta(days=BACKUP_RETENTION_DAYS)
         
         backups = list_backups()
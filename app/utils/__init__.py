@@ -1,7 +1,7 @@
 """Утилиты приложения: вспомогательные функции"""
 from app.utils.logger import (
     log_mnt_operation, log_error, log_confluence_operation,
-    log_user_action, log_request, logger, generate_request_id, log_security_event
+    log_user_action, log_request, logger, generate_request_id, log_security_event, stop_log_listener
 )
 from app.utils.validation import sanitize_dict, validate_mnt_data, sanitize_search_query
 from app.utils.exceptions import (
@@ -16,7 +16,7 @@ from app.utils.version_diff import compare_versions
 __all__ = [
     # Logger
     'log_mnt_operation', 'log_error', 'log_confluence_operation',
-    'log_user_action', 'log_request', 'logger', 'generate_request_id', 'log_security_event',
+    'log_user_action', 'log_request', 'logger', 'generate_request_id', 'log_security_event', 'stop_log_listener',
     # Validation
     'sanitize_dict', 'validate_mnt_data', 'sanitize_search_query',
     # Exceptions
@@ -48,51 +48,53 @@ def compare_document_fields(old_doc: Dict[str, Any], new_doc: Dict[str, Any]) ->
     return changes
 
 
+# Отображаемые названия полей (словарь создается один раз при импорте)
+FIELD_DISPLAY_NAMES = {
+    "title": "Название документа",
+    "project": "Проект",
+    "author": "Автор",
+    "tags": "Теги",
+    "introduction_text": "4. Введение",
+    "goals_business": "5.1 Бизнес-цели",
+    "goals_technical": "5.1 Технические цели",
+    "tasks_nt": "5.2 Задачи НТ",
+    "limitations_list": "6.1 Ограничения НТ",
+    "risks_table": "6.2 Риски НТ",
+    "object_general": "7.1 Общие сведения",
+    "performance_requirements": "7.2 Требования к производительности",
+    "component_architecture_text": "7.3.1 Компонентная архитектура",
+    "test_stand_architecture_text": "8.1 Архитектура тестового стенда",
+    "planned_tests_intro": "9.1 Описание планируемых тестов",
+    "completion_conditions": "9.2 Условия завершения НТ",
+    "database_preparation_text": "10. Наполнение БД (текст)",
+    "load_modeling_principles": "11.1 Общие принципы моделирования нагрузки",
+    "load_profiles_intro": "11.2 Профили нагрузки (введение)",
+    "load_profiles_table": "11.2 Профили нагрузки (таблица)",
+    "use_scenarios_intro": "11.3 Сценарии использования (введение)",
+    "use_scenarios_table": "11.3 Сценарии использования (таблица)",
+    "emulators_description": "11.4 Описание работы эмуляторов",
+    "monitoring_intro": "12. Мониторинг (введение)",
+    "monitoring_tools_intro": "12.1 Описание средств мониторинга (введение)",
+    "monitoring_tools_table": "12.1 Описание средств мониторинга (таблица)",
+    "system_resources_intro": "12.2.1 Мониторинг системных ресурсов (введение)",
+    "system_resources_table": "12.2.1 Мониторинг системных ресурсов (таблица)",
+    "business_metrics_intro": "12.2.2 Мониторинг бизнес-метрик (введение)",
+    "business_metrics_table": "12.2.2 Мониторинг бизнес-метрик (таблица)",
+    "customer_requirements_list": "13. Требования к Заказчику",
+    "deliverables_intro": "14. Материалы, подлежащие сдаче (введение)",
+    "deliverables_table": "14. Материалы, подлежащие сдаче (таблица 1)",
+    "deliverables_working_docs_table": "14. Материалы, подлежащие сдаче (таблица 2)",
+    "contacts_table": "15. Контакты",
+    "history_changes_table": "1. История изменений",
+    "approval_list_table": "2. Лист согласования",
+    "abbreviations_table": "3.1 Сокращения",
+    "terminology_table": "3.2 Терминология",
+    "stand_comparison_table": "8.2 Сравнение конфигураций",
+    "planned_tests_table": "9.1 Описание планируемых тестов (таблица)",
+    "database_preparation_table": "10. Наполнение БД (таблица)",
+}
+
+
 def get_field_display_name(field_name: str) -> str:
     """Получить отображаемое название поля"""
-    display_names = {
-        "title": "Название документа",
-        "project": "Проект",
-        "author": "Автор",
-        "tags": "Теги",
-        "introduction_text": "4. Введение",
-        "goals_business": "5.1 Бизнес-цели",
-        "goals_technical": "5.1 Технические цели",
-        "tasks_nt": "5.2 Задачи НТ",
-        "limitations_list": "6.1 Ограничения НТ",
-        "risks_table": "6.2 Риски НТ",
-        "object_general": "7.1 Общие сведения",
-        "performance_requirements": "7.2 Требования к производительности",
-        "component_architecture_text": "7.3.1 Компонентная архитектура",
-        "test_stand_architecture_text": "8.1 Архитектура тестового стенда",
-        "planned_tests_intro": "9.1 Описание планируемых тестов",
-        "completion_conditions": "9.2 Условия завершения НТ",
-        "database_preparation_text": "10. Наполнение БД (текст)",
-        "load_modeling_principles": "11.1 Общие принципы моделирования нагрузки",
-        "load_profiles_intro": "11.2 Профили нагрузки (введение)",
-        "load_profiles_table": "11.2 Профили нагрузки (таблица)",
-        "use_scenarios_intro": "11.3 Сценарии использования (введение)",
-        "use_scenarios_table": "11.3 Сценарии использования (таблица)",
-        "emulators_description": "11.4 Описание работы эмуляторов",
-        "monitoring_intro": "12. Мониторинг (введение)",
-        "monitoring_tools_intro": "12.1 Описание средств мониторинга (введение)",
-        "monitoring_tools_table": "12.1 Описание средств мониторинга (таблица)",
-        "system_resources_intro": "12.2.1 Мониторинг системных ресурсов (введение)",
-        "system_resources_table": "12.2.1 Мониторинг системных ресурсов (таблица)",
-        "business_metrics_intro": "12.2.2 Мониторинг бизнес-метрик (введение)",
-        "business_metrics_table": "12.2.2 Мониторинг бизнес-метрик (таблица)",
-        "customer_requirements_list": "13. Требования к Заказчику",
-        "deliverables_intro": "14. Материалы, подлежащие сдаче (введение)",
-        "deliverables_table": "14. Материалы, подлежащие сдаче (таблица 1)",
-        "deliverables_working_docs_table": "14. Материалы, подлежащие сдаче (таблица 2)",
-        "contacts_table": "15. Контакты",
-        "history_changes_table": "1. История изменений",
-        "approval_list_table": "2. Лист согласования",
-        "abbreviations_table": "3.1 Сокращения",
-        "terminology_table": "3.2 Терминология",
-        "stand_comparison_table": "8.2 Сравнение конфигураций",
-        "planned_tests_table": "9.1 Описание планируемых тестов (таблица)",
-        "database_preparation_table": "10. Наполнение БД (таблица)",
-    }
-    
-    return display_names.get(field_name, field_name)
+    return FIELD_DISPLAY_NAMES.get(field_name, field_name)
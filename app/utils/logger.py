@@ -1,13 +1,15 @@
 """Модуль для логирования операций"""
 import logging
 import os
+import queue
+import atexit
 import uuid
 import json
 import socket
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, Dict, Any
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 
 from app.core.config import settings
 
@@ -224,14 +226,47 @@ if settings.log_enable_console:
     console_handler.addFilter(ContextFilter())
     handlers.append(console_handler)
 
+
+class LogQueueHandler(QueueHandler):
+    """Handler, передающий записи в очередь для фонового потока записи логов"""
+    def prepare(self, record):
+        # Подставляем аргументы сразу (они могут измениться после возврата из вызова логгера),
+        # а форматирование и запись в файл/консоль выполняет поток QueueListener.
+        # exc_info сохраняется - очередь внутри процесса, записи не сериализуются
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+# Запись логов в файл/консоль выполняется в отдельном потоке: вызовы логгера в обработчиках
+# запросов только ставят запись в очередь и не блокируются на write() и блокировках handlers
+log_queue = queue.SimpleQueue()
+queue_handler = LogQueueHandler(log_queue)
+log_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+log_listener.start()
+_log_listener_running = True
+
+
+def stop_log_listener():
+    """Остановка фонового потока записи логов (оставшиеся в очереди записи дописываются)"""
+    global _log_listener_running
+    if _log_listener_running:
+        _log_listener_running = False
+        log_listener.stop()
+
+
+atexit.register(stop_log_listener)
+
 # Настройка логирования
 logging.basicConfig(
     level=log_level,
-    handlers=handlers,
+    handlers=[queue_handler],
     force=True  # Переопределяем существующие настройки
 )
 
 logger = logging.getLogger("mnt_generator")
+logger.addHandler(queue_handler)
 logger.propagate = False  # Предотвращаем дублирование через родительские loggers
 
 # Отключаем логирование uvicorn.access для уменьшения шума
@@ -352,6 +387,18 @@ def log_request(
     response_size_bytes: Optional[int] = None
 ):
     """Логирование HTTP запросов с метриками"""
+    # Определяем уровень логирования на основе статуса
+    if status_code >= 500:
+        level = logging.ERROR
+    elif status_code >= 400:
+        level = logging.WARNING
+    else:
+        level = logging.DEBUG
+    
+    # Успешные запросы логируются на уровне DEBUG - не собираем extra, если он отключен
+    if not logger.isEnabledFor(level):
+        return
+    
     extra = {
         'request_id': request_id or '-',
         'user_ip': user_ip or '-',
@@ -364,16 +411,7 @@ def log_request(
         'path': path
     }
     
-    # Определяем уровень логирования на основе статуса
-    if status_code >= 500:
-        level = logging.ERROR
-    elif status_code >= 400:
-        level = logging.WARNING
-    else:
-        level = logging.DEBUG
-    
-    log_msg = f"HTTP | {method} {path} | Status: {status_code}"
-    logger.log(level, log_msg, extra=extra)
+    logger.log(level, "HTTP | %s %s | Status: %s", method, path, status_code, extra=extra)
 
 
 def log_security_event(
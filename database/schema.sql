@@ -21,9 +21,52 @@ CREATE TABLE IF NOT EXISTS mnt.documents (
     confluence_page_url TEXT,
     last_publish_at TIMESTAMP,
     last_error TEXT,
-    deleted_at TIMESTAMP NULL
+    deleted_at TIMESTAMP NULL,
+    -- РџРѕСЃР»РµРґРЅСЏСЏ РёР·РІРµСЃС‚РЅР°СЏ РІРµСЂСЃРёСЏ СЃС‚СЂР°РЅРёС†С‹ РІ Confluence
+    confluence_version INTEGER
 );
 
+-- Р”Р»СЏ СѓР¶Рµ СЃРѕР·РґР°РЅРЅС‹С… Р±Р°Р·
+ALTER TABLE mnt.documents ADD COLUMN IF NOT EXISTS confluence_version INTEGER;
+
+-- data_json РІСЃРµРіРґР° JSON-РѕР±СЉРµРєС‚: РїСЂРёРІРѕРґРёРј СЃС‚Р°СЂС‹Рµ Р·Р°РїРёСЃРё Рё Р·Р°РєСЂРµРїР»СЏРµРј РѕРіСЂР°РЅРёС‡РµРЅРёРµРј.
+-- Р”РІР°Р¶РґС‹ Р·Р°РєРѕРґРёСЂРѕРІР°РЅРЅС‹Рµ Р·Р°РїРёСЃРё (JSON-СЃС‚СЂРѕРєР° СЃ РѕР±СЉРµРєС‚РѕРј) СЂР°СЃРєСЂС‹РІР°СЋС‚СЃСЏ, РѕСЃС‚Р°Р»СЊРЅС‹Рµ РЅРµ-РѕР±СЉРµРєС‚С‹
+-- РЅРµ Р·Р°С‚РёСЂР°СЋС‚СЃСЏ, Р° СЃРѕС…СЂР°РЅСЏСЋС‚СЃСЏ РІ РєР»СЋС‡Рµ _legacy_data_json СЃ РІС‹РІРѕРґРѕРј РёС… РєРѕР»РёС‡РµСЃС‚РІР°
+DO $$
+DECLARE
+    doc RECORD;
+    legacy_count INTEGER;
+BEGIN
+    FOR doc IN
+        SELECT id, data_json #>> '{}' AS raw
+        FROM mnt.documents
+        WHERE jsonb_typeof(data_json) = 'string' AND left(btrim(data_json #>> '{}'), 1) = '{'
+    LOOP
+        BEGIN
+            UPDATE mnt.documents SET data_json = doc.raw::jsonb WHERE id = doc.id;
+        EXCEPTION WHEN invalid_text_representation THEN
+            RAISE NOTICE 'РњРќРў %: data_json РЅРµ СѓРґР°Р»РѕСЃСЊ СЂР°Р·РѕР±СЂР°С‚СЊ РєР°Рє JSON', doc.id;
+        END;
+    END LOOP;
+
+    UPDATE mnt.documents
+    SET data_json = CASE
+        WHEN data_json IS NULL THEN '{}'::jsonb
+        ELSE jsonb_build_object('_legacy_data_json', data_json)
+    END
+    WHERE jsonb_typeof(data_json) IS DISTINCT FROM 'object';
+    GET DIAGNOSTICS legacy_count = ROW_COUNT;
+    IF legacy_count > 0 THEN
+        RAISE NOTICE 'РњРќРў СЃ data_json РЅРµ РІ РІРёРґРµ РѕР±СЉРµРєС‚Р°: %, РёСЃС…РѕРґРЅС‹Рµ Р·РЅР°С‡РµРЅРёСЏ СЃРѕС…СЂР°РЅРµРЅС‹ РІ РєР»СЋС‡Рµ _legacy_data_json', legacy_count;
+    END IF;
+END $$;
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'documents_data_json_is_object') THEN
+        ALTER TABLE mnt.documents ADD CONSTRAINT documents_data_json_is_object CHECK (jsonb_typeof(data_json) = 'object');
+    END IF;
+END $$;
+
 -- РРЅРґРµРєСЃ РґР»СЏ Р±С‹СЃС‚СЂРѕРіРѕ РїРѕРёСЃРєР° РїРѕ СЃС‚Р°С‚СѓСЃСѓ
 CREATE INDEX IF NOT EXISTS idx_documents_status ON mnt.documents(status);
 
@@ -142,5 +185,66 @@ CREATE INDEX IF NOT EXISTS idx_document_tags_tag_id ON mnt.document_tags(tag_id)
 CREATE INDEX IF NOT EXISTS idx_documents_data_json_gin ON mnt.documents USING GIN (data_json);
 CREATE INDEX IF NOT EXISTS idx_document_versions_data_json_gin ON mnt.document_versions USING GIN (data_json);
 
+-- РРЅРґРµРєСЃ РґР»СЏ РІС‹Р±РѕСЂРєРё С‚РµРіРѕРІ РґРѕРєСѓРјРµРЅС‚РѕРІ (С„РёР»СЊС‚СЂ РЅР° СЃС‚СЂР°РЅРёС†Рµ СЃРїРёСЃРєР°)
+CREATE INDEX IF NOT EXISTS idx_documents_data_json_tags_gin ON mnt.documents USING GIN ((data_json->'tags'));
+
+-- РЎРїСЂР°РІРѕС‡РЅРёРє С‚РµРіРѕРІ РґР»СЏ Р°РІС‚РѕРґРѕРїРѕР»РЅРµРЅРёСЏ: РєРѕР»РёС‡РµСЃС‚РІРѕ РґРѕРєСѓРјРµРЅС‚РѕРІ СЃ РєР°Р¶РґС‹Рј С‚РµРіРѕРј (РїРѕРґРґРµСЂР¶РёРІР°РµС‚СЃСЏ С‚СЂРёРіРіРµСЂР°РјРё)
+CREATE TABLE IF NOT EXISTS mnt.tag_index (
+    tag TEXT PRIMARY KEY,
+    doc_count INTEGER NOT NULL DEFAULT 0
+);
+
+-- Р¤СѓРЅРєС†РёСЏ РїРµСЂРµСЃС‡РµС‚Р° СЃРїСЂР°РІРѕС‡РЅРёРєР° С‚РµРіРѕРІ РїСЂРё РёР·РјРµРЅРµРЅРёРё С‚РµРіРѕРІ РґРѕРєСѓРјРµРЅС‚Р°
+CREATE OR REPLACE FUNCTION mnt.update_tag_index()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND jsonb_typeof(OLD.data_json->'tags') = 'array' THEN
+        UPDATE mnt.tag_index ti
+        SET doc_count = ti.doc_count - 1
+        FROM (
+            SELECT DISTINCT tag
+            FROM jsonb_array_elements_text(OLD.data_json->'tags') AS t(tag)
+            WHERE tag IS NOT NULL AND tag <> ''
+        ) old_tags
+        WHERE ti.tag = old_tags.tag;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND jsonb_typeof(NEW.data_json->'tags') = 'array' THEN
+        INSERT INTO mnt.tag_index (tag, doc_count)
+        SELECT new_tags.tag, 1
+        FROM (
+            SELECT DISTINCT tag
+            FROM jsonb_array_elements_text(NEW.data_json->'tags') AS t(tag)
+            WHERE tag IS NOT NULL AND tag <> ''
+        ) new_tags
+        ON CONFLICT (tag) DO UPDATE SET doc_count = mnt.tag_index.doc_count + 1;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- РўСЂРёРіРіРµСЂС‹ СЃРїСЂР°РІРѕС‡РЅРёРєР° С‚РµРіРѕРІ (UPDATE - С‚РѕР»СЊРєРѕ РїСЂРё РёР·РјРµРЅРµРЅРёРё СЃРїРёСЃРєР° С‚РµРіРѕРІ)
+CREATE TRIGGER update_tag_index_on_insert_delete
+    AFTER INSERT OR DELETE ON mnt.documents
+    FOR EACH ROW
+    EXECUTE FUNCTION mnt.update_tag_index();
+
+CREATE TRIGGER update_tag_index_on_update
+    AFTER UPDATE OF data_json ON mnt.documents
+    FOR EACH ROW
+    WHEN (OLD.data_json->'tags' IS DISTINCT FROM NEW.data_json->'tags')
+    EXECUTE FUNCTION mnt.update_tag_index();
+
+-- РќР°С‡Р°Р»СЊРЅРѕРµ Р·Р°РїРѕР»РЅРµРЅРёРµ СЃРїСЂР°РІРѕС‡РЅРёРєР° С‚РµРіРѕРІ РїРѕ СѓР¶Рµ СЃСѓС‰РµСЃС‚РІСѓСЋС‰РёРј РґРѕРєСѓРјРµРЅС‚Р°Рј
+INSERT INTO mnt.tag_index (tag, doc_count)
+SELECT tag, COUNT(*)
+FROM (
+    SELECT DISTINCT d.id, jsonb_array_elements_text(d.data_json->'tags') AS tag
+    FROM mnt.documents d
+    WHERE jsonb_typeof(d.data_json->'tags') = 'array'
+) document_tags
+WHERE tag IS NOT NULL AND tag <> ''
+GROUP BY tag
+ON CONFLICT (tag) DO NOTHING;
+
 COMMENT ON TABLE mnt.document_versions IS 'РўР°Р±Р»РёС†Р° РґР»СЏ С…СЂР°РЅРµРЅРёСЏ РІРµСЂСЃРёР№ РњРќРў РґРѕРєСѓРјРµРЅС‚РѕРІ';
 COMMENT ON TABLE mnt.field_history IS 'РСЃС‚РѕСЂРёСЏ РёР·РјРµРЅРµРЅРёР№ РєРѕРЅРєСЂРµС‚РЅС‹С… РїРѕР»РµР№ РњРќРў РґРѕРєСѓРјРµРЅС‚РѕРІ';
@@ -0,0 +1,58 @@
+"""Тесты построчной генерации экспорта логов аудита"""
+import csv
+import io
+import json
+from datetime import datetime
+
+from app.routes.admin import (
+    AUDIT_CSV_HEADERS, AUDIT_CSV_BATCH_ROWS,
+    iter_audit_csv, iter_history_csv_rows, iter_audit_json
+)
+
+
+def read_csv(chunks):
+    return list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+
+
+def test_iter_audit_csv():
+    """Заголовок и строки в кодировке UTF-8"""
+    rows = [(1, "МНТ", "строка, с запятой"), (2, "МНТ", 'строка с "кавычками"')]
+    assert read_csv(iter_audit_csv(rows)) == [
+        AUDIT_CSV_HEADERS,
+        ["1", "МНТ", "строка, с запятой"],
+        ["2", "МНТ", 'строка с "кавычками"'],
+    ]
+
+
+def test_iter_audit_csv_batches_rows():
+    """Заголовок отдается отдельно, строки - порциями по AUDIT_CSV_BATCH_ROWS и остаток"""
+    rows = [(i, "МНТ", f"строка {i}") for i in range(AUDIT_CSV_BATCH_ROWS * 2 + 2)]
+    chunks = list(iter_audit_csv(rows))
+    assert len(chunks) == 4
+    assert read_csv(chunks[:1]) == [AUDIT_CSV_HEADERS]
+    assert len(read_csv(chunks[1:2])) == AUDIT_CSV_BATCH_ROWS
+    assert len(read_csv(chunks[3:])) == 2
+    assert read_csv(chunks)[1:] == [[str(i), "МНТ", f"строка {i}"] for i in range(len(rows))]
+
+
+def test_iter_audit_csv_without_rows():
+    chunks = list(iter_audit_csv([]))
+    assert read_csv(chunks) == [AUDIT_CSV_HEADERS]
+
+
+def test_iter_audit_json():
+    assert json.loads(b"".join(iter_audit_json([b'{"id":1}', b'{"id":2}']))) == [{"id": 1}, {"id": 2}]
+    assert json.loads(b"".join(iter_audit_json([]))) == []
+
+
+def test_iter_history_csv_rows():
+    """Строки истории одного МНТ - в порядке AUDIT_CSV_HEADERS, детали в JSON без экранирования кириллицы"""
+    history = [{
+        "id": 1, "mnt_id": 5, "mnt_title": "МНТ",
+        "created_at": datetime(2024, 3, 1, 12, 30),
+        "user_name": "Иванов", "action_type": "updated",
+        "action_description": "Изменение", "details": {"поле": "значение"}
+    }]
+    assert list(iter_history_csv_rows(history)) == [(
+        1, 5, "МНТ", "2024-03-01T12:30:00", "Иванов", "updated", "Изменение", '{"поле": "значение"}'
+    )]
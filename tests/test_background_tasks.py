@@ -0,0 +1,63 @@
+"""Тесты фоновых задач с опросом статуса по ID"""
+import asyncio
+
+from app.services import background_tasks
+from app.services.background_tasks import start_background_task, get_background_task
+
+
+async def wait_for_tasks():
+    """Ожидание завершения всех запущенных фоновых задач"""
+    await asyncio.gather(*list(background_tasks._running))
+
+
+def test_background_task_result(monkeypatch):
+    """Аргументы передаются в функцию, результат сохраняется в задаче"""
+    monkeypatch.setattr(background_tasks, "_tasks", {})
+    
+    async def scenario():
+        task_id = start_background_task("export", lambda a, b=0: a + b, 1, b=2)
+        assert get_background_task(task_id)["status"] == "running"
+        await wait_for_tasks()
+        return get_background_task(task_id)
+    
+    task = asyncio.run(scenario())
+    assert task["kind"] == "export"
+    assert task["status"] == "done"
+    assert task["result"] == 3
+    assert task["error"] is None
+    assert task["finished_at"] is not None
+
+
+def test_background_task_error(monkeypatch):
+    """Исключение в функции - статус error и текст ошибки"""
+    monkeypatch.setattr(background_tasks, "_tasks", {})
+    
+    def fail():
+        raise RuntimeError("нет места на диске")
+    
+    async def scenario():
+        task_id = start_background_task("backup", fail)
+        await wait_for_tasks()
+        return get_background_task(task_id)
+    
+    task = asyncio.run(scenario())
+    assert task["status"] == "error"
+    assert task["error"] == "нет места на диске"
+    assert task["result"] is None
+
+
+def test_unknown_background_task():
+    assert get_background_task("unknown") is None
+
+
+def test_finished_tasks_trimmed(monkeypatch):
+    """При превышении BACKGROUND_TASKS_MAX_SIZE удаляются самые старые завершенные задачи, выполняющиеся остаются"""
+    monkeypatch.setattr(background_tasks, "BACKGROUND_TASKS_MAX_SIZE", 3)
+    monkeypatch.setattr(background_tasks, "_tasks", {
+        "running": {"status": "running"},
+        "old": {"status": "done"},
+        "newer": {"status": "error"},
+    })
+    
+    background_tasks._trim_finished_tasks()
+    assert list(background_tasks._tasks) == ["running", "newer"]
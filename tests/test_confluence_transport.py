@@ -0,0 +1,23 @@
+"""Тесты выбора запросов к Confluence, которые можно повторить после разрыва соединения"""
+import httpx
+import pytest
+
+from app.services.confluence import is_retryable_request
+
+
+@pytest.mark.parametrize("method", ["GET", "HEAD", "PUT", "DELETE", "get"])
+def test_idempotent_methods_retried_after_read_error(method):
+    """Идемпотентные запросы повторяются после любой сетевой ошибки"""
+    assert is_retryable_request(method, httpx.ReadError("connection reset"))
+    assert is_retryable_request(method, httpx.RemoteProtocolError("server disconnected"))
+
+
+def test_post_not_retried_after_response_error():
+    """POST мог быть выполнен сервером - после ошибки чтения ответа не повторяется"""
+    assert not is_retryable_request("POST", httpx.ReadError("connection reset"))
+    assert not is_retryable_request("POST", httpx.RemoteProtocolError("server disconnected"))
+
+
+def test_post_retried_when_request_was_not_sent():
+    """Ошибка записи в закрытое соединение - запрос не дошел до сервера, повтор безопасен"""
+    assert is_retryable_request("POST", httpx.WriteError("broken pipe"))
@@ -0,0 +1,25 @@
+"""Тесты расчета количества МНТ для пагинации по оценке статистики"""
+from app.services.db_operations import resolve_estimated_total
+
+
+def test_full_page_with_low_estimate_requires_exact_count():
+    """Полная страница при отстающей статистике - нужен точный COUNT(*), иначе "next" недоступна"""
+    assert resolve_estimated_total(estimate=0, skip=0, page_size=20, per_page=20) is None
+    assert resolve_estimated_total(estimate=20, skip=0, page_size=20, per_page=20) is None
+
+
+def test_full_page_with_higher_estimate_uses_estimate():
+    """Оценка больше показанных записей - используется как есть"""
+    assert resolve_estimated_total(estimate=150, skip=0, page_size=20, per_page=20) == 150
+
+
+def test_short_page_gives_exact_total():
+    """Неполная страница - последняя, оценка не нужна (в т.ч. завышенная удаленными МНТ)"""
+    assert resolve_estimated_total(estimate=500, skip=0, page_size=7, per_page=20) == 7
+    assert resolve_estimated_total(estimate=0, skip=0, page_size=0, per_page=20) == 0
+
+
+def test_empty_page_after_skip_is_not_trusted_as_exact():
+    """Пустая страница за пределами данных не дает точного количества"""
+    assert resolve_estimated_total(estimate=10, skip=40, page_size=0, per_page=20) is None
+    assert resolve_estimated_total(estimate=100, skip=40, page_size=0, per_page=20) == 100
@@ -0,0 +1,186 @@
+"""Тесты вспомогательных функций обработки форм МНТ и проверки обязательных полей"""
+import io
+from datetime import datetime
+from urllib.parse import unquote
+
+import pytest
+from starlette.datastructures import FormData, UploadFile
+
+from app.routes.mnt import (
+    MNT_REQUIRED_FORM_FIELDS,
+    get_form_value, get_form_int, get_form_file, get_missing_form_fields,
+    update_history_changes_table, parse_custom_sections, count_table_rows, parse_tags
+)
+
+
+def make_required_form(**overrides):
+    """Форма со всеми обязательными полями (значения можно переопределить)"""
+    fields = {name: f"value_{name}" for name in MNT_REQUIRED_FORM_FIELDS}
+    fields.update(overrides)
+    return fields
+
+
+# --- Поля формы ---
+
+def test_get_form_value():
+    """Пустая строка и отсутствующее поле - None"""
+    form = FormData([("name", "Проект"), ("empty", "")])
+    assert get_form_value(form, "name") == "Проект"
+    assert get_form_value(form, "empty") is None
+    assert get_form_value(form, "missing") is None
+
+
+def test_get_form_value_ignores_files():
+    """Файл в поле формы не считается строковым значением"""
+    form = FormData([("name", UploadFile(file=io.BytesIO(b"data"), filename="a.txt"))])
+    assert get_form_value(form, "name") is None
+
+
+def test_get_form_int():
+    """Целое число, None для пустого поля и ValueError для некорректного значения"""
+    form = FormData([("id", "42"), ("empty", ""), ("bad", "abc")])
+    assert get_form_int(form, "id") == 42
+    assert get_form_int(form, "empty") is None
+    assert get_form_int(form, "missing") is None
+    with pytest.raises(ValueError):
+        get_form_int(form, "bad")
+
+
+def test_get_form_file():
+    """Возвращается только загруженный файл"""
+    upload = UploadFile(file=io.BytesIO(b"png"), filename="image.png")
+    form = FormData([("image", upload), ("text", "image.png")])
+    assert get_form_file(form, "image") is upload
+    assert get_form_file(form, "text") is None
+    assert get_form_file(form, "missing") is None
+
+
+# --- Обязательные поля ---
+
+def test_get_missing_form_fields_all_filled():
+    assert get_missing_form_fields(FormData(make_required_form())) == []
+
+
+def test_get_missing_form_fields_empty_string_is_missing():
+    """Пустая строка считается незаполненным полем, порядок - как в MNT_REQUIRED_FORM_FIELDS"""
+    form = make_required_form(author="", project_name="")
+    del form["confluence_space"]
+    assert get_missing_form_fields(FormData(form)) == ["project_name", "author", "confluence_space"]
+
+
+def test_create_form_redirects_on_missing_fields(client):
+    """Форма создания без обязательных полей - редирект обратно с ошибкой (до обращения к БД)"""
+    response = client.post(
+        "/mnt/create",
+        data=make_required_form(author=""),
+        follow_redirects=False
+    )
+    assert response.status_code == 303
+    location = response.headers["location"]
+    assert location.startswith("/mnt/create?error=")
+    assert "author" in unquote(location)
+
+
+def test_edit_form_redirects_on_missing_fields(client):
+    """Форма редактирования без обязательных полей - редирект на страницу редактирования того же МНТ"""
+    form = make_required_form()
+    del form["project_name"]
+    response = client.post("/mnt/7/edit", data=form, follow_redirects=False)
+    assert response.status_code == 303
+    location = response.headers["location"]
+    assert location.startswith("/mnt/7/edit?error=")
+    assert "project_name" in unquote(location)
+
+
+# --- История изменений ---
+
+def test_update_history_changes_table_first_entry():
+    """Пустая история - заголовок и первая запись 0.1 с описанием по умолчанию"""
+    today = datetime.now().strftime("%d.%m.%Y")
+    assert update_history_changes_table(None, "Иванов И.И.", "", is_first_entry=True) == (
+        f"Дата|Версия|Описание|Автор\n{today}|0.1|Заполнены основные пункты|Иванов И.И."
+    )
+
+
+def test_update_history_changes_table_header_only():
+    today = datetime.now().strftime("%d.%m.%Y")
+    assert update_history_changes_table("Дата|Версия|Описание|Автор", "Петров П.П.", "Правки") == (
+        f"Дата|Версия|Описание|Автор\n{today}|0.1|Правки|Петров П.П."
+    )
+
+
+def test_update_history_changes_table_increments_last_version():
+    """Следующая версия берется от последней строки с версией X.Y (строки без версии пропускаются)"""
+    today = datetime.now().strftime("%d.%m.%Y")
+    history = (
+        "Дата|Версия|Описание|Автор\n"
+        "01.02.2024|0.1|Создание|Иванов И.И.\n"
+        "02.02.2024| 1.9 |Правки|Иванов И.И.\n"
+        "без версии"
+    )
+    result = update_history_changes_table(history, "Петров П.П.", "Новые правки")
+    assert result == f"{history}\n{today}|1.10|Новые правки|Петров П.П."
+
+
+def test_update_history_changes_table_without_versions():
+    """Версия не найдена - новая запись получает 0.2"""
+    history = "Дата|Версия|Описание|Автор\nзапись без версии"
+    assert update_history_changes_table(history, "А", "Б").endswith("|0.2|Б|А")
+
+
+# --- Пользовательские блоки ---
+
+def test_parse_custom_sections():
+    """Блоки собираются из одной разобранной формы и сортируются по position"""
+    form = FormData([
+        ("custom_sections[b][id]", "b"),
+        ("custom_sections[b][title]", "Второй"),
+        ("custom_sections[b][position]", "20"),
+        ("custom_sections[b][text]", "Текст"),
+        ("custom_sections[a][id]", "a"),
+        ("custom_sections[a][title]", "Первый"),
+        ("custom_sections[a][position]", "3"),
+        ("custom_sections[a][table]", "A|B"),
+        ("project_name", "Проект"),
+    ])
+    sections = parse_custom_sections(form)
+    assert [section["id"] for section in sections] == ["a", "b"]
+    assert sections[0] == {
+        "id": "a", "title": "Первый", "position": 3,
+        "text": "", "table": "A|B", "list": ""
+    }
+    assert sections[1]["text"] == "Текст"
+
+
+def test_parse_custom_sections_skips_incomplete_and_defaults_position():
+    """Блоки без id или названия пропускаются, позиция по умолчанию - 15"""
+    form = FormData([
+        ("custom_sections[x][title]", "Без id"),
+        ("custom_sections[y][id]", "y"),
+        ("custom_sections[y][title]", ""),
+        ("custom_sections[z][id]", "z"),
+        ("custom_sections[z][title]", "Блок"),
+        ("custom_sections[z][position]", ""),
+        ("custom_sections[z][unknown]", "ignored"),
+    ])
+    assert parse_custom_sections(form) == [{
+        "id": "z", "title": "Блок", "position": 15,
+        "text": "", "table": "", "list": ""
+    }]
+
+
+# --- Таблицы ---
+
+def test_count_table_rows():
+    assert count_table_rows(None) == 0
+    assert count_table_rows("") == 0
+    assert count_table_rows("без таблицы") == 0
+    assert count_table_rows("A|B\n1|2\n\nкомментарий\n3|4") == 3
+
+
+# --- Теги ---
+
+def test_parse_tags():
+    assert parse_tags("load, stress ,, ,api") == ["load", "stress", "api"]
+    assert parse_tags("") == []
+    assert parse_tags(None) == []
@@ -0,0 +1,32 @@
+"""Тесты кэша контента превью МНТ"""
+from concurrent.futures import ThreadPoolExecutor
+
+from app.routes import mnt
+
+
+def test_preview_cache_concurrent_eviction(monkeypatch):
+    """Одновременное вытеснение из заполненного кэша в нескольких потоках не приводит к ошибке"""
+    monkeypatch.setattr(mnt, "render_mnt_to_confluence_storage", lambda data: f"content {data['n']}")
+    monkeypatch.setattr(mnt, "PREVIEW_CACHE_MAX_SIZE", 4)
+    monkeypatch.setattr(mnt, "_preview_content_cache", {})
+    
+    def preview(n):
+        return mnt.get_preview_content({"id": n, "updated_at": None, "data_json": {"n": n}})
+    
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert list(pool.map(preview, range(1000))) == [f"content {n}" for n in range(1000)]
+    assert len(mnt._preview_content_cache) <= 4
+
+
+def test_preview_cache_reuses_content_until_document_changes(monkeypatch):
+    renders = []
+    monkeypatch.setattr(mnt, "render_mnt_to_confluence_storage", lambda data: renders.append(data) or "content")
+    monkeypatch.setattr(mnt, "_preview_content_cache", {})
+    
+    document = {"id": 1, "updated_at": "v1", "data_json": {}}
+    mnt.get_preview_content(document)
+    mnt.get_preview_content(document)
+    assert len(renders) == 1
+    
+    mnt.get_preview_content(dict(document, updated_at="v2"))
+    assert len(renders) == 2